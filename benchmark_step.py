@@ -0,0 +1,469 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+STEP处理性能基准测试
+此脚本对比各处理环节优化前后的内存占用和运行时间
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+from time import time
+
+from step_tokenizer import scan_step_file, parse_point_table, EntityIndex, POINT_TYPE
+from numpy_step_processor import chain_edges, DEFAULT_SNAP_TOLERANCE
+
+
+def measure_memory(build):
+    """执行build()并返回 (结果, 新分配的字节数)"""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def benchmark_id_index(input_file):
+    """对比以ID为键的点字典与紧凑ID索引的内存占用和查找速度"""
+    print(f"=== 点ID索引基准测试: {input_file} ===")
+    tables = scan_step_file(input_file, (POINT_TYPE,))
+    point_ids, points = parse_point_table(tables)
+    count = len(point_ids)
+    if count == 0:
+        print("错误: 文件中没有CARTESIAN_POINT")
+        return 1
+
+    # 优化前: {id: [x, y, z]}
+    id_list = point_ids.tolist()
+    points_dict, dict_bytes = measure_memory(lambda: dict(zip(id_list, points.tolist())))
+
+    # 优化后: (N, 3) 坐标数组 + 紧凑ID索引
+    index, index_bytes = measure_memory(lambda: EntityIndex(point_ids))
+    array_bytes = points.nbytes + point_ids.nbytes
+
+    print(f"点数: {count}，索引方式: {index.mode}")
+    print(f"优化前 (字典): {dict_bytes / count:.1f} 字节/点")
+    print(f"优化后 (数组+索引): {(array_bytes + index_bytes) / count:.1f} 字节/点 "
+          f"(坐标和ID {array_bytes / count:.1f}，索引 {index_bytes / count:.1f})")
+
+    # 查找速度：每个ID查找一次
+    start_time = time()
+    rows = [points_dict[point_id] for point_id in id_list]
+    dict_time = time() - start_time
+    start_time = time()
+    rows = points[index.lookup(point_ids)]
+    index_time = time() - start_time
+    print(f"查找 {count} 个ID: 字典逐个查找 {dict_time:.3f} 秒，向量化查找 {index_time:.3f} 秒")
+    return 0
+
+
+def legacy_chain_edges(edges_array):
+    """优化前的轮廓构建：每一步都计算当前点到所有未使用边端点的距离，O(E²)"""
+    edge_starts = edges_array[:, 0, :]
+    edge_ends = edges_array[:, 1, :]
+    used_edges = np.zeros(len(edges_array), dtype=bool)
+    contours = []
+    while not np.all(used_edges):
+        start_edge_idx = np.where(~used_edges)[0][0]
+        used_edges[start_edge_idx] = True
+        current_contour = [edge_starts[start_edge_idx], edge_ends[start_edge_idx]]
+        current_point = edge_ends[start_edge_idx]
+        
+        found_next = True
+        while found_next:
+            found_next = False
+            start_distances = np.sum((edge_starts[~used_edges] - current_point) ** 2, axis=1)
+            end_distances = np.sum((edge_ends[~used_edges] - current_point) ** 2, axis=1)
+            if len(start_distances) > 0:
+                min_start_idx = np.argmin(start_distances)
+                min_start_dist = start_distances[min_start_idx]
+                min_end_idx = np.argmin(end_distances)
+                min_end_dist = end_distances[min_end_idx]
+                unused_indices = np.where(~used_edges)[0]
+                if min_start_dist < min_end_dist and min_start_dist < 1e-6:
+                    next_edge_idx = unused_indices[min_start_idx]
+                    current_point = edge_ends[next_edge_idx]
+                elif min_end_dist < 1e-6:
+                    next_edge_idx = unused_indices[min_end_idx]
+                    current_point = edge_starts[next_edge_idx]
+                else:
+                    continue
+                current_contour.append(current_point)
+                used_edges[next_edge_idx] = True
+                found_next = True
+        
+        if len(current_contour) > 2:
+            contours.append(np.array(current_contour))
+    return contours
+
+
+def make_square_edges(edge_count, seed=0):
+    """生成由 10x10 方形组成的测试边集，边的顺序和方向随机打乱"""
+    rng = np.random.default_rng(seed)
+    squares = max(1, edge_count // 4)
+    corners = np.array([[0, 0], [10, 0], [10, 10], [0, 10]], dtype=np.float64)
+    origins = np.column_stack((np.arange(squares) % 100, np.arange(squares) // 100)) * 20.0
+    
+    starts = (origins[:, None, :] + corners[None, :, :]).reshape(-1, 2)
+    ends = (origins[:, None, :] + np.roll(corners, -1, axis=0)[None, :, :]).reshape(-1, 2)
+    edges = np.stack((starts, ends), axis=1)
+    edges = np.concatenate((edges, np.zeros(edges.shape[:2] + (1,))), axis=2)
+    
+    flip = rng.random(len(edges)) < 0.5
+    edges[flip] = edges[flip][:, ::-1]
+    return edges[rng.permutation(len(edges))]
+
+
+def benchmark_contours(sizes, legacy_limit):
+    """对比O(E²)几何搜索与哈希邻接表构建轮廓的耗时随边数的变化"""
+    print("=== 轮廓构建基准测试 ===")
+    print(f"{'边数':>10} {'几何搜索(秒)':>14} {'邻接表(秒)':>12} {'加速比':>8} {'轮廓数':>8}")
+    for size in sizes:
+        edges = make_square_edges(size)
+        start_time = time()
+        contours = chain_edges(edges, DEFAULT_SNAP_TOLERANCE)
+        chain_time = time() - start_time
+        
+        legacy_text, speedup_text = '-', '-'
+        if len(edges) <= legacy_limit:
+            start_time = time()
+            legacy = legacy_chain_edges(edges)
+            legacy_time = time() - start_time
+            if len(legacy) != len(contours):
+                print(f"错误: 轮廓数不一致 ({len(legacy)} / {len(contours)})")
+                return 1
+            legacy_text = f"{legacy_time:.3f}"
+            speedup_text = f"{legacy_time / max(chain_time, 1e-9):.0f}x"
+        
+        print(f"{len(edges):>10} {legacy_text:>14} {chain_time:>12.3f} {speedup_text:>8} {len(contours):>8}")
+    return 0
+
+
+def write_curve_file(output_file, curve_count, seed=0):
+    """生成包含指定数量LINE、CIRCLE和B_SPLINE_CURVE（各占约1/3）及其点、方向和坐标系的STEP文件"""
+    rng = np.random.default_rng(seed)
+    lines = ["ISO-10303-21;", "HEADER;", "FILE_DESCRIPTION(('benchmark'),'2;1');",
+             "FILE_SCHEMA(('AUTOMOTIVE_DESIGN'));", "ENDSEC;", "DATA;"]
+    next_id = 1
+
+    def add(record):
+        nonlocal next_id
+        lines.append(f"#{next_id}={record};")
+        next_id += 1
+        return next_id - 1
+
+    for index, (x, y) in enumerate(rng.uniform(-500.0, 500.0, (curve_count, 2))):
+        point = add(f"CARTESIAN_POINT('',({x:.4f},{y:.4f},0.))")
+        kind = index % 3
+        if kind == 0:
+            direction = add("DIRECTION('',(1.,0.,0.))")
+            vector = add(f"VECTOR('',#{direction},10.)")
+            add(f"LINE('',#{point},#{vector})")
+        elif kind == 1:
+            axis = add("DIRECTION('',(0.,0.,1.))")
+            ref_direction = add("DIRECTION('',(1.,0.,0.))")
+            placement = add(f"AXIS2_PLACEMENT_3D('',#{point},#{axis},#{ref_direction})")
+            add(f"CIRCLE('',#{placement},{rng.uniform(1.0, 20.0):.3f})")
+        else:
+            control_points = [point] + [add(f"CARTESIAN_POINT('',({x + k:.4f},{y + k * k * 0.1:.4f},0.))")
+                                        for k in range(1, 4)]
+            refs = ','.join(f'#{ref}' for ref in control_points)
+            add(f"B_SPLINE_CURVE('',3,({refs}),.UNSPECIFIED.,.F.,.F.)")
+    lines += ["ENDSEC;", "END-ISO-10303-21;"]
+    with open(output_file, 'w') as f:
+        f.write('\n'.join(lines))
+
+
+def benchmark_entities(curve_count, linear_samples):
+    """对比按ID/类型逐个扫描实体列表与快速实体后端（ID索引和类型索引）的查询耗时"""
+    import step_entity_backend
+    from steputils_to_gcode import StepToGcode
+
+    print(f"=== 实体后端基准测试: {curve_count} 条曲线 ===")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_file = os.path.join(temp_dir, 'curves.stp')
+        write_curve_file(input_file, curve_count)
+        print(f"测试文件: {os.path.getsize(input_file) / (1024 * 1024):.2f} MB")
+
+        step_file = step_entity_backend.readfile(input_file)
+        print(f"读取并建立索引: {len(step_file)} 个实体，用时 {step_file.elapsed:.2f} 秒")
+
+        # 转换器的实际访问模式：每种曲线类型查询一次，每个圆按ID查找其坐标系
+        converter = StepToGcode(input_file, output_file=os.path.join(temp_dir, 'curves.gcode'))
+        converter.step_module = step_entity_backend
+        converter.step_file = step_file
+        start_time = time()
+        converter.extract_geometry()
+        print(f"extract_geometry: {len(converter.curves)} 条曲线，用时 {time() - start_time:.2f} 秒")
+
+        placement_ids = [circle.params[1].id for circle in step_file.find_all_entities_by_type('CIRCLE')]
+        entities = list(step_file)
+
+        # 优化前: 在实体列表中逐个扫描（只测试在文件中均匀分布的部分ID，再按比例折算）
+        samples = placement_ids[::max(1, len(placement_ids) // max(linear_samples, 1))]
+        start_time = time()
+        for entity_id in samples:
+            next(entity for entity in entities if entity.id == entity_id)
+        linear_lookup = (time() - start_time) / max(len(samples), 1)
+        start_time = time()
+        for entity_type in ('CARTESIAN_POINT', 'LINE', 'CIRCLE', 'B_SPLINE_CURVE'):
+            [entity for entity in entities if entity.type == entity_type]
+        linear_types = time() - start_time
+
+        # 优化后: ID字典和预先建立的类型列表
+        start_time = time()
+        for entity_id in placement_ids:
+            step_file.find_entity_by_id(entity_id)
+        index_lookup = (time() - start_time) / max(len(placement_ids), 1)
+        start_time = time()
+        for entity_type in ('CARTESIAN_POINT', 'LINE', 'CIRCLE', 'B_SPLINE_CURVE'):
+            step_file.find_all_entities_by_type(entity_type)
+        index_types = time() - start_time
+
+    print(f"按ID查找 {len(placement_ids)} 个坐标系: 逐个扫描 {linear_lookup * len(placement_ids):.2f} 秒 "
+          f"(按 {len(samples)} 次折算)，ID索引 {index_lookup * len(placement_ids) * 1000:.2f} 毫秒")
+    print(f"按类型查询4种实体: 逐个扫描 {linear_types * 1000:.1f} 毫秒，类型索引 {index_types * 1000:.3f} 毫秒")
+    return 0
+
+
+def benchmark_bsplines(curve_count, samples):
+    """对比逐条曲线求值与按 (次数, 控制点数) 分组的批量B样条求值"""
+    from numpy_bspline import evaluate_bsplines
+
+    print(f"=== B样条求值基准测试: {curve_count} 条曲线，每条 {samples} 个采样点 ===")
+    rng = np.random.default_rng(0)
+    curves = []
+    for index in range(curve_count):
+        degree = 1 + index % 3
+        control_points = rng.uniform(-100.0, 100.0, (degree + 1 + index % 5, 3))
+        curves.append((degree, control_points, None))
+
+    # 优化前: 每条曲线单独求值（相当于每条曲线一个曲线对象）
+    start_time = time()
+    single = [evaluate_bsplines([curve], samples)[0] for curve in curves]
+    single_time = time() - start_time
+
+    # 优化后: 分组批量求值，输出为不规则数组
+    start_time = time()
+    points, offsets = evaluate_bsplines(curves, samples)
+    batch_time = time() - start_time
+
+    same = np.allclose(np.concatenate(single), points)
+    print(f"逐条求值: {single_time:.2f} 秒，批量求值: {batch_time:.2f} 秒 "
+          f"({single_time / max(batch_time, 1e-9):.1f}倍)，结果{'一致' if same else '不一致'}")
+    return 0 if same else 1
+
+
+def make_hole_contours(count, seed=0):
+    """生成多孔板测试轮廓：随机顺序排列的小圆孔，孔心在带扰动的网格上，每孔16个点"""
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(count)))
+    centers = np.column_stack((np.arange(count) % side, np.arange(count) // side)) * 10.0
+    centers = centers + rng.uniform(-2.0, 2.0, centers.shape)
+    angles = np.linspace(0.0, 2 * np.pi, 17)
+    circle = np.column_stack((np.cos(angles), np.sin(angles), np.zeros(17))) * 2.0
+    holes = [circle + [x, y, 0.0] for x, y in centers[rng.permutation(count)]]
+    # 闭合轮廓从随机顶点开始，使起点不在同一方位
+    return [np.vstack((hole[shift:-1], hole[:shift + 1])) for hole, shift in zip(holes, rng.integers(0, 16, count))]
+
+
+def legacy_centroid_order(contours):
+    """原有的轮廓排序：按轮廓中心贪婪选择最近的未访问轮廓，每步对所有未访问轮廓计算距离 O(n²)"""
+    centers = np.array([np.mean(contour, axis=0) for contour in contours])
+    visited = np.zeros(len(contours), dtype=bool)
+    current_idx = 0
+    visited[current_idx] = True
+    path_order = [current_idx]
+    for _ in range(len(contours) - 1):
+        distances = np.sum((centers[~visited] - centers[current_idx]) ** 2, axis=1)
+        next_idx = np.where(~visited)[0][np.argmin(distances)]
+        path_order.append(next_idx)
+        visited[next_idx] = True
+        current_idx = next_idx
+    return np.array(path_order)
+
+
+def benchmark_ordering(sizes, legacy_limit):
+    """对比原有O(n²)中心点贪婪排序与网格索引贪婪排序的耗时和空行程"""
+    from contour_ordering import contour_endpoints, greedy_order, rapid_length
+
+    print("=== 轮廓排序基准测试 ===")
+    print(f"{'轮廓数':>8} {'原排序(秒)':>11} {'网格排序(秒)':>13} {'加速比':>8} "
+          f"{'原空行程(mm)':>14} {'网格空行程(mm)':>15}")
+    for size in sizes:
+        contours = make_hole_contours(size)
+        starts, ends = contour_endpoints(contours)
+        start_time = time()
+        order = greedy_order(starts, ends)
+        greedy_time = time() - start_time
+        if len(np.unique(order)) != size:
+            print(f"错误: 排序结果不是 {size} 个轮廓的排列")
+            return 1
+
+        legacy_text, speedup_text, legacy_length = '-', '-', '-'
+        if size <= legacy_limit:
+            start_time = time()
+            legacy = legacy_centroid_order(contours)
+            legacy_time = time() - start_time
+            legacy_text = f"{legacy_time:.3f}"
+            speedup_text = f"{legacy_time / max(greedy_time, 1e-9):.1f}x"
+            legacy_length = f"{rapid_length(legacy, starts, ends):.0f}"
+
+        print(f"{size:>8} {legacy_text:>11} {greedy_time:>13.3f} {speedup_text:>8} "
+              f"{legacy_length:>14} {rapid_length(order, starts, ends):>15.0f}")
+    return 0
+
+
+def legacy_compensate_contour(path, radius):
+    """原有的逐点刀具半径补偿（每个点单独计算前后向量和法向量），用于对比"""
+    compensated_path = np.zeros_like(path)
+    for i in range(len(path)):
+        prev_i = (i - 1) % len(path)
+        next_i = (i + 1) % len(path)
+        prev_vec = path[i] - path[prev_i]
+        next_vec = path[next_i] - path[i]
+        prev_vec_mag = np.linalg.norm(prev_vec)
+        next_vec_mag = np.linalg.norm(next_vec)
+        if prev_vec_mag < 1e-6 or next_vec_mag < 1e-6:
+            compensated_path[i] = path[i]
+            continue
+        prev_vec_norm = prev_vec / prev_vec_mag
+        next_vec_norm = next_vec / next_vec_mag
+        prev_normal = np.array([-prev_vec_norm[1], prev_vec_norm[0], 0])
+        next_normal = np.array([-next_vec_norm[1], next_vec_norm[0], 0])
+        avg_normal = (prev_normal + next_normal) / 2
+        avg_normal_mag = np.linalg.norm(avg_normal)
+        if avg_normal_mag < 1e-6:
+            if np.linalg.norm(prev_normal) > 1e-6:
+                avg_normal = prev_normal
+            elif np.linalg.norm(next_normal) > 1e-6:
+                avg_normal = next_normal
+            else:
+                compensated_path[i] = path[i]
+                continue
+            avg_normal_mag = np.linalg.norm(avg_normal)
+            if avg_normal_mag < 1e-6:
+                compensated_path[i] = path[i]
+                continue
+        avg_normal = avg_normal / avg_normal_mag
+        compensated_path[i] = path[i] + radius * avg_normal
+    nan_mask = np.isnan(compensated_path).any(axis=1)
+    compensated_path[nan_mask] = path[nan_mask]
+    return compensated_path
+
+
+def make_compensation_toolpath(point_count, seed=0):
+    """生成刀具补偿测试路径：多孔板圆孔轮廓，夹杂重复点和原路折返的尖点"""
+    from toolpath import Toolpath
+
+    contours = make_hole_contours(max(1, point_count // 17), seed)
+    rng = np.random.default_rng(seed)
+    for contour in contours[::7]:
+        contour[3] = contour[2]
+        contour[6] = contour[4]
+    toolpath = Toolpath.from_contours(contours)
+    toolpath.points[:, 2] = rng.choice([0.0, -0.5], toolpath.point_count)
+    return toolpath
+
+
+def benchmark_compensation(sizes, legacy_limit, radius):
+    """
+    对比逐点与向量化刀具半径补偿的耗时
+
+    原逐点实现把每个轮廓首尾相接（闭合轮廓的重复终点使入口顶点不被偏移，开放轮廓两端跨过首尾），
+    向量化实现对轮廓两端的处理已修正，因此只对比轮廓内部点的结果，用于检查向量化计算本身
+    """
+    from numpy_gcode_generator import compensate_contours
+
+    print("=== 刀具半径补偿基准测试 ===")
+    print(f"{'点数':>10} {'逐点(秒)':>10} {'向量化(秒)':>11} {'加速比':>8} {'内部点':>6}")
+    for size in sizes:
+        toolpath = make_compensation_toolpath(size)
+        # 向量化版本取3次中最短的用时，排除首次分配大数组的开销
+        vector_time = np.inf
+        for _ in range(3):
+            start_time = time()
+            compensated = compensate_contours(toolpath, radius)
+            vector_time = min(vector_time, time() - start_time)
+
+        legacy_text, speedup_text, same_text = '-', '-', '-'
+        if toolpath.point_count <= legacy_limit:
+            start_time = time()
+            legacy = np.concatenate([legacy_compensate_contour(contour, radius)
+                                     for contour in toolpath.contours()])
+            legacy_time = time() - start_time
+            interior = np.ones(toolpath.point_count, dtype=bool)
+            interior[toolpath.contour_offsets[:-1]] = False
+            interior[toolpath.contour_offsets[1:] - 1] = False
+            if not np.array_equal(legacy[interior], compensated[interior]):
+                difference = np.abs(legacy[interior] - compensated[interior]).max()
+                print(f"错误: 轮廓内部点的补偿结果不一致 (最大差 {difference:.3g} mm)")
+                return 1
+            legacy_text = f"{legacy_time:.2f}"
+            speedup_text = f"{legacy_time / max(vector_time, 1e-9):.0f}x"
+            same_text = '一致'
+
+        print(f"{toolpath.point_count:>10} {legacy_text:>10} {vector_time:>11.3f} {speedup_text:>8} {same_text:>6}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='STEP处理性能基准测试')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    index_parser = subparsers.add_parser('index', help='点ID字典与紧凑ID索引的内存对比')
+    index_parser.add_argument('input_file', help='输入STEP文件路径')
+
+    contour_parser = subparsers.add_parser('contours', help='O(E²)几何搜索与哈希邻接表构建轮廓的耗时对比')
+    contour_parser.add_argument('--sizes', type=int, nargs='+',
+                                default=[1000, 2000, 5000, 10000, 20000, 100000, 1000000],
+                                help='测试的边数')
+    contour_parser.add_argument('--legacy-limit', type=int, default=20000,
+                                help='几何搜索只测试不超过该边数的规模')
+
+    entity_parser = subparsers.add_parser('entities', help='实体列表逐个扫描与快速实体后端的查询耗时对比')
+    entity_parser.add_argument('--curves', type=int, default=50000, help='测试文件中的曲线数量')
+    entity_parser.add_argument('--linear-samples', type=int, default=200,
+                               help='逐个扫描方式实际测试的查找次数')
+
+    bspline_parser = subparsers.add_parser('bspline', help='逐条与批量B样条求值的耗时对比')
+    bspline_parser.add_argument('--curves', type=int, default=20000, help='曲线数量')
+    bspline_parser.add_argument('--samples', type=int, default=50, help='每条曲线的采样点数')
+
+    order_parser = subparsers.add_parser('order', help='O(n²)中心点贪婪排序与网格索引贪婪排序的耗时对比')
+    order_parser.add_argument('--sizes', type=int, nargs='+',
+                              default=[100, 1000, 5000, 10000, 20000, 50000, 100000],
+                              help='测试的轮廓数')
+    order_parser.add_argument('--legacy-limit', type=int, default=20000,
+                              help='原排序只测试不超过该轮廓数的规模')
+
+    compensation_parser = subparsers.add_parser('compensation', help='逐点与向量化刀具半径补偿的耗时对比')
+    compensation_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                                     help='测试的路径点数')
+    compensation_parser.add_argument('--legacy-limit', type=int, default=1000000,
+                                     help='逐点补偿只测试不超过该点数的规模')
+    compensation_parser.add_argument('--radius', type=float, default=1.5, help='刀具半径 (mm)')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'index':
+        return benchmark_id_index(args.input_file)
+    if args.benchmark == 'contours':
+        return benchmark_contours(args.sizes, args.legacy_limit)
+    if args.benchmark == 'entities':
+        return benchmark_entities(args.curves, args.linear_samples)
+    if args.benchmark == 'bspline':
+        return benchmark_bsplines(args.curves, args.samples)
+    if args.benchmark == 'order':
+        return benchmark_ordering(args.sizes, args.legacy_limit)
+    if args.benchmark == 'compensation':
+        return benchmark_compensation(args.sizes, args.legacy_limit, args.radius)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
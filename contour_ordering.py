@@ -0,0 +1,559 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+加工轮廓排序 (基于NumPy)
+按每个轮廓真实的起点（下刀点）和终点（抬刀点）安排加工顺序，使轮廓之间的空行程最短：
+先用网格近邻表和支持删除的最近点网格构建贪婪路线，再在时间预算内用 2-opt 和 Or-opt 局部搜索改进。
+闭合轮廓可以从任意顶点开始加工，与排序交替为其选择离上一个轮廓出口最近的顶点作为入口。
+空行程在安全高度上进行，只计算XY平面内的距离；轮廓本身的切削方向保持不变
+"""
+
+import numpy as np
+from time import time
+
+# 局部搜索的默认时间预算 (毫秒)
+DEFAULT_ORDER_TIME_MS = 500
+# 每个轮廓终点的候选后继数量
+ORDER_NEIGHBORS = 8
+# Or-opt 移动的最大连续轮廓数
+OR_OPT_MAX_SEGMENT = 3
+# 视为改进的最小距离减少量 (mm)
+IMPROVEMENT_EPSILON = 1e-9
+# 首尾点距离不超过该值的轮廓视为闭合 (mm)
+CLOSED_TOLERANCE = 1e-6
+
+
+def contour_endpoints(contours):
+    """
+    轮廓的起点和终点（XY）
+
+    Args:
+        contours (list): 轮廓点数组 (N, 3) 列表
+
+    Returns:
+        tuple: (starts (n, 2), ends (n, 2))
+    """
+    starts = np.array([contour[0, :2] for contour in contours], dtype=float).reshape(-1, 2)
+    ends = np.array([contour[-1, :2] for contour in contours], dtype=float).reshape(-1, 2)
+    return starts, ends
+
+
+def rapid_length(order, starts, ends, origin=(0.0, 0.0)):
+    """
+    按给定顺序加工时的空行程总长度：从原点到第一个轮廓起点，以及每个轮廓终点到下一个轮廓起点
+
+    Args:
+        order (numpy.ndarray): 轮廓序号
+        starts (numpy.ndarray): (n, 2) 起点
+        ends (numpy.ndarray): (n, 2) 终点
+        origin (tuple): 起始位置 (X, Y)
+
+    Returns:
+        float: 空行程长度 (mm)
+    """
+    order = np.asarray(order, dtype=np.int64)
+    if len(order) == 0:
+        return 0.0
+    exits = np.vstack([np.asarray(origin, dtype=float).reshape(1, 2), ends[order[:-1]]])
+    return float(np.linalg.norm(starts[order] - exits, axis=1).sum())
+
+
+def grid_cell_size(points, extent):
+    """按平均每格约2个点确定网格边长，格数每个方向不超过约1024"""
+    return max(float(np.sqrt(extent[0] * extent[1] * 2.0 / max(len(points), 1))), float(extent.max()) / 1024, 1e-9)
+
+
+def neighbor_lists(queries, targets, count=ORDER_NEIGHBORS):
+    """
+    用均匀网格为每个查询点找出最近的若干目标点（精确k近邻）
+
+    目标点按平均每格约2个点划分网格，每个查询点在其所在格周围逐圈扩大搜索，
+    直到候选数不少于 count；再把搜索范围扩大到覆盖第 count 个候选的距离，
+    方块外的点不会比它更近，因此结果为精确的k近邻（距离相等时的先后可能不同）
+
+    Args:
+        queries (numpy.ndarray): (m, 2) 查询点
+        targets (numpy.ndarray): (n, 2) 目标点
+        count (int): 每个查询点的近邻数量
+
+    Returns:
+        numpy.ndarray: (m, count) 目标点序号，按距离升序；不足时以 -1 填充
+    """
+    queries = np.asarray(queries, dtype=float).reshape(-1, 2)
+    targets = np.asarray(targets, dtype=float).reshape(-1, 2)
+    result = np.full((len(queries), count), -1, dtype=np.int64)
+    if len(queries) == 0 or len(targets) == 0:
+        return result
+    count = min(count, len(targets))
+
+    low = np.minimum(targets.min(axis=0), queries.min(axis=0))
+    extent = np.maximum(targets.max(axis=0), queries.max(axis=0)) - low
+    cell = grid_cell_size(targets, extent)
+    shape = (np.floor(extent / cell).astype(np.int64) + 1)
+
+    # 目标点按网格键排序，每格对应排序后数组中的一段，同一行相邻的格也是连续的一段
+    target_cells = np.floor((targets - low) / cell).astype(np.int64)
+    target_keys = target_cells[:, 0] * shape[1] + target_cells[:, 1]
+    target_order = np.argsort(target_keys, kind='stable')
+    cell_start = np.concatenate(([0], np.cumsum(np.bincount(target_keys, minlength=int(shape[0] * shape[1])))))
+
+    query_cells = np.floor((queries - low) / cell).astype(np.int64)
+    query_keys = query_cells[:, 0] * shape[1] + query_cells[:, 1]
+    query_order = np.argsort(query_keys, kind='stable')
+    unique_keys, query_first = np.unique(query_keys[query_order], return_index=True)
+    query_last = np.append(query_first[1:], len(query_order))
+
+    def block_slices(cx, cy, radius):
+        """以 (cx, cy) 为中心、半径为 radius 格的方块内每一行的格在排序后数组中的区间"""
+        y0, y1 = max(cy - radius, 0), min(cy + radius, shape[1] - 1)
+        rows = np.arange(max(cx - radius, 0), min(cx + radius, shape[0] - 1) + 1) * shape[1]
+        return list(zip(cell_start[rows + y0].tolist(), cell_start[rows + y1 + 1].tolist()))
+
+    def nearest_candidates(members, slices):
+        """查询点在候选中的前 count 个近邻及其距离"""
+        candidates = target_order[np.concatenate([np.arange(begin, end) for begin, end in slices])]
+        distances = np.linalg.norm(queries[members][:, None, :] - targets[candidates][None, :, :], axis=2)
+        nearest = np.argsort(distances, axis=1, kind='stable')[:, :count]
+        return candidates[nearest], np.take_along_axis(distances, nearest, axis=1)
+
+    for key, start, stop in zip(unique_keys.tolist(), query_first.tolist(), query_last.tolist()):
+        members = query_order[start:stop]
+        cx, cy = divmod(key, shape[1])
+        # 每格平均约2个点，半径为2格的方块通常已覆盖第 count 个近邻的距离
+        radius = 2
+        while True:
+            slices = block_slices(cx, cy, radius)
+            found = sum(end - begin for begin, end in slices)
+            if found >= count or (radius >= shape[0] and radius >= shape[1]):
+                break
+            radius *= 2
+        nearest, distances = nearest_candidates(members, slices)
+        # 距离不超过 distance 的点都在半径为 distance / cell + 1 格的方块内，只对未覆盖的查询点扩大范围
+        covers = (distances[:, -1] / cell).astype(np.int64) + 1
+        uncovered = covers > radius
+        if uncovered.any():
+            nearest[uncovered], _ = nearest_candidates(members[uncovered],
+                                                      block_slices(cx, cy, int(covers[uncovered].max())))
+        result[members, :count] = nearest
+    return result
+
+
+class NearestGrid:
+    def __init__(self, points):
+        """
+        支持删除的最近点查询均匀网格
+
+        点按网格键排序后连续存放（CSR），每格记录剩余点数；删除只清除标志并减少计数，
+        剩余点数降到建网格时的1/4以下时按剩余点重建网格，使空格比例和已删除点的比例保持有界。
+        查询从所在格向外逐圈（半径加倍）寻找非空格，找到候选后再检查以候选距离为半径覆盖的所有格，
+        结果为精确的最近点
+
+        Args:
+            points (numpy.ndarray): (n, 2) 点坐标
+        """
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.alive = np.ones(len(self.points), dtype=bool)
+        self.alive_count = len(self.points)
+        self.point_cell = np.full(len(self.points), -1, dtype=np.int64)
+        if self.alive_count:
+            self._build()
+
+    def _build(self):
+        """按剩余的点重建网格"""
+        index = np.flatnonzero(self.alive)
+        points = self.points[index]
+        self.low = points.min(axis=0)
+        extent = points.max(axis=0) - self.low
+        self.cell = grid_cell_size(points, extent)
+        self.shape = np.floor(extent / self.cell).astype(np.int64) + 1
+        cells = np.floor((points - self.low) / self.cell).astype(np.int64)
+        keys = cells[:, 0] * self.shape[1] + cells[:, 1]
+        order = np.argsort(keys, kind='stable')
+        counts = np.bincount(keys, minlength=int(self.shape[0] * self.shape[1]))
+        self.members = index[order]
+        self.cell_start = np.concatenate(([0], np.cumsum(counts)))
+        self.counts = counts.reshape(self.shape)
+        self.point_cell[index] = keys
+        self.indexed = len(index)
+
+    def remove(self, index):
+        """删除一个点（已删除时不做任何事）"""
+        if not self.alive[index]:
+            return
+        self.alive[index] = False
+        self.alive_count -= 1
+        self.counts.flat[self.point_cell[index]] -= 1
+        if self.alive_count and self.alive_count * 4 < self.indexed:
+            self._build()
+
+    def _block_nearest(self, query, cx, cy, radius):
+        """在以 (cx, cy) 为中心、半径为 radius 格的方块内找最近的剩余点，没有时返回 (-1, inf)"""
+        x0, x1 = max(cx - radius, 0), min(cx + radius, self.shape[0] - 1)
+        y0, y1 = max(cy - radius, 0), min(cy + radius, self.shape[1] - 1)
+        if x0 > x1 or y0 > y1:
+            return -1, np.inf
+        xs, ys = np.nonzero(self.counts[x0:x1 + 1, y0:y1 + 1])
+        if len(xs) == 0:
+            return -1, np.inf
+        keys = ((xs + x0) * self.shape[1] + ys + y0).tolist()
+        starts, stops = self.cell_start[keys].tolist(), self.cell_start[np.add(keys, 1)].tolist()
+        candidates = self.members[np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)])]
+        candidates = candidates[self.alive[candidates]]
+        offsets = self.points[candidates] - query
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        best = int(np.argmin(distances))
+        return int(candidates[best]), float(distances[best])
+
+    def nearest(self, query):
+        """
+        离查询点最近的剩余点
+
+        Args:
+            query (numpy.ndarray): (2,) 查询点
+
+        Returns:
+            int: 点序号，没有剩余点时为 -1
+        """
+        if self.alive_count == 0:
+            return -1
+        query = np.asarray(query, dtype=float)
+        cx, cy = np.floor((query - self.low) / self.cell).astype(np.int64).tolist()
+        # 查询点在网格外时从离它最近的格开始
+        reach = max(cx - self.shape[0] + 1, -cx, cy - self.shape[1] + 1, -cy, 0)
+        radius = reach
+        limit = reach + int(self.shape.max())
+        while True:
+            best, distance = self._block_nearest(query, cx, cy, radius)
+            if best >= 0 or radius >= limit:
+                break
+            radius = max(radius * 2, reach + 1)
+        # 距离不超过 distance 的点都在半径为 distance / cell + 1 格的方块内
+        cover = int(distance / self.cell) + 1
+        if cover > radius:
+            best, distance = self._block_nearest(query, cx, cy, cover)
+        return best
+
+
+def greedy_order(starts, ends, origin=(0.0, 0.0), neighbors=None):
+    """
+    贪婪最近邻路线：从原点出发，每次前往离当前轮廓终点最近的未加工轮廓起点
+
+    优先在近邻表中查找，近邻都已加工时在支持删除的起点网格 NearestGrid 中查询，
+    总体约为 O(n log n)，不再对剩余轮廓逐一计算距离。两者都返回精确的最近点，
+    路线与逐一比较剩余轮廓的贪婪排序相同（距离相等时的选择可能不同）
+
+    Args:
+        starts (numpy.ndarray): (n, 2) 起点
+        ends (numpy.ndarray): (n, 2) 终点
+        origin (tuple): 起始位置 (X, Y)
+        neighbors (numpy.ndarray): neighbor_lists(ends, starts) 的结果，None时自动计算
+
+    Returns:
+        numpy.ndarray: 轮廓序号
+    """
+    count = len(starts)
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    if neighbors is None:
+        neighbors = neighbor_lists(ends, starts)
+
+    grid = NearestGrid(starts)
+    unvisited = grid.alive
+    neighbor_rows = neighbors.tolist()
+    order = []
+    current = grid.nearest(np.asarray(origin, dtype=float))
+    for _ in range(count):
+        grid.remove(current)
+        order.append(current)
+        following = -1
+        for candidate in neighbor_rows[current]:
+            if candidate >= 0 and unvisited[candidate]:
+                following = candidate
+                break
+        if following < 0:
+            following = grid.nearest(ends[current])
+            if following < 0:
+                break
+        current = following
+    return np.array(order, dtype=np.int64)
+
+
+class _Tour:
+    def __init__(self, order, starts, ends, origin):
+        """
+        局部搜索使用的路线表示：序列首尾各加一个虚拟节点，
+        首节点为起始位置，尾节点表示路线结束（到它的空行程为0）
+
+        Args:
+            order (numpy.ndarray): 初始轮廓顺序
+            starts (numpy.ndarray): (n, 2) 起点
+            ends (numpy.ndarray): (n, 2) 终点
+            origin (tuple): 起始位置 (X, Y)
+        """
+        count = len(order)
+        self.depot = count
+        self.tail = count + 1
+        origin = np.asarray(origin, dtype=float).reshape(1, 2)
+        self.starts = np.vstack([starts, origin, origin])
+        self.ends = np.vstack([ends, origin, origin])
+        self.seq = np.concatenate(([self.depot], order, [self.tail])).astype(np.int64)
+        self.pos = np.empty(count + 2, dtype=np.int64)
+        self.forward = np.zeros(count + 1)
+        self.backward = np.zeros(count + 1)
+        self.refresh(0, count + 1)
+
+    def cost(self, a, b):
+        """节点a的终点到节点b的起点的空行程，b为尾节点时为0"""
+        return np.hypot(self.ends[a, 0] - self.starts[b, 0], self.ends[a, 1] - self.starts[b, 1]) * (b != self.tail)
+
+    def refresh(self, low, high):
+        """序列位置 low..high 改变后更新位置表、各段空行程，以及 2-opt 反向段长度所需的前缀和"""
+        seq = self.seq
+        self.pos[seq[low:high + 1]] = np.arange(low, high + 1)
+        first, last = max(low - 1, 0), min(high, len(seq) - 2)
+        self.forward[first:last + 1] = self.cost(seq[first:last + 1], seq[first + 1:last + 2])
+        self.backward[first:last + 1] = self.cost(seq[first + 1:last + 2], seq[first:last + 1])
+        self.forward_sum = np.concatenate(([0.0], np.cumsum(self.forward)))
+        self.backward_sum = np.concatenate(([0.0], np.cumsum(self.backward)))
+
+    def try_two_opt(self, a, candidates):
+        """
+        在位置a之后反转一段路线，使seq[a]直接连到候选节点
+
+        新路线为 seq[:a+1] + seq[a+1:b+1][::-1] + seq[b+1:]，反转段内部的空行程改为反向计算
+        """
+        seq = self.seq
+        b = self.pos[candidates]
+        b = b[(b > a + 1) & (b < len(seq) - 1)]
+        if len(b) == 0:
+            return False
+        left, right, after = seq[a], seq[a + 1], seq[b + 1]
+        inner = (self.backward_sum[b] - self.backward_sum[a + 1]) - (self.forward_sum[b] - self.forward_sum[a + 1])
+        delta = (self.cost(left, seq[b]) + self.cost(right, after)
+                 - self.cost(left, right) - self.cost(seq[b], after) + inner)
+        best = int(np.argmin(delta))
+        if delta[best] >= -IMPROVEMENT_EPSILON:
+            return False
+        b = int(b[best])
+        seq[a + 1:b + 1] = seq[a + 1:b + 1][::-1].copy()
+        self.refresh(a + 1, b)
+        return True
+
+    def try_or_opt(self, i, length, neighbors):
+        """将从位置i开始的length个连续轮廓整体移到某个候选节点之前（不改变段内顺序）"""
+        seq = self.seq
+        j = i + length - 1
+        if j >= len(seq) - 1:
+            return False
+        before, first, last, after = seq[i - 1], seq[i], seq[j], seq[j + 1]
+        targets = neighbors[last]
+        targets = targets[targets >= 0]
+        insert = self.pos[targets]
+        insert = insert[(insert < i) | (insert > j + 1)]
+        if len(insert) == 0:
+            return False
+        removed = self.cost(before, after) - self.cost(before, first) - self.cost(last, after)
+        prev_nodes, next_nodes = seq[insert - 1], seq[insert]
+        delta = removed + self.cost(prev_nodes, first) + self.cost(last, next_nodes) - self.cost(prev_nodes, next_nodes)
+        best = int(np.argmin(delta))
+        if delta[best] >= -IMPROVEMENT_EPSILON:
+            return False
+        p = int(insert[best])
+        segment = seq[i:j + 1].copy()
+        rest = np.concatenate((seq[:i], seq[j + 1:]))
+        low, high = (p, j) if p < i else (i, p - 1)
+        p = p if p < i else p - length
+        self.seq = np.concatenate((rest[:p], segment, rest[p:]))
+        self.refresh(low, high)
+        return True
+
+    def order(self):
+        """当前的轮廓顺序（不含虚拟节点）"""
+        return self.seq[1:-1].copy()
+
+
+def refine_order(order, starts, ends, origin=(0.0, 0.0), neighbors=None, time_ms=DEFAULT_ORDER_TIME_MS):
+    """
+    在时间预算内用 2-opt 和 Or-opt 改进轮廓顺序
+
+    候选移动只考虑近邻表中的节点：2-opt 让某个轮廓的终点直接连到其近邻的起点并反转中间段，
+    Or-opt 把1至3个连续轮廓移到其末尾轮廓某个近邻之前。反复扫描直到没有改进或时间用完
+
+    Args:
+        order (numpy.ndarray): 初始轮廓顺序
+        starts (numpy.ndarray): (n, 2) 起点
+        ends (numpy.ndarray): (n, 2) 终点
+        origin (tuple): 起始位置 (X, Y)
+        neighbors (numpy.ndarray): neighbor_lists(ends, starts) 的结果，None时自动计算
+        time_ms (float): 时间预算 (毫秒)
+
+    Returns:
+        numpy.ndarray: 改进后的轮廓顺序
+    """
+    order = np.asarray(order, dtype=np.int64)
+    if len(order) < 3 or time_ms <= 0:
+        return order
+    deadline = time() + time_ms / 1000.0
+    if neighbors is None:
+        neighbors = neighbor_lists(ends, starts)
+    # 起始位置（虚拟首节点）的近邻为离原点最近的起点，尾节点没有近邻
+    depot_neighbors = neighbor_lists(np.asarray(origin, dtype=float).reshape(1, 2), starts, neighbors.shape[1])
+    neighbors = np.vstack([neighbors, depot_neighbors, np.full((1, neighbors.shape[1]), -1, dtype=np.int64)])
+
+    tour = _Tour(order, starts, ends, origin)
+    improved = True
+    while improved and time() < deadline:
+        improved = False
+        for a in range(len(order)):
+            if a % 64 == 0 and time() >= deadline:
+                break
+            node = tour.seq[a]
+            candidates = neighbors[node]
+            if tour.try_two_opt(a, candidates[candidates >= 0]):
+                improved = True
+            for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+                if a + 1 + length <= len(order) and tour.try_or_opt(a + 1, length, neighbors):
+                    improved = True
+    return tour.order()
+
+
+def order_contours(starts, ends, origin=(0.0, 0.0), time_ms=DEFAULT_ORDER_TIME_MS):
+    """
+    计算轮廓的加工顺序：网格近邻贪婪路线 + 限时 2-opt/Or-opt 改进
+
+    Args:
+        starts (numpy.ndarray): (n, 2) 起点
+        ends (numpy.ndarray): (n, 2) 终点
+        origin (tuple): 起始位置 (X, Y)
+        time_ms (float): 局部搜索的时间预算 (毫秒)，为0时只做贪婪排序
+
+    Returns:
+        tuple: (轮廓顺序, 报告)，报告包含原始顺序、贪婪路线和改进后的空行程长度 (mm) 及用时 (秒)
+    """
+    start_time = time()
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    neighbors = neighbor_lists(ends, starts)
+    order = greedy_order(starts, ends, origin, neighbors)
+    greedy_time = time() - start_time
+    report = {
+        'initial': rapid_length(np.arange(len(starts)), starts, ends, origin),
+        'greedy': rapid_length(order, starts, ends, origin)
+    }
+    order = refine_order(order, starts, ends, origin, neighbors, time_ms)
+    report['optimized'] = rapid_length(order, starts, ends, origin)
+    report['greedy_time'] = greedy_time
+    report['elapsed'] = time() - start_time
+    return order, report
+
+
+def closed_contour_mask(contours, tolerance=CLOSED_TOLERANCE):
+    """
+    判断每个轮廓是否闭合（至少3个点且首尾点重合）
+
+    Args:
+        contours (list): 轮廓点数组 (N, 3) 列表
+        tolerance (float): 首尾点距离容差 (mm)
+
+    Returns:
+        numpy.ndarray: 布尔数组
+    """
+    return np.array([len(contour) > 2 and float(np.linalg.norm(contour[-1] - contour[0])) <= tolerance
+                     for contour in contours], dtype=bool)
+
+
+def choose_entry_points(contours, order, closed, origin=(0.0, 0.0), entries=None):
+    """
+    按加工顺序为每个闭合轮廓选择入口顶点
+
+    闭合轮廓从入口顶点出发绕行一周后回到该点，因此入口也是它的出口。沿加工顺序依次选择
+    使「上一个轮廓出口 -> 入口 -> 下一个轮廓当前入口」两段空行程之和最小的顶点，
+    只有入口和出口都确定后才前进到下一个轮廓，因此总空行程不会增加；
+    下一个轮廓离得很远时，所选入口即为离上一个轮廓出口最近的顶点。
+    开放轮廓的入口固定为第一个点。每个轮廓内的候选顶点以向量化方式比较
+
+    Args:
+        contours (list): 轮廓点数组列表，闭合轮廓的最后一点与第一点重合
+        order (numpy.ndarray): 加工顺序
+        closed (numpy.ndarray): 闭合轮廓掩码
+        origin (tuple): 起始位置 (X, Y)
+        entries (numpy.ndarray): 当前的入口顶点序号，None时均为0
+
+    Returns:
+        numpy.ndarray: 每个轮廓的入口顶点序号
+    """
+    entries = np.zeros(len(contours), dtype=np.int64) if entries is None else entries.copy()
+    order = np.asarray(order, dtype=np.int64).tolist()
+    exit_point = np.asarray(origin, dtype=float)
+    for position, index in enumerate(order):
+        contour = contours[index]
+        if not closed[index]:
+            exit_point = contour[-1, :2]
+            continue
+        vertices = contour[:-1, :2]
+        cost = np.hypot(vertices[:, 0] - exit_point[0], vertices[:, 1] - exit_point[1])
+        if position + 1 < len(order):
+            following = order[position + 1]
+            next_entry = contours[following][entries[following], :2]
+            cost += np.hypot(vertices[:, 0] - next_entry[0], vertices[:, 1] - next_entry[1])
+        entry = int(np.argmin(cost))
+        entries[index] = entry
+        exit_point = vertices[entry]
+    return entries
+
+
+def rotate_contour(contour, entry):
+    """
+    将闭合轮廓旋转为从第entry个顶点开始（并回到该点），经过的顶点和方向不变
+
+    Args:
+        contour (numpy.ndarray): (N, 3) 闭合轮廓，最后一点与第一点重合
+        entry (int): 入口顶点序号
+
+    Returns:
+        numpy.ndarray: 旋转后的轮廓
+    """
+    if entry == 0:
+        return contour
+    return np.concatenate((contour[entry:-1], contour[:entry], contour[entry:entry + 1]))
+
+
+def plan_contours(contours, origin=(0.0, 0.0), time_ms=DEFAULT_ORDER_TIME_MS):
+    """
+    联合确定轮廓的加工顺序和闭合轮廓的入口
+
+    先按当前起点排序（用一半时间预算），再沿该顺序为闭合轮廓选择入口；
+    入口改变后的起点和终点再用剩余时间预算做一次 2-opt/Or-opt 改进，最后按最终顺序重新选择入口
+
+    Args:
+        contours (list): 轮廓点数组 (N, 3) 列表
+        origin (tuple): 起始位置 (X, Y)
+        time_ms (float): 局部搜索的总时间预算 (毫秒)
+
+    Returns:
+        tuple: (轮廓顺序, 每个轮廓的入口顶点序号, 报告)，报告在 order_contours 的基础上增加
+               未选择入口时的改进结果 'ordered'、最终结果 'optimized' (mm) 和闭合轮廓数 'closed'
+    """
+    start_time = time()
+    closed = closed_contour_mask(contours)
+    starts, ends = contour_endpoints(contours)
+    has_closed = bool(closed.any())
+    order, report = order_contours(starts, ends, origin, time_ms / 2 if has_closed else time_ms)
+    entries = np.zeros(len(contours), dtype=np.int64)
+    report['ordered'] = report['optimized']
+
+    if has_closed:
+        rows = np.nonzero(closed)[0]
+        for refine in (True, False):
+            entries = choose_entry_points(contours, order, closed, origin, entries)
+            points = np.array([contours[row][entries[row], :2] for row in rows.tolist()])
+            starts[rows] = points
+            ends[rows] = points
+            if refine:
+                order = refine_order(order, starts, ends, origin, time_ms=time_ms / 2)
+        report['optimized'] = rapid_length(order, starts, ends, origin)
+
+    report['closed'] = int(closed.sum())
+    report['elapsed'] = time() - start_time
+    return order, entries, report
@@ -9,15 +9,95 @@ STP文件转FANUC G代码转换器
 import sys
 import os
 import argparse
-import re
 import math
 import numpy as np
 from time import time
 
+from step_tokenizer import (scan_step_file, parse_point_table, parse_ref_table, parse_edge_curve,
+                            parse_oriented_edge, DEFAULT_ENTITY_TYPES, EDGE_CURVE_TYPE, ORIENTED_EDGE_TYPE,
+                            VERTEX_POINT_TYPE)
+
+# 默认顶点焊接容差 (mm)
+DEFAULT_WELD_TOLERANCE = 1e-3
+
+def weld_points(points, tolerance):
+    """
+    使用均匀网格合并近似重合的点
+    
+    按点的顺序依次处理：与已有代表点的距离不超过容差时吸附到最近的代表点，否则自身成为新的代表点。
+    每个点最多移动一个容差，不会像传递合并那样沿一串相距略小于容差的点累积移动。
+    网格单元边长为容差，距离不超过容差的点一定在相邻（含自身）单元中；
+    单元中只有一个点且相邻单元都为空的点（通常占绝大多数）直接作为代表点，其余点逐个处理
+    
+    Args:
+        points (numpy.ndarray): 点坐标 (N, 3)
+        tolerance (float): 焊接容差 (mm)
+    
+    Returns:
+        tuple: (welded, count) —— 每个点替换为其代表点后的坐标 (N, 3)，以及被合并的点数
+    """
+    if len(points) == 0:
+        return points, 0
+    
+    cells = np.floor(points / tolerance).astype(np.int64)
+    
+    # 每个轴的网格坐标转为在该轴已占用坐标中的序号，使单元可编码为一维键
+    axis_values = [np.unique(cells[:, axis]) for axis in range(3)]
+    sizes = [len(values) for values in axis_values]
+    ranks = np.column_stack([np.searchsorted(axis_values[axis], cells[:, axis]) for axis in range(3)])
+    keys = (ranks[:, 0] * sizes[1] + ranks[:, 1]) * sizes[2] + ranks[:, 2]
+    cell_keys, cell_of, cell_counts = np.unique(keys, return_inverse=True, return_counts=True)
+    cell_of = cell_of.reshape(-1)
+    
+    # 单元中只有一个点且相邻单元都为空时，该点不会与其他点合并
+    cell_cells = np.zeros((len(cell_keys), 3), dtype=np.int64)
+    cell_cells[cell_of] = cells
+    crowded = cell_counts > 1
+    offsets = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+               if (dx, dy, dz) != (0, 0, 0)]
+    # 每个轴平移 -1、0、1 后的序号及该坐标是否被占用
+    shifted = []
+    for axis in range(3):
+        coordinate = cell_cells[:, axis]
+        by_delta = {}
+        for delta in (-1, 0, 1):
+            rank = np.minimum(np.searchsorted(axis_values[axis], coordinate + delta), sizes[axis] - 1)
+            by_delta[delta] = (rank, axis_values[axis][rank] == coordinate + delta)
+        shifted.append(by_delta)
+    for offset in offsets:
+        (rx, ex), (ry, ey), (rz, ez) = (shifted[axis][offset[axis]] for axis in range(3))
+        exists = ex & ey & ez
+        target_keys = (rx * sizes[1] + ry) * sizes[2] + rz
+        neighbor = np.minimum(np.searchsorted(cell_keys, target_keys), len(cell_keys) - 1)
+        crowded |= exists & (cell_keys[neighbor] == target_keys)
+    
+    # 其余点按顺序吸附到容差内最近的代表点，或成为新的代表点
+    representative = np.arange(len(points))
+    representatives = {}  # 单元坐标 -> 该单元中的代表点 (序号, x, y, z) 列表
+    limit = tolerance ** 2
+    neighborhood = [(0, 0, 0)] + offsets
+    pending = np.flatnonzero(crowded[cell_of])
+    for index, (x, y, z), (cx, cy, cz) in zip(pending.tolist(), points[pending].tolist(),
+                                               cells[pending].tolist()):
+        best, best_distance = -1, limit
+        for dx, dy, dz in neighborhood:
+            for candidate, rx, ry, rz in representatives.get((cx + dx, cy + dy, cz + dz), ()):
+                distance = (rx - x) ** 2 + (ry - y) ** 2 + (rz - z) ** 2
+                if distance <= best_distance:
+                    best, best_distance = candidate, distance
+        if best >= 0:
+            representative[index] = best
+        else:
+            representatives.setdefault((cx, cy, cz), []).append((index, x, y, z))
+    
+    welded = points[representative]
+    count = int(np.count_nonzero(np.any(welded != points, axis=1)))
+    return welded, count
+
 class FanucStepToGcode:
     def __init__(self, input_file, output_file=None, feed_rate=500, 
                  rapid_feed_rate=5000, safety_height=10.0, cut_depth=0.5, 
-                 tool_diameter=3.0, program_number=1000):
+                 tool_diameter=3.0, program_number=1000, weld_tolerance=DEFAULT_WELD_TOLERANCE):
         """
         初始化STEP到FANUC G代码转换器
         
@@ -30,6 +110,7 @@ class FanucStepToGcode:
             cut_depth (float): 每次切割深度 (mm)
             tool_diameter (float): 刀具直径 (mm)
             program_number (int): FANUC程序编号
+            weld_tolerance (float): 顶点焊接容差 (mm)，0表示不焊接
         """
         self.input_file = input_file
         self.output_file = output_file or self._default_output_file()
@@ -39,15 +120,17 @@ class FanucStepToGcode:
         self.cut_depth = cut_depth
         self.tool_diameter = tool_diameter
         self.program_number = program_number
+        self.weld_tolerance = weld_tolerance
         
         self.current_z = 0.0
         self.current_x = 0.0
         self.current_y = 0.0
         
         self.gcode_lines = []
-        self.vertices = []  # 存储所有顶点坐标
+        self.vertices = []  # 存储所有顶点坐标 (解析后为 (N, 3) 数组)
         self.edges = []     # 存储所有边
         self.bounds = None  # 存储边界信息
+        self.welded_count = 0  # 焊接合并的顶点数
         
     def _default_output_file(self):
         """为输入文件生成默认的输出文件名"""
@@ -63,52 +146,45 @@ class FanucStepToGcode:
         print(f"正在解析STEP文件: {self.input_file}")
         start_time = time()
         
-        # 读取文件内容
-        with open(self.input_file, 'r', errors='ignore') as f:
-            content = f.read()
-        
-        # 提取顶点信息 (CARTESIAN_POINT)
-        cartesian_point_pattern = r'#(\d+)=CARTESIAN_POINT\(\'.*?\',\((.*?)\)\);'
-        point_matches = re.finditer(cartesian_point_pattern, content)
+        # 单次扫描DATA段，按实体类型填充各表
+        tables = scan_step_file(self.input_file, DEFAULT_ENTITY_TYPES + (VERTEX_POINT_TYPE,))
+        print(f"单次扫描DATA段完成: {tables.summary()}")
         
-        points_dict = {}  # 使用ID作为键存储点
-        for match in point_matches:
-            point_id = int(match.group(1))
-            coords_str = match.group(2)
-            # 去除可能的空格，分割坐标
-            coords = np.array([float(x.strip()) for x in coords_str.split(',')])
-            if len(coords) == 3:  # 确保是3D点
-                points_dict[point_id] = coords
-                self.vertices.append(coords)
+        # 提取顶点信息 (CARTESIAN_POINT)，所有坐标由一次NumPy调用批量解析为 (N, 3) 数组
+        point_ids, self.vertices = parse_point_table(tables)
+        points_dict = {point_id: row for row, point_id in enumerate(point_ids.tolist())}  # ID到行号的映射
         
         print(f"找到 {len(points_dict)} 个点")
         
+        # EDGE_CURVE的端点通常引用VERTEX_POINT，再由其引用CARTESIAN_POINT
+        vertex_ids, vertex_point_ids = parse_ref_table(tables, VERTEX_POINT_TYPE, (1,))
+        vertex_points = dict(zip(vertex_ids.tolist(), vertex_point_ids[:, 0].tolist()))
+        
+        # 焊接近似重合的顶点，避免轮廓因端点的微小差异断成多段
+        self.weld_vertices()
+        
         # 提取线段信息 - 扩展搜索模式
         # 首先找到所有EDGE_CURVE实体
-        edge_curve_pattern = r'#(\d+)=EDGE_CURVE\(\'.*?\',#(\d+),#(\d+),#(\d+).*?\);'
-        edge_matches = re.finditer(edge_curve_pattern, content)
-        
         edge_ids = {}  # 存储边ID与对应的起点终点ID
-        for match in edge_matches:
-            edge_id = int(match.group(1))
-            start_id = int(match.group(2))
-            end_id = int(match.group(3))
-            edge_ids[edge_id] = (start_id, end_id)
+        for edge_id, params in tables.records(EDGE_CURVE_TYPE):
+            edge = parse_edge_curve(params)
+            if edge is not None:
+                edge_ids[edge_id] = (vertex_points.get(edge[0], edge[0]), vertex_points.get(edge[1], edge[1]))
         
         print(f"找到 {len(edge_ids)} 个EDGE_CURVE实体")
         
         # 然后找所有ORIENTED_EDGE实体，它们引用了EDGE_CURVE
-        oriented_edge_pattern = r'#\d+=ORIENTED_EDGE\(\'.*?\',\*,\*,#(\d+),.*?\);'
-        oriented_matches = re.finditer(oriented_edge_pattern, content)
-        
         used_edges = set()
-        for match in oriented_matches:
-            edge_ref_id = int(match.group(1))
+        for _, params in tables.records(ORIENTED_EDGE_TYPE):
+            oriented = parse_oriented_edge(params)
+            if oriented is None:
+                continue
+            edge_ref_id = oriented[0]
             if edge_ref_id in edge_ids and edge_ref_id not in used_edges:
                 start_id, end_id = edge_ids[edge_ref_id]
                 if start_id in points_dict and end_id in points_dict:
-                    start_point = points_dict[start_id]
-                    end_point = points_dict[end_id]
+                    start_point = self.vertices[points_dict[start_id]]
+                    end_point = self.vertices[points_dict[end_id]]
                     self.edges.append((start_point, end_point))
                     used_edges.add(edge_ref_id)
         
@@ -118,7 +194,7 @@ class FanucStepToGcode:
         if len(self.edges) < 10 and len(points_dict) > 0:
             print("尝试使用直接连接相邻点的方式构建边...")
             # 将点按照X和Y坐标排序
-            sorted_points = sorted(self.vertices, key=lambda p: (p[0], p[1]))
+            sorted_points = self.vertices[np.lexsort((self.vertices[:, 1], self.vertices[:, 0]))]
             
             # 连接相邻点形成边
             for i in range(len(sorted_points) - 1):
@@ -132,9 +208,8 @@ class FanucStepToGcode:
         
         # 计算边界
         if len(self.vertices) > 0:
-            vertices_array = np.array(self.vertices)
-            min_coords = np.min(vertices_array, axis=0)
-            max_coords = np.max(vertices_array, axis=0)
+            min_coords = np.min(self.vertices, axis=0)
+            max_coords = np.max(self.vertices, axis=0)
             
             self.bounds = (min_coords[0], min_coords[1], min_coords[2], 
                            max_coords[0], max_coords[1], max_coords[2])
@@ -145,6 +220,16 @@ class FanucStepToGcode:
         
         print(f"STEP文件解析完成，用时 {time() - start_time:.2f} 秒")
 
+    def weld_vertices(self):
+        """按焊接容差合并近似重合的顶点，顶点行号保持不变"""
+        if self.weld_tolerance <= 0 or len(self.vertices) == 0:
+            return
+        
+        start_time = time()
+        self.vertices, self.welded_count = weld_points(self.vertices, self.weld_tolerance)
+        print(f"顶点焊接: 合并了 {self.welded_count} 个近似重合的顶点 "
+              f"(容差 {self.weld_tolerance} mm)，用时 {time() - start_time:.2f} 秒")
+
     def extract_contours(self):
         """
         从边中提取轮廓
@@ -282,7 +367,7 @@ class FanucStepToGcode:
             self.parse_step_file()
             
             # 如果没有找到顶点或边，则退出
-            if not self.vertices or not self.edges:
+            if len(self.vertices) == 0 or not self.edges:
                 print("错误: 无法在STEP文件中找到足够的几何信息")
                 return False
             
@@ -344,6 +429,8 @@ def main():
     parser.add_argument('-d', '--cut-depth', type=float, default=0.5, help='每次切割深度 (mm)')
     parser.add_argument('-t', '--tool-diameter', type=float, default=3.0, help='刀具直径 (mm)')
     parser.add_argument('-p', '--program-number', type=int, default=1000, help='FANUC程序编号')
+    parser.add_argument('--weld-tol', type=float, default=DEFAULT_WELD_TOLERANCE,
+                        help='顶点焊接容差 (mm)，0表示不焊接')
     
     args = parser.parse_args()
     
@@ -355,7 +442,8 @@ def main():
         safety_height=args.safety_height,
         cut_depth=args.cut_depth,
         tool_diameter=args.tool_diameter,
-        program_number=args.program_number
+        program_number=args.program_number,
+        weld_tolerance=args.weld_tol
     )
     
     success = converter.convert()
@@ -9,10 +9,12 @@ STP文件转FANUC G代码转换器 (无NumPy依赖版本)
 import sys
 import os
 import argparse
-import re
 import math
 from time import time
 
+from step_tokenizer import (scan_step_file, parse_point, parse_edge_curve, parse_oriented_edge,
+                            POINT_TYPE, EDGE_CURVE_TYPE, ORIENTED_EDGE_TYPE)
+
 class FanucStepToGcodeNoNumpy:
     def __init__(self, input_file, output_file=None, feed_rate=500, 
                  rapid_feed_rate=5000, safety_height=10.0, cut_depth=0.5, 
@@ -62,21 +64,15 @@ class FanucStepToGcodeNoNumpy:
         print(f"正在解析STEP文件: {self.input_file}")
         start_time = time()
         
-        # 读取文件内容
-        with open(self.input_file, 'r', errors='ignore') as f:
-            content = f.read()
+        # 单次扫描DATA段，按实体类型填充各表
+        tables = scan_step_file(self.input_file)
+        print(f"单次扫描DATA段完成: {tables.summary()}")
         
         # 提取顶点信息 (CARTESIAN_POINT)
-        cartesian_point_pattern = r'#(\d+)=CARTESIAN_POINT\(\'.*?\',\((.*?)\)\);'
-        point_matches = re.finditer(cartesian_point_pattern, content)
-        
         points_dict = {}  # 使用ID作为键存储点
-        for match in point_matches:
-            point_id = int(match.group(1))
-            coords_str = match.group(2)
-            # 去除可能的空格，分割坐标
-            coords = [float(x.strip()) for x in coords_str.split(',')]
-            if len(coords) == 3:  # 确保是3D点
+        for point_id, params in tables.records(POINT_TYPE):
+            coords = parse_point(params)
+            if coords is not None and len(coords) == 3:  # 确保是3D点
                 points_dict[point_id] = coords
                 self.vertices.append(coords)
         
@@ -84,25 +80,21 @@ class FanucStepToGcodeNoNumpy:
         
         # 提取线段信息 - 扩展搜索模式
         # 首先找到所有EDGE_CURVE实体
-        edge_curve_pattern = r'#(\d+)=EDGE_CURVE\(\'.*?\',#(\d+),#(\d+),#(\d+).*?\);'
-        edge_matches = re.finditer(edge_curve_pattern, content)
-        
         edge_ids = {}  # 存储边ID与对应的起点终点ID
-        for match in edge_matches:
-            edge_id = int(match.group(1))
-            start_id = int(match.group(2))
-            end_id = int(match.group(3))
-            edge_ids[edge_id] = (start_id, end_id)
+        for edge_id, params in tables.records(EDGE_CURVE_TYPE):
+            edge = parse_edge_curve(params)
+            if edge is not None:
+                edge_ids[edge_id] = edge[:2]
         
         print(f"找到 {len(edge_ids)} 个EDGE_CURVE实体")
         
         # 然后找所有ORIENTED_EDGE实体，它们引用了EDGE_CURVE
-        oriented_edge_pattern = r'#\d+=ORIENTED_EDGE\(\'.*?\',\*,\*,#(\d+),.*?\);'
-        oriented_matches = re.finditer(oriented_edge_pattern, content)
-        
         used_edges = set()
-        for match in oriented_matches:
-            edge_ref_id = int(match.group(1))
+        for _, params in tables.records(ORIENTED_EDGE_TYPE):
+            oriented = parse_oriented_edge(params)
+            if oriented is None:
+                continue
+            edge_ref_id = oriented[0]
             if edge_ref_id in edge_ids and edge_ref_id not in used_edges:
                 start_id, end_id = edge_ids[edge_ref_id]
                 if start_id in points_dict and end_id in points_dict:
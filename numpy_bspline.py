@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量B样条曲线求值 (基于NumPy)
+次数和控制点数相同的曲线归为一组，组内所有曲线的所有采样参数在一次数组运算中完成
+Cox-de Boor 基函数计算和控制点加权，替代逐条曲线创建geomdl曲线对象并计算 evalpts 的方式。
+结果为不规则数组：所有采样点按曲线顺序拼接，并给出每条曲线的起止偏移
+"""
+
+import numpy as np
+
+
+def clamped_uniform_knots(degree, count):
+    """
+    两端夹紧的均匀节点向量（与 geomdl utilities.generate_knot_vector 相同）
+
+    Args:
+        degree (int): 次数
+        count (int): 控制点数量
+
+    Returns:
+        numpy.ndarray: 长度为 count + degree + 1 的节点向量，定义域为 [0, 1]
+    """
+    interior = count - degree - 1
+    middle = np.arange(1, interior + 1) / (interior + 1) if interior > 0 else np.empty(0)
+    return np.concatenate([np.zeros(degree + 1), middle, np.ones(degree + 1)])
+
+
+def expand_knots(multiplicities, knots):
+    """将STEP中的 (重复度列表, 节点值列表) 展开为完整节点向量"""
+    return np.repeat(np.asarray(knots, dtype=float), np.asarray(multiplicities, dtype=int))
+
+
+def evaluate_bsplines(curves, sample_counts=50, domains=None):
+    """
+    批量计算多条非有理B样条曲线上的采样点
+
+    每条曲线在定义域 [t_p, t_n]（或 domains 给出的参数区间）上按各自的采样点数均匀取参数
+
+    Args:
+        curves (list): 每条曲线为 (次数, 控制点 (n, D), 节点向量或None)，None时使用两端夹紧的均匀节点向量
+        sample_counts (int or sequence): 所有曲线共用的采样点数，或每条曲线各自的采样点数
+        domains (numpy.ndarray): (N, 2) 每条曲线的采样参数区间，如被裁剪的边；None时为整个定义域
+
+    Returns:
+        tuple: (points, offsets)，第i条曲线的采样点为 points[offsets[i]:offsets[i + 1]]；
+               次数、控制点数或节点向量长度不一致的曲线没有采样点
+    """
+    curve_count = len(curves)
+    counts = np.broadcast_to(np.asarray(sample_counts, dtype=np.int64), (curve_count,)).copy()
+    groups, valid, _ = _group_curves(curves)
+    counts[~valid] = 0
+
+    counts = np.maximum(counts, 0)
+    offsets = np.zeros(curve_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    params = np.zeros(offsets[-1])
+
+    for degree, indices, control_points, knots in groups:
+        group_counts = counts[indices]
+        if group_counts.sum() == 0:
+            continue
+        # 展开为 (所属曲线, 参数) 的扁平数组，各曲线的采样点数可以不同
+        owner = np.repeat(np.arange(len(indices)), group_counts)
+        starts = np.cumsum(group_counts) - group_counts
+        local = np.arange(len(owner)) - np.repeat(starts, group_counts)
+        fraction = local / np.maximum(group_counts - 1, 1)[owner]
+        low, high = _group_domains(degree, control_points, knots, indices, domains)
+        params[np.repeat(offsets[indices], group_counts) + local] = low[owner] + fraction * (high - low)[owner]
+
+    return evaluate_bsplines_at(curves, params, offsets)
+
+
+def evaluate_bsplines_at(curves, params, offsets):
+    """
+    在给定参数处批量计算多条非有理B样条曲线上的点
+
+    Args:
+        curves (list): 与 evaluate_bsplines 相同的 (次数, 控制点, 节点向量或None) 列表
+        params (numpy.ndarray): 所有曲线的采样参数，按曲线顺序拼接
+        offsets (numpy.ndarray): (N + 1,) 第i条曲线的参数为 params[offsets[i]:offsets[i + 1]]
+
+    Returns:
+        tuple: (points, offsets)，无效曲线的参数区间为空
+    """
+    params = np.asarray(params, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    groups, valid, dimension = _group_curves(curves)
+    counts = np.diff(offsets)
+    counts[~valid] = 0
+    keep = np.repeat(valid, np.diff(offsets))
+    params = params[keep]
+    offsets = np.zeros(len(curves) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    points = np.zeros((offsets[-1], dimension))
+
+    for degree, indices, control_points, knots in groups:
+        group_counts = counts[indices]
+        if group_counts.sum() == 0:
+            continue
+        owner = np.repeat(np.arange(len(indices)), group_counts)
+        starts = np.cumsum(group_counts) - group_counts
+        local = np.arange(len(owner)) - np.repeat(starts, group_counts)
+        # 按曲线读取和写回不规则数组中的位置
+        target = np.repeat(offsets[indices], group_counts) + local
+        points[target] = _evaluate_group(degree, control_points, knots, owner, params[target])
+
+    return points, offsets
+
+
+def bspline_sample_params(curves, tolerance, max_count=10000, domains=None):
+    """
+    按弦高误差为每条B样条曲线选择采样参数
+
+    定义域内的每个不同节点值都是采样参数：一次曲线（折线）的采样点即为控制点，
+    重节点处可能出现的尖角也一定被采到。每个节点区间内曲线光滑，以该区间上非零的二阶导数曲线控制点
+    估计 |C''| 的上界 M（凸包性质），区间长度为 L 时均匀取 ceil(L * sqrt(M / (8 * tolerance))) 段，
+    弦高误差不超过 tolerance。总点数超过 max_count 时各区间按比例减少段数（每个区间至少1段），
+    此时误差可能超过容差
+
+    Args:
+        curves (list): 与 evaluate_bsplines 相同的 (次数, 控制点, 节点向量或None) 列表
+        tolerance (float): 弦高误差容差 (mm)
+        max_count (int): 每条曲线的最大采样点数（节点区间数更多时以区间数为准）
+        domains (numpy.ndarray): (N, 2) 每条曲线的采样参数区间，None时为整个定义域
+
+    Returns:
+        tuple: (params, offsets)，可直接传给 evaluate_bsplines_at；无效曲线没有采样参数
+    """
+    counts = np.zeros(len(curves), dtype=np.int64)
+    pieces = []
+    groups, _, _ = _group_curves(curves)
+    for degree, indices, control_points, knots in groups:
+        rate = np.sqrt(_span_second_derivative_bounds(degree, control_points, knots) / (8.0 * tolerance))
+
+        # 每个节点区间与采样区间的交集，参数区间反向的曲线按正向采样后再反转
+        low, high = _group_domains(degree, control_points, knots, indices, domains)
+        reverse = high < low
+        lower, upper = np.minimum(low, high)[:, None], np.maximum(low, high)[:, None]
+        begin = np.clip(knots[:, :-1], lower, upper)
+        length = np.clip(knots[:, 1:], lower, upper) - begin
+        segments = np.where(length > 0, np.maximum(np.ceil(length * rate), 1), 0)
+        empty = segments.sum(axis=1) == 0
+        segments[empty, 0] = 1  # 退化的参数区间只取两个端点
+
+        total = segments.sum(axis=1, keepdims=True)
+        scale = np.minimum((max_count - 1) / total, 1.0)
+        segments = np.where(segments > 0, np.maximum(np.floor(segments * scale), 1), 0).astype(np.int64)
+        group_counts = segments.sum(axis=1) + 1
+
+        # 展开为每个采样参数：各区间内的等分点，最后加上区间终点
+        span_owner = np.repeat(np.arange(segments.size), segments.ravel())
+        span_start = np.cumsum(segments.ravel()) - segments.ravel()
+        step = np.arange(len(span_owner)) - span_start[span_owner]
+        values = begin.ravel()[span_owner] + step / segments.ravel()[span_owner] * length.ravel()[span_owner]
+        curve_owner = span_owner // segments.shape[1]
+        params = np.insert(values, np.cumsum(group_counts - 1), upper[:, 0])
+        owner = np.insert(curve_owner, np.cumsum(group_counts - 1), np.arange(len(indices)))
+        starts = np.cumsum(group_counts) - group_counts
+        local = np.arange(len(params)) - starts[owner]
+        flipped = reverse[owner]
+        local[flipped] = group_counts[owner][flipped] - 1 - local[flipped]
+        ordered = np.empty_like(params)
+        ordered[starts[owner] + local] = params
+
+        counts[indices] = group_counts
+        pieces.append((indices, group_counts, ordered))
+
+    offsets = np.zeros(len(curves) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    params = np.zeros(offsets[-1])
+    for indices, group_counts, values in pieces:
+        owner = np.repeat(np.arange(len(indices)), group_counts)
+        starts = np.cumsum(group_counts) - group_counts
+        params[offsets[indices][owner] + np.arange(len(owner)) - starts[owner]] = values
+    return params, offsets
+
+
+def bspline_derivative(degree, control_points, knots=None):
+    """
+    B样条曲线的一阶导数曲线 (NURBS Book 式3.3)
+
+    Args:
+        degree (int): 次数
+        control_points (numpy.ndarray): (n, D) 控制点
+        knots (numpy.ndarray): 节点向量，None时使用两端夹紧的均匀节点向量
+
+    Returns:
+        tuple: (次数 - 1, 控制点 (n - 1, D), 节点向量)，与原曲线定义域相同
+    """
+    control_points = np.asarray(control_points, dtype=float)
+    count = len(control_points)
+    if knots is None:
+        knots = clamped_uniform_knots(degree, count)
+    knots = np.asarray(knots, dtype=float)
+    spans = (knots[degree + 1:degree + count] - knots[1:count])[:, None]
+    derivative = np.divide(degree * np.diff(control_points, axis=0), spans,
+                           out=np.zeros_like(control_points[1:]), where=spans > 0)
+    return degree - 1, derivative, knots[1:-1]
+
+
+def _span_second_derivative_bounds(degree, control_points, knots):
+    """
+    一组曲线在每个节点区间上 |C''| 的上界
+
+    二阶导数曲线（次数 degree - 2，节点向量 knots[2:-2]）在节点区间 [t_k, t_k+1] 上只有控制点
+    R[k - degree] .. R[k - 2] 的基函数非零，由凸包性质取这些控制点长度的最大值；
+    重节点处的零分母按0处理，一次曲线为0
+
+    Returns:
+        numpy.ndarray: (B, 节点数 - 1) 每个节点区间的上界
+    """
+    batch, count = control_points.shape[:2]
+    bounds = np.zeros((batch, knots.shape[1] - 1))
+    if degree < 2:
+        return bounds
+    first_spans = (knots[:, degree + 1:degree + count] - knots[:, 1:count])[..., None]
+    first = np.divide(degree * np.diff(control_points, axis=1), first_spans,
+                      out=np.zeros_like(control_points[:, 1:]), where=first_spans > 0)
+    second_spans = (knots[:, degree + 1:degree + count - 1] - knots[:, 2:count])[..., None]
+    second = np.divide((degree - 1) * np.diff(first, axis=1), second_spans,
+                       out=np.zeros_like(first[:, 1:]), where=second_spans > 0)
+    magnitude = np.linalg.norm(second, axis=2)
+    span = np.arange(knots.shape[1] - 1)
+    for shift in range(degree - 1):
+        bounds = np.maximum(bounds, magnitude[:, np.clip(span - degree + shift, 0, count - 3)])
+    return bounds
+
+
+def _group_domains(degree, control_points, knots, indices, domains):
+    """一组曲线的采样参数区间 (low, high)"""
+    if domains is None:
+        return knots[:, degree], knots[:, control_points.shape[1]]
+    domains = np.asarray(domains, dtype=float)[indices]
+    return domains[:, 0], domains[:, 1]
+
+
+def _group_curves(curves):
+    """
+    按 (次数, 控制点数, 维数) 将曲线分组
+
+    Returns:
+        tuple: (分组列表 [(次数, 曲线序号, 控制点 (B, n, D), 节点向量 (B, m))], 有效曲线掩码, 维数)
+    """
+    valid = np.zeros(len(curves), dtype=bool)
+    dimension = 3
+    members = {}
+    for index, (degree, control_points, knots) in enumerate(curves):
+        control_points = np.asarray(control_points, dtype=float)
+        if control_points.ndim != 2 or len(control_points) <= degree or degree < 1:
+            continue
+        dimension = control_points.shape[1]
+        if knots is None:
+            knots = clamped_uniform_knots(degree, len(control_points))
+        elif len(knots) != len(control_points) + degree + 1:
+            continue
+        valid[index] = True
+        key = (int(degree), len(control_points), dimension)
+        members.setdefault(key, []).append((index, control_points, np.asarray(knots, dtype=float)))
+
+    groups = [(degree, np.array([member[0] for member in group]),
+               np.stack([member[1] for member in group]), np.stack([member[2] for member in group]))
+              for (degree, _, _), group in members.items()]
+    return groups, valid, dimension
+
+
+def _evaluate_group(degree, control_points, knots, owner, params):
+    """
+    对一组次数和控制点数相同的曲线批量求值
+
+    与 de Boor 递推等价：先对所有采样参数同时计算 degree + 1 个非零基函数 (Cox-de Boor)，
+    再对相应的控制点加权求和。节点和控制点通过扁平数组的 take 批量读取
+
+    Args:
+        degree (int): 次数
+        control_points (numpy.ndarray): (B, n, D) 控制点
+        knots (numpy.ndarray): (B, n + degree + 1) 节点向量
+        owner (numpy.ndarray): (S,) 每个采样参数所属的曲线
+        params (numpy.ndarray): (S,) 采样参数
+
+    Returns:
+        numpy.ndarray: (S, D) 曲线上的点
+    """
+    count, dimension = control_points.shape[1:]
+    knot_count = knots.shape[1]
+    flat_knots = knots.ravel()
+    knot_base = owner * knot_count
+
+    # 节点区间 t[span] <= u < t[span + 1]，定义域末端归入最后一个区间
+    span = np.full(len(params), -1, dtype=np.int64)
+    for column in range(knot_count):
+        span += flat_knots.take(knot_base + column) <= params
+    np.clip(span, degree, count - 1, out=span)
+    knot_base += span
+
+    # 非零基函数 N[span - degree + j], j = 0..degree
+    left = [None] + [params - flat_knots.take(knot_base + 1 - j) for j in range(1, degree + 1)]
+    right = [None] + [flat_knots.take(knot_base + j) - params for j in range(1, degree + 1)]
+    basis = [np.ones_like(params)]
+    for j in range(1, degree + 1):
+        saved = np.zeros_like(params)
+        for r in range(j):
+            denominator = right[r + 1] + left[j - r]
+            temp = np.divide(basis[r], denominator, out=np.zeros_like(params), where=denominator != 0)
+            basis[r] = saved + right[r + 1] * temp
+            saved = left[j - r] * temp
+        basis.append(saved)
+
+    flat_points = control_points.reshape(-1, dimension)
+    point_base = owner * count + span - degree
+    points = np.zeros((len(params), dimension))
+    for j in range(degree + 1):
+        points += basis[j][:, None] * flat_points.take(point_base + j, axis=0)
+    return points
@@ -14,10 +14,159 @@ import re
 import numpy as np
 from time import time
 
+from toolpath import Toolpath
+from contour_ordering import DEFAULT_ORDER_TIME_MS, plan_contours, rotate_contour
+
+# 前一轮廓终点与下一轮廓起点距离不超过该值时直接连续切削，不抬刀 (mm)
+LINK_TOLERANCE = 1e-3
+
+# 长度小于该值的向量视为零向量，对应的点不做补偿 (mm)
+DEGENERATE_TOLERANCE = 1e-6
+# 向量化刀具补偿每次处理的点数
+COMPENSATION_CHUNK = 65536
+
+
+def _row_norms(vectors):
+    """
+    逐行向量长度
+
+    与对单个向量调用 np.linalg.norm 使用相同的点积计算（而不是 norm(axis=1) 的逐元素平方求和），
+    舍入完全一致
+    """
+    return np.sqrt(np.matmul(vectors[:, None, :], vectors[:, :, None])[:, 0, 0])
+
+
+def contour_neighbors(toolpath):
+    """
+    每个点在其轮廓内的前一个点和后一个点的序号
+    
+    闭合轮廓在不重复的顶点上首尾相接：最后一点是回到起点的重复点时，第一个点的前一点是倒数第二个点，
+    重复点本身不参与计算（补偿后直接复制第一个点的结果）；没有重复终点的闭合轮廓直接首尾相接。
+    开放轮廓不首尾相接，两端的前一点或后一点记为 -1，只用相邻的一段计算法向量
+    
+    Args:
+        toolpath (Toolpath): 分段刀具路径
+    
+    Returns:
+        tuple: (prev_index (N,), next_index (N,), 重复终点序号, 对应的轮廓第一个点序号)
+    """
+    points = toolpath.points
+    index = np.arange(toolpath.point_count)
+    lengths = toolpath.contour_lengths
+    nonempty = lengths > 0
+    firsts = toolpath.contour_offsets[:-1][nonempty]
+    lasts = toolpath.contour_offsets[1:][nonempty] - 1
+    closed = toolpath.closed[nonempty] & (lengths[nonempty] > 2)
+    repeated = closed & (np.linalg.norm(points[lasts, :2] - points[firsts, :2], axis=1) <= LINK_TOLERANCE)
+    
+    prev_index = index - 1
+    next_index = index + 1
+    # 闭合轮廓：首尾相接，有重复终点时跳过它
+    ring_lasts = np.where(repeated, lasts - 1, lasts)
+    prev_index[firsts[closed]] = ring_lasts[closed]
+    next_index[lasts[closed]] = firsts[closed]
+    # 开放轮廓：两端只有一侧相邻
+    prev_index[firsts[~closed]] = -1
+    next_index[lasts[~closed]] = -1
+    return prev_index, next_index, lasts[repeated], firsts[repeated]
+
+
+def compensate_contours(toolpath, radius):
+    """
+    向量化刀具半径补偿：每个点沿前后两段法向量的平均方向偏移刀具半径
+    
+    前后段按 contour_neighbors 在各自轮廓内取：闭合轮廓在不重复的顶点上首尾相接，
+    入口（闭合）顶点与其他顶点一样偏移刀具半径，重复终点复制入口顶点的结果；开放轮廓两端只用相邻的一段。
+    段长度小于 DEGENERATE_TOLERANCE、或两个法向量相互抵消而无法确定方向的点以掩码处理。
+    每个点的后一段就是下一个点的前一段，段向量、长度和法向量只计算一次；
+    按 COMPENSATION_CHUNK 个点分块计算，临时数组大小固定，可重复使用内存
+    
+    Args:
+        toolpath (Toolpath): 分段刀具路径
+        radius (float): 刀具半径 (mm)
+    
+    Returns:
+        numpy.ndarray: (N, 3) 补偿后的点
+    """
+    path = toolpath.points
+    prev_index, next_index, closing, closing_firsts = contour_neighbors(toolpath)
+    compensated_path = path.copy()
+    for start in range(0, len(path), COMPENSATION_CHUNK):
+        stop = min(start + COMPENSATION_CHUNK, len(path))
+        _compensate_chunk(path, compensated_path, start, stop, prev_index, next_index, radius)
+    compensated_path[closing] = compensated_path[closing_firsts]
+    
+    # 检查并清理NaN值
+    nan_mask = np.isnan(compensated_path).any(axis=1)
+    if np.any(nan_mask):
+        print(f"警告: 发现 {np.sum(nan_mask)} 个无效点，使用原始点代替")
+        compensated_path[nan_mask] = path[nan_mask]
+    
+    return compensated_path
+
+
+def _segment_normals(vectors):
+    """段向量的长度和XY平面内的左法向量 (-y/长度, x/长度)，计算顺序与逐点补偿相同"""
+    magnitude = _row_norms(vectors)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normal_x = -(vectors[:, 1] / magnitude)
+        normal_y = vectors[:, 0] / magnitude
+    return magnitude, normal_x, normal_y
+
+
+def _compensate_chunk(path, out, start, stop, prev_index, next_index, radius):
+    """补偿第 start 至 stop-1 个点，结果写入 out 的对应行"""
+    points = path[start:stop]
+    following = next_index[start:stop]
+    no_next = np.flatnonzero(following < 0)
+    following = path[np.where(following < 0, np.arange(start, stop), following)]
+    next_mag, next_x, next_y = _segment_normals(following - points)
+    
+    # 前一段一般是上一个点的后一段；块的第一个点和轮廓的第一个点单独计算
+    prev = prev_index[start:stop]
+    wrapped = prev != np.arange(start - 1, stop - 1)
+    wrapped[0] = True
+    no_prev = np.flatnonzero(prev < 0)
+    wrapped = np.flatnonzero(wrapped & (prev >= 0))
+    prev_mag = np.empty_like(next_mag)
+    prev_x = np.empty_like(next_x)
+    prev_y = np.empty_like(next_y)
+    prev_mag[1:], prev_x[1:], prev_y[1:] = next_mag[:-1], next_x[:-1], next_y[:-1]
+    if len(wrapped):
+        prev_mag[wrapped], prev_x[wrapped], prev_y[wrapped] = \
+            _segment_normals(points[wrapped] - path[prev[wrapped]])
+    
+    # 开放轮廓的两端只有一段，前后两段都取这一段
+    prev_mag[no_prev], prev_x[no_prev], prev_y[no_prev] = next_mag[no_prev], next_x[no_prev], next_y[no_prev]
+    next_mag[no_next], next_x[no_next], next_y[no_next] = prev_mag[no_next], prev_x[no_next], prev_y[no_next]
+    
+    valid = (prev_mag >= DEGENERATE_TOLERANCE) & (next_mag >= DEGENERATE_TOLERANCE)
+    avg_x = (prev_x + next_x) / 2
+    avg_y = (prev_y + next_y) / 2
+    avg_mag = _row_norms(np.column_stack((avg_x, avg_y)))
+    
+    # 平均法向量接近零时改用前一段的法向量，再不行用后一段的法向量
+    cancelled = np.flatnonzero(valid & (avg_mag < DEGENERATE_TOLERANCE))
+    if len(cancelled):
+        use_prev = _row_norms(np.column_stack((prev_x[cancelled], prev_y[cancelled]))) > DEGENERATE_TOLERANCE
+        use_next = ~use_prev & (_row_norms(np.column_stack((next_x[cancelled], next_y[cancelled])))
+                                > DEGENERATE_TOLERANCE)
+        avg_x[cancelled] = np.where(use_prev, prev_x[cancelled], next_x[cancelled])
+        avg_y[cancelled] = np.where(use_prev, prev_y[cancelled], next_y[cancelled])
+        avg_mag[cancelled] = _row_norms(np.column_stack((avg_x[cancelled], avg_y[cancelled])))
+        valid[cancelled[~(use_prev | use_next)]] = False
+    valid &= avg_mag >= DEGENERATE_TOLERANCE
+    
+    # 法向量的Z分量为0，只偏移XY
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[start:stop, 0] = np.where(valid, points[:, 0] + radius * (avg_x / avg_mag), points[:, 0])
+        out[start:stop, 1] = np.where(valid, points[:, 1] + radius * (avg_y / avg_mag), points[:, 1])
+
+
 class NumPyFanucGcodeGenerator:
     def __init__(self, output_file=None, feed_rate=500, 
                  rapid_feed_rate=5000, safety_height=10.0, cut_depth=0.5, 
-                 tool_diameter=3.0, program_number=1000):
+                 tool_diameter=3.0, program_number=1000, order_time_ms=DEFAULT_ORDER_TIME_MS):
         """
         初始化FANUC G代码生成器
         
@@ -29,6 +178,7 @@ class NumPyFanucGcodeGenerator:
             cut_depth (float): 每次切割深度 (mm)
             tool_diameter (float): 刀具直径 (mm)
             program_number (int): FANUC程序编号
+            order_time_ms (float): 路径优化时轮廓排序 2-opt/Or-opt 改进的时间预算 (毫秒)
         """
         self.output_file = output_file
         self.feed_rate = feed_rate
@@ -37,84 +187,126 @@ class NumPyFanucGcodeGenerator:
         self.cut_depth = cut_depth
         self.tool_diameter = tool_diameter
         self.program_number = program_number
+        self.order_time_ms = order_time_ms
         
         self.current_z = 0.0
         self.current_x = 0.0
         self.current_y = 0.0
         
         self.gcode_lines = []
-        self.path = None
+        self.toolpath = None
         self.bounds = None
+        self.optimization_report = None
+    
+    @property
+    def path(self):
+        """所有轮廓连续存放的 (N, 3) 点数组"""
+        return None if self.toolpath is None else self.toolpath.points
     
     def set_path(self, path, bounds=None):
         """
         设置加工路径
         
         Args:
-            path (numpy.ndarray): 包含加工路径点的NumPy数组
+            path (Toolpath or numpy.ndarray): 分段刀具路径；普通点数组视为一个开放轮廓
             bounds (tuple): 可选，模型边界 (min_x, min_y, min_z, max_x, max_y, max_z)
         """
-        self.path = path
+        if not isinstance(path, Toolpath):
+            path = Toolpath(path, closed=[False] if len(path) else [])
+        self.toolpath = path
         self.bounds = bounds
     
     def optimize_path(self):
         """
         优化加工路径以减少加工时间
         
-        通过调整路径顺序、合并相邻点等方式优化
+        移除轮廓内连续的重复点后以轮廓为单位优化：重新排列轮廓的加工顺序并为闭合轮廓选择入口顶点，
+        轮廓内部的点顺序和切削方向不变。优化前后的代价（每层的空行程、切削长度和抬刀次数）
+        保存在 optimization_report 中
         """
-        if self.path is None or len(self.path) < 3:
+        if self.toolpath is None or self.toolpath.point_count < 3:
             print("警告: 无法优化路径，点数不足")
             return
         
         print("优化加工路径...")
         start_time = time()
+        before = self.path_cost()
         
-        # 1. 移除重复点
-        unique_points, unique_indices = np.unique(self.path.round(decimals=3), axis=0, return_index=True)
-        if len(unique_points) < len(self.path):
-            print(f"移除了 {len(self.path) - len(unique_points)} 个重复点")
-            # 保持原始顺序
-            sorted_indices = np.sort(unique_indices)
-            self.path = self.path[sorted_indices]
-        
-        # 2. 针对大型路径的优化
-        if len(self.path) > 1000:
-            # 将路径分割成相邻点块进行处理
-            block_size = 500  # 每个块的大小
-            num_blocks = math.ceil(len(self.path) / block_size)
-            new_path = []
-            
-            for i in range(num_blocks):
-                start_idx = i * block_size
-                end_idx = min((i + 1) * block_size, len(self.path))
-                block = self.path[start_idx:end_idx]
-                
-                # 如果不是第一个块，确保与前一个块连接
-                if i > 0 and len(new_path) > 0:
-                    # 寻找块中距离前一块最后一点最近的点
-                    last_point = new_path[-1]
-                    distances = np.sum((block - last_point) ** 2, axis=1)
-                    nearest_idx = np.argmin(distances)
-                    
-                    # 重新排序块中的点，从最近点开始
-                    new_block = np.vstack([block[nearest_idx:], block[:nearest_idx]])
-                    new_path.append(new_block)
-                else:
-                    new_path.append(block)
-            
-            # 合并所有块
-            self.path = np.vstack(new_path)
+        # 1. 移除轮廓内连续的重复点（同步更新轮廓边界）
+        self.toolpath, removed = self.toolpath.without_duplicates()
+        if removed:
+            print(f"移除了 {removed} 个重复点")
         
+        # 2. 轮廓排序和入口选择
+        if self.toolpath.contour_count > 1 or self.toolpath.closed.any():
+            self._optimize_contours()
+        
+        after = self.path_cost()
+        self.optimization_report = {'before': before, 'after': after}
+        print(f"  空行程: {before['rapid_length']:.1f} -> {after['rapid_length']:.1f} mm，"
+              f"切削长度: {before['cut_length']:.1f} -> {after['cut_length']:.1f} mm，"
+              f"抬刀次数: {before['retracts']} -> {after['retracts']}（每层）")
         print(f"路径优化完成，用时 {time() - start_time:.2f} 秒")
     
+    def _optimize_contours(self):
+        """在时间预算内重新排列轮廓并旋转闭合轮廓到所选入口；结果的空行程不比当前顺序长时才采用"""
+        contours = self.toolpath.contours()
+        closed = self.toolpath.closed
+        # 闭合轮廓缺少回到起点的点时补上，入口选择和旋转以首尾重合为前提；
+        # 刀具补偿按 Toolpath.closed 跳过这个重复点，入口顶点同样偏移刀具半径
+        contours = [np.vstack((contour, contour[:1]))
+                    if closed[index] and len(contour) > 1 and
+                    math.hypot(*(contour[-1, :2] - contour[0, :2]).tolist()) > LINK_TOLERANCE else contour
+                    for index, contour in enumerate(contours)]
+        
+        order, entries, report = plan_contours(contours, (self.current_x, self.current_y), self.order_time_ms)
+        if report['optimized'] > report['initial']:
+            order = np.arange(len(contours))
+            entries = np.zeros(len(contours), dtype=np.int64)
+        
+        ordered = [rotate_contour(contours[index], entries[index]) for index in order.tolist()]
+        self.toolpath = Toolpath.from_contours(ordered, closed[order])
+    
+    def path_cost(self):
+        """
+        按 write_contours 的加工方式计算当前路径在一个切削层上的代价
+        
+        Returns:
+            dict: 'rapid_length' 从起始位置出发及轮廓之间的快速移动长度（XY, mm），
+                  'cut_length' 切削移动长度（含闭合轮廓回到起点的一段, mm），'retracts' 抬刀次数
+        """
+        toolpath = self.toolpath
+        lengths = toolpath.contour_lengths
+        nonempty = lengths > 0
+        if not nonempty.any():
+            return {'rapid_length': 0.0, 'cut_length': 0.0, 'retracts': 0}
+        starts = toolpath.points[toolpath.contour_offsets[:-1][nonempty], :2]
+        ends = toolpath.points[toolpath.contour_offsets[1:][nonempty] - 1, :2]
+        
+        # 轮廓内的切削段（不跨越轮廓边界），以及未显式回到起点的闭合轮廓的闭合段
+        segments = np.linalg.norm(np.diff(toolpath.points[:, :2], axis=0), axis=1)
+        owner = toolpath.point_owner()
+        closing = np.linalg.norm(ends - starts, axis=1)
+        closing = closing[toolpath.closed[nonempty] & (lengths[nonempty] > 1) & (closing > LINK_TOLERANCE)]
+        
+        # 与 write_contours 相同：第一个轮廓之前总要抬刀，之后起点与前一终点不重合时抬刀
+        exits = np.vstack(([[self.current_x, self.current_y]], ends[:-1]))
+        gaps = np.linalg.norm(starts - exits, axis=1)
+        links = gaps > LINK_TOLERANCE
+        links[0] = True
+        return {
+            'rapid_length': float(gaps[links].sum()),
+            'cut_length': float(segments[owner[1:] == owner[:-1]].sum() + closing.sum()),
+            'retracts': int(links.sum()),
+        }
+    
     def apply_tool_compensation(self):
         """
         应用刀具半径补偿
         
         根据刀具直径计算实际加工路径
         """
-        if self.path is None or len(self.path) < 3:
+        if self.toolpath is None or self.toolpath.point_count < 3:
             print("警告: 无法应用刀具补偿，点数不足")
             return
         
@@ -127,71 +319,9 @@ class NumPyFanucGcodeGenerator:
         # 刀具半径
         radius = self.tool_diameter / 2.0
         
-        # 创建新路径数组
-        compensated_path = np.zeros_like(self.path)
-        
-        # 对每个点计算法向量并应用补偿
-        for i in range(len(self.path)):
-            prev_i = (i - 1) % len(self.path)
-            next_i = (i + 1) % len(self.path)
-            
-            # 计算前后向量
-            prev_vec = self.path[i] - self.path[prev_i]
-            next_vec = self.path[next_i] - self.path[i]
-            
-            # 检查向量是否为零向量
-            prev_vec_mag = np.linalg.norm(prev_vec)
-            next_vec_mag = np.linalg.norm(next_vec)
-            
-            # 防止除以零，如果向量太小，使用默认值
-            if prev_vec_mag < 1e-6 or next_vec_mag < 1e-6:
-                # 复制原始点
-                compensated_path[i] = self.path[i]
-                continue
-            
-            # 归一化
-            prev_vec_norm = prev_vec / prev_vec_mag
-            next_vec_norm = next_vec / next_vec_mag
-            
-            # 计算法向量 (2D平面内，假设Z轴不变)
-            prev_normal = np.array([-prev_vec_norm[1], prev_vec_norm[0], 0])
-            next_normal = np.array([-next_vec_norm[1], next_vec_norm[0], 0])
-            
-            # 平均法向量
-            avg_normal = (prev_normal + next_normal) / 2
-            avg_normal_mag = np.linalg.norm(avg_normal)
-            
-            # 防止除以零
-            if avg_normal_mag < 1e-6:
-                # 使用其中一个法向量
-                if np.linalg.norm(prev_normal) > 1e-6:
-                    avg_normal = prev_normal
-                elif np.linalg.norm(next_normal) > 1e-6:
-                    avg_normal = next_normal
-                else:
-                    # 如果无法计算法向量，保持原点不变
-                    compensated_path[i] = self.path[i]
-                    continue
-                
-                avg_normal_mag = np.linalg.norm(avg_normal)
-                if avg_normal_mag < 1e-6:
-                    # 仍然是零向量，保持原点不变
-                    compensated_path[i] = self.path[i]
-                    continue
-            
-            # 归一化平均法向量
-            avg_normal = avg_normal / avg_normal_mag
-            
-            # 应用补偿 (向外偏移)
-            compensated_path[i] = self.path[i] + radius * avg_normal
-        
-        # 检查并清理NaN值
-        nan_mask = np.isnan(compensated_path).any(axis=1)
-        if np.any(nan_mask):
-            print(f"警告: 发现 {np.sum(nan_mask)} 个无效点，使用原始点代替")
-            compensated_path[nan_mask] = self.path[nan_mask]
-        
-        self.path = compensated_path
+        # 所有轮廓一次向量化补偿，前后点只在轮廓内取，不跨越轮廓之间的空行程
+        compensated_path = compensate_contours(self.toolpath, radius)
+        self.toolpath = self.toolpath.with_points(compensated_path)
         print(f"刀具补偿完成，用时 {time() - start_time:.2f} 秒")
     
     def write_fanuc_header(self):
@@ -225,9 +355,40 @@ class NumPyFanucGcodeGenerator:
             "%"  # FANUC程序尾
         ])
     
+    def write_contours(self, z_cut):
+        """
+        在给定切削深度上按顺序加工所有轮廓
+        
+        每个轮廓之前抬刀到安全高度、快速移动到轮廓起点再下刀；前一轮廓的终点与该轮廓起点重合时直接连续切削。
+        闭合轮廓的终点与起点不重合（如输入的闭合轮廓没有重复起点）时补一段回到起点的切削
+        
+        Args:
+            z_cut (float): 切削深度Z值
+        """
+        previous_end = None
+        for index in range(self.toolpath.contour_count):
+            contour = self.toolpath.contour(index)
+            if len(contour) == 0:
+                continue
+            
+            start_x, start_y = contour[0, :2].tolist()
+            if previous_end is None or math.hypot(start_x - previous_end[0], start_y - previous_end[1]) > LINK_TOLERANCE:
+                # 轮廓之间抬刀并快速移动，不在切削深度上进给
+                self.gcode_lines.append(f"G0 Z{self.safety_height}")
+                self.gcode_lines.append(f"G0 X{start_x:.3f} Y{start_y:.3f}")
+                self.gcode_lines.append(f"G1 Z{z_cut:.3f} F{self.feed_rate}")
+            
+            # 使用列表推导式批量格式化G代码行
+            moves = contour[1:, :2].tolist()
+            if self.toolpath.closed[index] and len(contour) > 1 and \
+                    math.hypot(contour[-1, 0] - start_x, contour[-1, 1] - start_y) > LINK_TOLERANCE:
+                moves.append([start_x, start_y])
+            self.gcode_lines.extend([f"G1 X{x:.3f} Y{y:.3f} F{self.feed_rate}" for x, y in moves])
+            previous_end = moves[-1] if moves else [start_x, start_y]
+    
     def generate_gcode(self):
         """生成G代码"""
-        if self.path is None or len(self.path) == 0:
+        if self.toolpath is None or self.toolpath.point_count == 0:
             print("错误: 无法生成G代码，未设置路径")
             return False
         
@@ -246,40 +407,15 @@ class NumPyFanucGcodeGenerator:
             total_depth = max_z - min_z
             num_layers = max(1, math.ceil(total_depth / self.cut_depth))
             
-            # 使用NumPy向量化处理每一层
             for layer in range(num_layers):
                 z_cut = max_z - (layer + 1) * self.cut_depth
                 z_cut = max(z_cut, min_z)  # 确保不低于模型底部
                 
                 self.gcode_lines.append(f"(LAYER {layer+1}/{num_layers}, Z = {z_cut:.3f})")
-                self.gcode_lines.append(f"G0 Z{self.safety_height}")
-                
-                # 移动到第一个点
-                first_point = self.path[0]
-                self.gcode_lines.append(f"G0 X{first_point[0]:.3f} Y{first_point[1]:.3f}")
-                self.gcode_lines.append(f"G1 Z{z_cut:.3f} F{self.feed_rate}")
-                
-                # 优化：使用NumPy批量生成G代码行
-                # 每100点生成一批，以平衡内存使用和效率
-                batch_size = 100
-                for i in range(0, len(self.path), batch_size):
-                    batch = self.path[i:i+batch_size]
-                    # 格式化为G代码行
-                    gcode_batch = [f"G1 X{p[0]:.3f} Y{p[1]:.3f} F{self.feed_rate}" for p in batch]
-                    self.gcode_lines.extend(gcode_batch)
+                self.write_contours(z_cut)
         else:
             # 如果没有边界信息，使用默认切割深度
-            z_cut = -self.cut_depth
-            self.gcode_lines.append(f"G0 Z{self.safety_height}")
-            
-            # 移动到第一个点
-            first_point = self.path[0]
-            self.gcode_lines.append(f"G0 X{first_point[0]:.3f} Y{first_point[1]:.3f}")
-            self.gcode_lines.append(f"G1 Z{z_cut:.3f} F{self.feed_rate}")
-            
-            # 生成加工路径的G代码
-            for point in self.path[1:]:
-                self.gcode_lines.append(f"G1 X{point[0]:.3f} Y{point[1]:.3f} F{self.feed_rate}")
+            self.write_contours(-self.cut_depth)
         
         # 写入G代码尾部
         self.write_fanuc_footer()
@@ -379,6 +515,8 @@ def main():
     parser.add_argument('-p', '--program-number', type=int, default=1000, help='FANUC程序编号')
     parser.add_argument('--no-optimize', action='store_true', help='禁用路径优化')
     parser.add_argument('--no-compensation', action='store_true', help='禁用刀具补偿')
+    parser.add_argument('--order-time-ms', type=float, default=DEFAULT_ORDER_TIME_MS,
+                        help=f'路径优化时轮廓排序 2-opt/Or-opt 改进的时间预算，毫秒 (默认：{DEFAULT_ORDER_TIME_MS})')
     
     args = parser.parse_args()
     
@@ -388,9 +526,9 @@ def main():
         import json
         with open(input_file, 'r') as f:
             data = json.load(f)
-        # 将路径数据转换为NumPy数组
+        # 将路径数据转换为分段刀具路径（可选的轮廓偏移和闭合标志）
         if 'path' in data:
-            path = np.array(data['path'])
+            path = Toolpath(np.array(data['path']), data.get('contour_offsets'), data.get('closed'))
         else:
             print("错误: JSON文件中缺少路径数据")
             return 1
@@ -400,15 +538,15 @@ def main():
             b = data['bounds']
             bounds = (b['min_x'], b['min_y'], b['min_z'], b['max_x'], b['max_y'], b['max_z'])
     elif input_file.endswith('.npy'):
-        # 直接加载NumPy数组
-        path = np.load(input_file)
+        # 加载NumPy数组，同名的 _offsets.npy 和 _closed.npy 存在时恢复轮廓结构
+        path = Toolpath.load(input_file)
         bounds = None
     else:
         print(f"错误: 不支持的输入文件格式: {input_file}")
         return 1
     
     # 检查路径数据
-    if path is None or len(path) < 2:
+    if path is None or path.point_count < 2:
         print("错误: 无效的路径数据")
         return 1
     
@@ -420,7 +558,8 @@ def main():
         safety_height=args.safety_height,
         cut_depth=args.cut_depth,
         tool_diameter=args.tool_diameter,
-        program_number=args.program_number
+        program_number=args.program_number,
+        order_time_ms=args.order_time_ms
     )
     
     # 设置路径
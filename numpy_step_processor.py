@@ -7,106 +7,241 @@ STEP文件处理器 (基于NumPy优化版本)
 """
 
 import os
-import re
+import mmap
 import numpy as np
 from time import time
 
+from concurrent.futures import ProcessPoolExecutor
+
+from step_tokenizer import (scan_step_file, scan_step_range, split_data_ranges, parse_point_table,
+                            parse_ref_table, parse_ref_flag_table, parse_ref_list_table, EntityIndex,
+                            EDGE_CURVE_TYPE, ORIENTED_EDGE_TYPE, VERTEX_POINT_TYPE, EDGE_LOOP_TYPE,
+                            FACE_BOUND_TYPES, TOPOLOGY_ENTITY_TYPES, POINT_TYPE, find_data_section,
+                            read_step_header, count_entity_types, sample_ranges, scan_step_text,
+                            is_compressed_step, open_step_stream, step_stream_size)
+from step_model_cache import StepModelCache, DEFAULT_CACHE_DIR
+from step_offset_index import StepOffsetIndex, scan_reachable
+from contour_ordering import plan_contours, rotate_contour, DEFAULT_ORDER_TIME_MS
+from toolpath import Toolpath
+
+# 解析器版本，解析或轮廓提取结果发生变化时需要递增，使旧缓存失效
+PARSER_VERSION = 3
+
+# 几何轮廓构建时端点的默认吸附容差 (mm)
+DEFAULT_SNAP_TOLERANCE = 1e-3
+
+# 探测模式: DATA段采样字节数，以及估算转换耗时和内存的粗略系数（由样例文件实测得到）
+PROBE_SAMPLE_BYTES = 2 * 1024 * 1024
+PROBE_PARSE_MB_PER_SECOND = 40.0
+PROBE_SECONDS_PER_EDGE = 2e-5
+PROBE_BYTES_PER_ENTITY = 150
+
+# 惰性解析: 形状根实体类型，以及从根出发沿引用继续访问的类型（外观、样式、产品信息和曲面几何不访问）
+# FACE_BOUND 引用环而环不反向引用它，不属于任何面的边界也作为根，以保留环的方向
+LAZY_ROOT_TYPES = ('MANIFOLD_SOLID_BREP', 'ADVANCED_FACE') + FACE_BOUND_TYPES + (EDGE_LOOP_TYPE,)
+LAZY_FOLLOW_TYPES = TOPOLOGY_ENTITY_TYPES + ('CLOSED_SHELL', 'OPEN_SHELL', 'ADVANCED_FACE', 'FACE_SURFACE')
+
+def tables_to_arrays(tables):
+    """将单次扫描得到的实体表批量解析为数值数组"""
+    point_ids, points = parse_point_table(tables)
+    vertex_ids, vertex_point_ids = parse_ref_table(tables, VERTEX_POINT_TYPE, (1,))
+    edge_curve_ids, edge_point_ids = parse_ref_table(tables, EDGE_CURVE_TYPE, (1, 2))
+    oriented_ids, oriented_refs, oriented_senses = parse_ref_flag_table(tables, ORIENTED_EDGE_TYPE, 3, 4)
+    loop_ids, loop_lengths, loop_refs = parse_ref_list_table(tables, EDGE_LOOP_TYPE, 1)
+    
+    # FACE_BOUND 和 FACE_OUTER_BOUND 只需要所引用的环及其方向
+    bounds = [parse_ref_flag_table(tables, bound_type, 1, 2) for bound_type in FACE_BOUND_TYPES]
+    return {
+        'point_ids': point_ids,
+        'points': points,
+        'vertex_ids': vertex_ids,
+        'vertex_point_ids': vertex_point_ids[:, 0],
+        'edge_curve_ids': edge_curve_ids,
+        'edge_point_ids': edge_point_ids,
+        'oriented_ids': oriented_ids,
+        'oriented_refs': oriented_refs,
+        'oriented_senses': oriented_senses,
+        'loop_ids': loop_ids,
+        'loop_lengths': loop_lengths,
+        'loop_refs': loop_refs,
+        'bound_refs': np.concatenate([refs for _, refs, _ in bounds]),
+        'bound_senses': np.concatenate([senses for _, _, senses in bounds])
+    }
+
+def chain_edges(edges_array, tolerance=DEFAULT_SNAP_TOLERANCE):
+    """
+    将无序的边首尾相连成轮廓，均摊O(E)
+    
+    端点坐标按容差量化为网格键，落在同一网格的端点视为同一节点，一次性建立
+    节点到相邻边端点的邻接表（CSR形式）。从首条未使用的边出发，不断取当前
+    节点上的未使用边延伸轮廓，直到没有可连接的边
+    
+    Args:
+        edges_array (numpy.ndarray): 边的端点坐标 (边数, 2, 3)
+        tolerance (float): 端点吸附容差 (mm)，即量化网格的边长
+    
+    Returns:
+        list: 轮廓点数组列表（只保留至少3个点的轮廓），闭合轮廓首尾点相同
+    """
+    endpoints = edges_array.reshape(-1, 3)
+    keys = np.round(endpoints / tolerance).astype(np.int64)
+    _, nodes = np.unique(keys, axis=0, return_inverse=True)
+    nodes = nodes.reshape(-1)
+    
+    # 邻接表：按节点分组的端点序号（端点序号 = 边序号 * 2 + 0/1）
+    # 组内先列出边的终点、再列出起点，各自按边序号排列，与原几何搜索在重合端点上的选择一致
+    entries = np.arange(len(nodes))
+    incidence = np.lexsort((entries >> 1, 1 - (entries & 1), nodes)).tolist()
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(nodes)))).tolist()
+    next_free = offsets[:-1]    # 每个节点上下一个可能未使用的邻接位置，只向前移动
+    nodes = nodes.tolist()
+    
+    used = bytearray(len(edges_array))
+    contours = []
+    for first_edge in range(len(edges_array)):
+        if used[first_edge]:
+            continue
+        used[first_edge] = 1
+        chain = [2 * first_edge, 2 * first_edge + 1]
+        node = nodes[2 * first_edge + 1]
+        
+        while True:
+            position, stop = next_free[node], offsets[node + 1]
+            while position < stop and used[incidence[position] >> 1]:
+                position += 1
+            next_free[node] = position
+            if position == stop:
+                break
+            
+            # 沿找到的边走到它的另一个端点
+            endpoint = incidence[position]
+            used[endpoint >> 1] = 1
+            chain.append(endpoint ^ 1)
+            node = nodes[endpoint ^ 1]
+        
+        if len(chain) > 2:
+            contours.append(endpoints[chain])
+    return contours
+
+def _parse_range(task):
+    """并行解析的工作进程：扫描并解析一个字节范围"""
+    input_file, start, end = task
+    return tables_to_arrays(scan_step_range(input_file, start, end, TOPOLOGY_ENTITY_TYPES))
+
 class NumPyStepProcessor:
-    def __init__(self, input_file):
+    def __init__(self, input_file, use_mmap=False, use_cache=True, cache_dir=DEFAULT_CACHE_DIR, jobs=1,
+                 use_topology=True, snap_tolerance=DEFAULT_SNAP_TOLERANCE, write_index=False, lazy=False,
+                 order_time_ms=DEFAULT_ORDER_TIME_MS):
         """
         初始化STEP文件处理器
         
         Args:
-            input_file (str): 输入STP文件路径
+            input_file (str): 输入STP文件路径，也可以是 .stp.gz 或包含STEP文件的 .zip
+            use_mmap (bool): 是否以内存映射方式按字节读取文件（适用于超大文件）
+            use_cache (bool): 是否使用按文件内容哈希索引的解析模型缓存
+            cache_dir (str): 解析模型缓存目录
+            jobs (int): 并行解析DATA段的进程数
+            use_topology (bool): 是否按EDGE_LOOP拓扑直接构建轮廓，文件中没有环时退回几何搜索
+            snap_tolerance (float): 几何构建轮廓时端点吸附容差 (mm)
+            write_index (bool): 是否在STEP文件旁写入实体字节偏移索引 (.idx.npz)
+            lazy (bool): 是否惰性解析，只解码从形状根实体可达的拓扑实体
+            order_time_ms (float): 轮廓排序时 2-opt/Or-opt 改进的时间预算 (毫秒)
         """
         self.input_file = input_file
+        self.use_mmap = use_mmap
+        self.jobs = max(1, jobs)
+        self.use_topology = use_topology
+        self.snap_tolerance = snap_tolerance
+        self.write_index = write_index
+        self.lazy = lazy
+        self.order_time_ms = order_time_ms
+        self.compressed = is_compressed_step(input_file)
+        if self.compressed and (use_mmap or jobs > 1 or lazy or write_index):
+            print("提示: 压缩文件只能顺序解压，将以流方式单进程扫描，忽略内存映射、并行、惰性解析和偏移索引选项")
+        self.cache = StepModelCache(cache_dir) if use_cache else None
+        self._cache_key = None
         self.points_array = None  # 存储所有点的NumPy数组
         self.edges_array = None   # 存储所有边的NumPy数组
         self.bounds = None        # 存储边界信息
         self.contours = []        # 存储提取的轮廓
+        self.loop_contours = None # 按环拓扑得到的轮廓（点行号数组列表）
     
     def parse_file(self):
         """解析STEP文件并提取几何信息"""
         print(f"正在解析STEP文件: {self.input_file}")
         start_time = time()
         
-        # 读取文件内容
-        with open(self.input_file, 'r', errors='ignore') as f:
-            content = f.read()
-        
-        # 提取顶点信息 (CARTESIAN_POINT)
-        cartesian_point_pattern = r'#(\d+)=CARTESIAN_POINT\(\'.*?\',\((.*?)\)\);'
-        point_matches = re.finditer(cartesian_point_pattern, content)
+        # 扫描DATA段并批量解析为数值数组
+        arrays = self._read_entity_arrays()
         
-        points_dict = {}  # 使用ID作为键存储点
-        points_list = []  # 临时列表存储所有点
+        # 可选：写入实体字节偏移索引，供之后按ID随机访问单个实体（惰性解析时已写入）
+        if self.write_index and not self.lazy and not self.compressed:
+            StepOffsetIndex.open(self.input_file, write=True)
         
-        for match in point_matches:
-            point_id = int(match.group(1))
-            coords_str = match.group(2)
-            # 去除可能的空格，分割坐标
-            coords = [float(x.strip()) for x in coords_str.split(',')]
-            if len(coords) == 3:  # 确保是3D点
-                points_dict[point_id] = coords
-                points_list.append(coords)
-        
-        # 转换为NumPy数组以提高性能
-        if points_list:
-            self.points_array = np.array(points_list)
+        # 提取顶点信息 (CARTESIAN_POINT)
+        point_ids, points = arrays['point_ids'], arrays['points']
+        if len(points) > 0:
+            self.points_array = points
         
-        print(f"找到 {len(points_dict)} 个点")
+        # 点ID到行号的紧凑索引（替代以ID为键的字典）
+        point_index = EntityIndex(point_ids)
+        print(f"找到 {len(point_ids)} 个点")
+        print(f"点ID索引: {point_index.describe(item_bytes=points.itemsize * points.shape[1])}")
         
         # 提取边的信息
-        # 首先找到所有EDGE_CURVE实体
-        edge_curve_pattern = r'#(\d+)=EDGE_CURVE\(\'.*?\',#(\d+),#(\d+),#(\d+).*?\);'
-        edge_matches = re.finditer(edge_curve_pattern, content)
+        # 首先找到所有EDGE_CURVE实体及其起点终点ID
+        edge_curve_ids, edge_point_ids = arrays['edge_curve_ids'], arrays['edge_point_ids']
+        valid = (edge_point_ids >= 0).all(axis=1)
+        edge_curve_ids, edge_point_ids = edge_curve_ids[valid], edge_point_ids[valid]
+        edge_index = EntityIndex(edge_curve_ids)
         
-        edge_ids = {}  # 存储边ID与对应的起点终点ID
-        for match in edge_matches:
-            edge_id = int(match.group(1))
-            start_id = int(match.group(2))
-            end_id = int(match.group(3))
-            edge_ids[edge_id] = (start_id, end_id)
+        # EDGE_CURVE的端点通常引用VERTEX_POINT，再由其引用CARTESIAN_POINT
+        vertex_rows = EntityIndex(arrays['vertex_ids']).lookup(edge_point_ids)
+        via_vertex = vertex_rows >= 0
+        edge_point_ids = edge_point_ids.copy()
+        edge_point_ids[via_vertex] = arrays['vertex_point_ids'][vertex_rows[via_vertex]]
+        curve_point_rows = point_index.lookup(edge_point_ids)
         
-        print(f"找到 {len(edge_ids)} 个EDGE_CURVE实体")
+        print(f"找到 {len(edge_curve_ids)} 个EDGE_CURVE实体")
         
         # 然后找所有ORIENTED_EDGE实体，它们引用了EDGE_CURVE
-        oriented_edge_pattern = r'#\d+=ORIENTED_EDGE\(\'.*?\',\*,\*,#(\d+),.*?\);'
-        oriented_matches = re.finditer(oriented_edge_pattern, content)
-        
-        edges_list = []  # 临时列表存储所有边
-        used_edges = set()
-        
-        for match in oriented_matches:
-            edge_ref_id = int(match.group(1))
-            if edge_ref_id in edge_ids and edge_ref_id not in used_edges:
-                start_id, end_id = edge_ids[edge_ref_id]
-                if start_id in points_dict and end_id in points_dict:
-                    edges_list.append([points_dict[start_id], points_dict[end_id]])
-                    used_edges.add(edge_ref_id)
+        # 通过两级索引一次性向量化解析出每条边起点终点的行号
+        oriented_refs = arrays['oriented_refs']
+        curve_rows = edge_index.lookup(oriented_refs)
+        endpoint_rows = np.full((len(curve_rows), 2), -1, dtype=np.int64)
+        found = curve_rows >= 0
+        endpoint_rows[found] = curve_point_rows[curve_rows[found]]
+        
+        # 只保留端点都存在的边，同一EDGE_CURVE只使用首次出现的引用
+        resolved = (endpoint_rows >= 0).all(axis=1)
+        _, first_refs = np.unique(oriented_refs[resolved], return_index=True)
+        edge_rows = endpoint_rows[resolved][np.sort(first_refs)]
+        
+        # 按 EDGE_LOOP -> ORIENTED_EDGE 的引用顺序直接得到有序轮廓
+        self.loop_contours = None
+        if self.use_topology and len(arrays['loop_ids']) > 0:
+            self.loop_contours = self._build_loop_contours(arrays, endpoint_rows)
+            print(f"按EDGE_LOOP拓扑得到 {len(self.loop_contours)} 个轮廓")
         
         # 如果找到的边不足，使用替代方法
-        if len(edges_list) < 10 and self.points_array is not None:
+        if len(edge_rows) < 10 and self.points_array is not None:
             print("尝试使用基于NumPy的高效方法构建边...")
             
             # 将点按照X和Y坐标排序
             indices = np.lexsort((self.points_array[:, 1], self.points_array[:, 0]))
-            sorted_points = self.points_array[indices]
             
-            # 使用向量化操作创建边
-            edges_list = []
-            for i in range(len(sorted_points) - 1):
-                edges_list.append([sorted_points[i], sorted_points[i+1]])
+            # 使用向量化操作创建边：相邻排序点首尾相连
+            edge_rows = np.column_stack((indices[:-1], indices[1:]))
             
             # 形成闭环
-            if len(sorted_points) > 2:
-                edges_list.append([sorted_points[-1], sorted_points[0]])
+            if len(indices) > 2:
+                edge_rows = np.vstack((edge_rows, [[indices[-1], indices[0]]]))
             
-            print(f"通过NumPy向量化操作创建了 {len(edges_list)} 条边")
+            print(f"通过NumPy向量化操作创建了 {len(edge_rows)} 条边")
         
-        # 转换为NumPy数组
-        if edges_list:
-            self.edges_array = np.array(edges_list)
+        # 按行号一次性取出所有边的端点，得到 (边数, 2, 3) 数组
+        if len(edge_rows) > 0:
+            self.edges_array = self.points_array[np.asarray(edge_rows)]
         
         # 计算边界（使用NumPy高效计算）
         if self.points_array is not None:
@@ -120,7 +255,131 @@ class NumPyStepProcessor:
                   f"Z: {min_coords[2]:.3f} 到 {max_coords[2]:.3f}")
         
         print(f"STEP文件解析完成，用时 {time() - start_time:.2f} 秒")
-        return len(edges_list) > 0
+        return len(edge_rows) > 0
+    
+    def _build_loop_contours(self, arrays, endpoint_rows):
+        """
+        沿 EDGE_LOOP -> ORIENTED_EDGE -> EDGE_CURVE 的引用构建有序轮廓，O(E)
+        
+        ORIENTED_EDGE 方向为 .F. 时反向使用EDGE_CURVE，FACE_BOUND 方向为 .F. 时整个环反向。
+        与边表一致，每条EDGE_CURVE只加工一次：实体中的边已被前面的环使用时，
+        该环在此处断开，剩余的连续边各自成为一段开放轮廓
+        
+        Args:
+            arrays (dict): tables_to_arrays 得到的数值数组
+            endpoint_rows (numpy.ndarray): 每个ORIENTED_EDGE对应EDGE_CURVE起点终点的点行号 (N, 2)
+        
+        Returns:
+            list: 每个轮廓的点行号数组，闭合轮廓首尾点相同
+        """
+        loop_lengths = arrays['loop_lengths']
+        loop_starts = np.concatenate(([0], np.cumsum(loop_lengths)[:-1])).astype(np.int64)
+        
+        # 环的方向：被 .F. 方向的FACE_BOUND引用时反向
+        loop_senses = np.ones(len(loop_lengths), dtype=bool)
+        bound_loops = EntityIndex(arrays['loop_ids']).lookup(arrays['bound_refs'])
+        reversed_bounds = (bound_loops >= 0) & ~arrays['bound_senses']
+        loop_senses[bound_loops[reversed_bounds]] = False
+        
+        # 反向的环在各自范围内倒序排列
+        positions = np.arange(len(arrays['loop_refs']), dtype=np.int64)
+        loop_of = np.repeat(np.arange(len(loop_lengths)), loop_lengths)
+        flip = ~loop_senses[loop_of]
+        positions[flip] = (2 * loop_starts + loop_lengths - 1)[loop_of[flip]] - positions[flip]
+        
+        # 环中每条有向边的起点终点行号，方向为 .F. 时交换
+        oriented_rows = EntityIndex(arrays['oriented_ids']).lookup(arrays['loop_refs'][positions])
+        found = oriented_rows >= 0
+        rows = np.full((len(positions), 2), -1, dtype=np.int64)
+        rows[found] = endpoint_rows[oriented_rows[found]]
+        forward = np.ones(len(positions), dtype=bool)
+        forward[found] = arrays['oriented_senses'][oriented_rows[found]]
+        forward ^= flip
+        starts = np.where(forward, rows[:, 0], rows[:, 1])
+        ends = np.where(forward, rows[:, 1], rows[:, 0])
+        
+        # 可用的边：端点已解析，且是该EDGE_CURVE首次出现
+        usable = np.zeros(len(positions), dtype=bool)
+        curve_ids = np.full(len(positions), -1, dtype=np.int64)
+        curve_ids[found] = arrays['oriented_refs'][oriented_rows[found]]
+        candidates = np.flatnonzero((starts >= 0) & (ends >= 0))
+        _, first = np.unique(curve_ids[candidates], return_index=True)
+        usable[candidates[first]] = True
+        
+        contours = []
+        for start, length in zip(loop_starts.tolist(), loop_lengths.tolist()):
+            ok = usable[start:start + length]
+            if not ok.any():
+                continue
+            start_rows = starts[start:start + length]
+            end_rows = ends[start:start + length]
+            
+            # 与环中前一条边首尾相接的边
+            linked = ok & np.roll(ok, 1) & (np.roll(end_rows, 1) == start_rows)
+            if linked.all():
+                contours.append(np.append(start_rows, start_rows[0]))
+                continue
+            
+            # 从每条不与前一条边相接的边开始，沿环向后收集相接的边
+            for head in np.flatnonzero(ok & ~linked).tolist():
+                run = [head]
+                index = (head + 1) % length
+                while linked[index] and index != head:
+                    run.append(index)
+                    index = (index + 1) % length
+                contours.append(np.append(start_rows[run], end_rows[run[-1]]))
+        
+        # 与几何搜索一致，只保留至少3个点的轮廓
+        return [contour for contour in contours if len(contour) > 2]
+    
+    def _read_entity_arrays(self):
+        """扫描DATA段，返回点、边和有向边的数值数组"""
+        if self.compressed:
+            # 压缩文件：逐块解压并扫描，内存中只保留约一个块的解压内容
+            tables = scan_step_file(self.input_file, TOPOLOGY_ENTITY_TYPES)
+            print(f"流式解压扫描DATA段完成: {tables.summary()}")
+            return tables_to_arrays(tables)
+        
+        if self.lazy:
+            arrays = self._read_reachable_arrays()
+            if arrays is not None:
+                return arrays
+        
+        ranges = split_data_ranges(self.input_file, self.jobs) if self.jobs > 1 else []
+        if len(ranges) <= 1:
+            # 单进程：单次扫描DATA段，按实体类型填充各表
+            tables = scan_step_file(self.input_file, TOPOLOGY_ENTITY_TYPES, use_mmap=self.use_mmap)
+            print(f"单次扫描DATA段完成: {tables.summary()}")
+            return tables_to_arrays(tables)
+        
+        # 多进程：按实体边界切分的字节范围分别解析，再按文件顺序拼接
+        # 实体ID在整个文件中唯一，拼接后统一建立ID索引即完成各分块行号的重映射
+        start_time = time()
+        workers = min(self.jobs, len(ranges))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_parse_range, [(self.input_file, begin, end) for begin, end in ranges]))
+        arrays = {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+        
+        elapsed = time() - start_time
+        size_mb = os.path.getsize(self.input_file) / (1024 * 1024)
+        print(f"并行扫描DATA段完成: {len(ranges)} 个分块，{workers} 个进程，"
+              f"扫描 {size_mb:.2f} MB，用时 {elapsed:.2f} 秒 ({size_mb / max(elapsed, 1e-9):.1f} MB/s)")
+        return arrays
+    
+    def _read_reachable_arrays(self):
+        """惰性解析：借助实体偏移索引从形状根实体出发，只解码可达的拓扑实体；没有根实体时返回None"""
+        index = StepOffsetIndex.open(self.input_file, write=self.write_index)
+        with index:
+            tables = scan_reachable(index, LAZY_ROOT_TYPES, LAZY_FOLLOW_TYPES)
+        if tables.total_entities == 0:
+            print("惰性解析: 未找到形状根实体，改为完整扫描DATA段")
+            return None
+        
+        total_bytes = int(index.entities['length'].sum())
+        print(f"惰性解析完成: 解码 {tables.total_entities}/{len(index)} 个实体，"
+              f"{tables.size_bytes / (1024 * 1024):.2f}/{total_bytes / (1024 * 1024):.2f} MB，"
+              f"用时 {tables.elapsed:.2f} 秒")
+        return tables_to_arrays(tables)
     
     def extract_contours(self):
         """使用NumPy高效提取轮廓"""
@@ -128,119 +387,49 @@ class NumPyStepProcessor:
             print("警告: 无法提取轮廓，没有找到足够的边")
             return False
         
+        if self.loop_contours:
+            # 环拓扑已给出有序轮廓，无需几何搜索
+            self.contours = [self.points_array[rows] for rows in self.loop_contours]
+            print(f"使用EDGE_LOOP拓扑构建了 {len(self.contours)} 个轮廓")
+            return True
+        
         print("正在使用NumPy高效构建轮廓...")
         start_time = time()
         
-        # 将边展平为点集
-        edge_starts = self.edges_array[:, 0, :]  # 所有边的起点
-        edge_ends = self.edges_array[:, 1, :]    # 所有边的终点
-        
-        # 使用NumPy计算所有点之间的距离矩阵
-        # 这种方法对于大型模型非常高效
-        num_edges = len(self.edges_array)
-        used_edges = np.zeros(num_edges, dtype=bool)
-        
-        # 构建轮廓
-        contour_index = 0
-        while not np.all(used_edges):
-            # 找到第一个未使用的边
-            start_edge_idx = np.where(~used_edges)[0][0]
-            used_edges[start_edge_idx] = True
-            
-            # 开始一个新的轮廓
-            current_contour = [edge_starts[start_edge_idx], edge_ends[start_edge_idx]]
-            current_point = edge_ends[start_edge_idx]
-            
-            # 持续寻找连接的边
-            found_next = True
-            while found_next:
-                found_next = False
-                
-                # 计算所有未使用边的起点与当前点之间的距离
-                start_distances = np.sum((edge_starts[~used_edges] - current_point) ** 2, axis=1)
-                end_distances = np.sum((edge_ends[~used_edges] - current_point) ** 2, axis=1)
-                
-                # 找到最近的边
-                if len(start_distances) > 0:
-                    min_start_idx = np.argmin(start_distances)
-                    min_start_dist = start_distances[min_start_idx]
-                    
-                    min_end_idx = np.argmin(end_distances)
-                    min_end_dist = end_distances[min_end_idx]
-                    
-                    # 查找未使用的边索引
-                    unused_indices = np.where(~used_edges)[0]
-                    
-                    # 选择距离最小的连接方式
-                    if min_start_dist < min_end_dist and min_start_dist < 1e-6:
-                        # 连接到起点
-                        next_edge_idx = unused_indices[min_start_idx]
-                        current_point = edge_ends[next_edge_idx]
-                        current_contour.append(current_point)
-                        used_edges[next_edge_idx] = True
-                        found_next = True
-                    elif min_end_dist < 1e-6:
-                        # 连接到终点
-                        next_edge_idx = unused_indices[min_end_idx]
-                        current_point = edge_starts[next_edge_idx]
-                        current_contour.append(current_point)
-                        used_edges[next_edge_idx] = True
-                        found_next = True
-            
-            # 保存轮廓（至少3个点）
-            if len(current_contour) > 2:
-                self.contours.append(np.array(current_contour))
-                contour_index += 1
+        self.contours = chain_edges(self.edges_array, self.snap_tolerance)
         
         print(f"使用NumPy高效构建了 {len(self.contours)} 个轮廓，用时 {time() - start_time:.2f} 秒")
         return len(self.contours) > 0
     
     def get_optimized_path(self):
-        """使用NumPy计算优化的加工路径"""
+        """
+        使用NumPy计算优化的加工路径
+        
+        Returns:
+            Toolpath: 按加工顺序排列的分段刀具路径，每个轮廓一段；没有几何时返回None
+        """
         if not self.contours:
             if self.edges_array is not None:
-                # 如果没有轮廓但有边，直接使用边
+                # 如果没有轮廓但有边，直接使用边，每条边为一个开放轮廓
                 print("使用边直接构建路径...")
-                return self.edges_array.reshape(-1, 3)  # 将边展平为点序列
+                offsets = np.arange(0, 2 * len(self.edges_array) + 1, 2, dtype=np.int64)
+                return Toolpath(self.edges_array.reshape(-1, 3), offsets, np.zeros(len(self.edges_array), dtype=bool))
             return None
         
-        # 对于多个轮廓，使用贪婪算法优化访问顺序
+        # 对于多个轮廓，按各轮廓真实的起点和终点优化访问顺序，并为闭合轮廓选择最近的入口，使空行程最短
         if len(self.contours) > 1:
             print("优化多轮廓访问顺序...")
-            start_time = time()
-            
-            # 计算每个轮廓的中心点
-            centers = np.array([np.mean(contour, axis=0) for contour in self.contours])
+            path_order, entries, report = plan_contours(self.contours, time_ms=self.order_time_ms)
             
-            # 优化访问顺序（使用贪婪最近邻算法）
-            visited = np.zeros(len(self.contours), dtype=bool)
-            current_idx = 0  # 从第一个轮廓开始
-            visited[current_idx] = True
-            path_order = [current_idx]
-            
-            for _ in range(len(self.contours) - 1):
-                # 计算当前轮廓到所有未访问轮廓的距离
-                distances = np.sum((centers[~visited] - centers[current_idx]) ** 2, axis=1)
-                next_idx = np.where(~visited)[0][np.argmin(distances)]
-                path_order.append(next_idx)
-                visited[next_idx] = True
-                current_idx = next_idx
-            
-            # 按优化顺序重新排列轮廓
-            self.contours = [self.contours[i] for i in path_order]
-            print(f"轮廓顺序优化完成，用时 {time() - start_time:.2f} 秒")
-        
-        # 合并所有轮廓为一个路径数组
-        total_points = sum(len(contour) for contour in self.contours)
-        path = np.zeros((total_points, 3))
-        
-        idx = 0
-        for contour in self.contours:
-            path_len = len(contour)
-            path[idx:idx+path_len] = contour
-            idx += path_len
-        
-        return path
+            # 按优化顺序重新排列轮廓，闭合轮廓旋转到所选入口
+            self.contours = [rotate_contour(self.contours[i], entries[i]) for i in path_order]
+            print(f"空行程总长度: 原始顺序 {report['initial']:.1f} mm，贪婪排序 {report['greedy']:.1f} mm，"
+                  f"2-opt/Or-opt 改进后 {report['ordered']:.1f} mm，"
+                  f"选择 {report['closed']} 个闭合轮廓的入口后 {report['optimized']:.1f} mm")
+            print(f"轮廓顺序优化完成，用时 {report['elapsed']:.2f} 秒")
+        
+        # 所有轮廓连续存放，保留各轮廓的边界和闭合标志
+        return Toolpath.from_contours(self.contours)
     
     def analyze_geometry(self):
         """分析模型几何特性并返回统计信息"""
@@ -313,19 +502,166 @@ class NumPyStepProcessor:
         
         return stats
 
+    def cache_key(self):
+        """缓存键：文件内容哈希 + 解析器版本"""
+        if self._cache_key is None:
+            mode = "topology" if self.use_topology else "geometry"
+            if self.lazy:
+                mode += "-lazy"
+            version = f"v{PARSER_VERSION}-{mode}-snap{self.snap_tolerance:g}"
+            self._cache_key = self.cache.make_key(self.input_file, version)
+        return self._cache_key
+    
+    def load_cached_model(self):
+        """从缓存加载解析后的模型，命中时返回True"""
+        if self.cache is None:
+            return False
+        
+        start_time = time()
+        arrays = self.cache.load(self.cache_key())
+        if arrays is None or 'bounds' not in arrays:
+            return False
+        
+        self.points_array = arrays.get('points_array')
+        self.edges_array = arrays.get('edges_array')
+        self.bounds = tuple(arrays['bounds'].tolist())
+        
+        # 轮廓以连续点数组 + 偏移数组的形式保存
+        contour_points = arrays.get('contour_points')
+        contour_offsets = arrays.get('contour_offsets')
+        self.contours = []
+        if contour_points is not None and contour_offsets is not None:
+            self.contours = [contour_points[start:end] 
+                             for start, end in zip(contour_offsets[:-1], contour_offsets[1:])]
+        
+        print(f"从缓存加载解析模型，用时 {(time() - start_time) * 1000:.1f} 毫秒")
+        return True
+    
+    def save_cached_model(self):
+        """将解析后的模型写入缓存"""
+        if self.cache is None or self.bounds is None:
+            return
+        
+        arrays = {
+            'points_array': self.points_array,
+            'edges_array': self.edges_array,
+            'bounds': np.array(self.bounds, dtype=np.float64)
+        }
+        if self.contours:
+            lengths = [len(contour) for contour in self.contours]
+            arrays['contour_points'] = np.concatenate(self.contours)
+            arrays['contour_offsets'] = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        
+        self.cache.store(self.cache_key(), arrays)
+
     def process(self):
-        """处理STEP文件并返回结果"""
-        success = self.parse_file()
-        if not success:
-            print("错误: 无法解析STEP文件或未找到足够的几何信息")
-            return None, None, None
+        """处理STEP文件并返回 (刀具路径 Toolpath, 边界, 统计信息)"""
+        if not self.load_cached_model():
+            success = self.parse_file()
+            if not success:
+                print("错误: 无法解析STEP文件或未找到足够的几何信息")
+                return None, None, None
+            
+            self.extract_contours()
+            self.save_cached_model()
         
-        self.extract_contours()
         path = self.get_optimized_path()
         stats = self.analyze_geometry()
         
         return path, self.bounds, stats
 
+def probe(input_file, sample_bytes=PROBE_SAMPLE_BYTES):
+    """
+    快速探测STEP文件而不构建几何
+    
+    读取HEADER段，并在DATA段中均匀采样（文件不大于采样字节数时扫描全部）统计各类型实体数量、
+    由采样到的点估算模型边界，再据此预估完整转换的耗时和内存
+    
+    压缩文件无法随机访问，只解压开头 sample_bytes 字节进行统计，按解压后的总大小放大
+    
+    Args:
+        input_file (str): 输入STP文件路径（可为 .stp.gz 或 .zip）
+        sample_bytes (int): DATA段采样的总字节数
+    
+    Returns:
+        dict: 探测结果，exact 为False时实体数量和边界为采样估计值
+    """
+    start_time = time()
+    compressed = is_compressed_step(input_file)
+    size_bytes = step_stream_size(input_file)
+    result = {
+        'file': os.path.basename(input_file),
+        'size_mb': size_bytes / (1024 * 1024)
+    }
+    if compressed:
+        result['compressed_mb'] = os.path.getsize(input_file) / (1024 * 1024)
+    if size_bytes == 0:
+        result['error'] = '空文件'
+        return result
+    
+    counts = {}
+    if compressed:
+        with open_step_stream(input_file) as stream:
+            data = stream.read(sample_bytes)
+        header = read_step_header(data)
+        data_start = find_data_section(data)
+        counts = dict(count_entity_types(data, data_start, len(data)))
+        ranges = [(data_start, len(data))]
+        # 与采样时相同，只解析前 1/4 的点估算边界
+        if len(data) < size_bytes:
+            data = data[:data_start + (len(data) - data_start) // 4]
+        points = parse_point_table(scan_step_text(data.decode('utf-8', errors='ignore'), (POINT_TYPE,)))[1]
+    else:
+        header, data_start, ranges, counts, points = _probe_samples(input_file, size_bytes, sample_bytes)
+    
+    # 采样时按采样比例放大计数
+    sampled_bytes = sum(end - begin for begin, end in ranges)
+    scale = (size_bytes - data_start) / max(sampled_bytes, 1)
+    counts = {entity_type: int(round(count * scale))
+              for entity_type, count in sorted(counts.items(), key=lambda item: -item[1])}
+    
+    if len(points) > 0:
+        min_coords, max_coords = points.min(axis=0), points.max(axis=0)
+        result['bounds'] = {
+            'min_x': float(min_coords[0]), 'min_y': float(min_coords[1]), 'min_z': float(min_coords[2]),
+            'max_x': float(max_coords[0]), 'max_y': float(max_coords[1]), 'max_z': float(max_coords[2])
+        }
+    
+    parsed_entities = sum(counts.get(entity_type, 0) for entity_type in TOPOLOGY_ENTITY_TYPES)
+    result.update({
+        'schema': header.get('schema'),
+        'header': header,
+        'exact': scale == 1,
+        'total_entities': sum(counts.values()),
+        'entity_counts': counts,
+        'predicted_seconds': (result['size_mb'] / PROBE_PARSE_MB_PER_SECOND +
+                              counts.get(EDGE_CURVE_TYPE, 0) * PROBE_SECONDS_PER_EDGE),
+        'predicted_memory_mb': result['size_mb'] + parsed_entities * PROBE_BYTES_PER_ENTITY / (1024 * 1024),
+        'probe_ms': (time() - start_time) * 1000
+    })
+    return result
+
+def _probe_samples(input_file, size_bytes, sample_bytes):
+    """以内存映射方式在未压缩文件的DATA段中均匀采样，返回 (HEADER, DATA段起点, 采样范围, 类型计数, 采样点)"""
+    counts = {}
+    with open(input_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header = read_step_header(data)
+            data_start = find_data_section(data)
+            ranges = sample_ranges(data_start, size_bytes, sample_bytes)
+            for begin, end in ranges:
+                for entity_type, count in count_entity_types(data, begin, end).items():
+                    counts[entity_type] = counts.get(entity_type, 0) + count
+    
+    # 由采样窗口中的点估算边界，采样时每个窗口只解析前 1/4 的点
+    if len(ranges) > 1:
+        point_ranges = [(begin, begin + (end - begin) // 4) for begin, end in ranges]
+    else:
+        point_ranges = ranges
+    points = [parse_point_table(scan_step_range(input_file, begin, end, (POINT_TYPE,)))[1]
+              for begin, end in point_ranges]
+    return header, data_start, ranges, counts, np.concatenate(points)
+
 def main():
     import argparse
     import json
@@ -334,10 +670,39 @@ def main():
     parser.add_argument('input_file', help='输入STEP文件路径')
     parser.add_argument('-o', '--output', help='输出JSON文件路径')
     parser.add_argument('-s', '--stats', action='store_true', help='输出几何统计信息')
+    parser.add_argument('--mmap', action='store_true', help='以内存映射方式按字节读取文件（适用于超大文件）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用解析模型缓存')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='解析模型缓存目录')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='并行解析DATA段的进程数')
+    parser.add_argument('--no-topology', action='store_true', help='不按EDGE_LOOP拓扑构建轮廓，使用几何端点搜索')
+    parser.add_argument('--snap-tol', type=float, default=DEFAULT_SNAP_TOLERANCE,
+                        help='几何构建轮廓时端点吸附容差 (mm)')
+    parser.add_argument('--write-index', action='store_true',
+                        help='在STEP文件旁写入实体字节偏移索引 (.idx.npz)，供按ID随机访问')
+    parser.add_argument('--lazy', action='store_true',
+                        help='惰性解析：从形状根实体沿引用只解码可达的拓扑实体，跳过外观和产品信息等')
+    parser.add_argument('--order-time-ms', type=float, default=DEFAULT_ORDER_TIME_MS,
+                        help='轮廓排序时 2-opt/Or-opt 改进的时间预算 (毫秒)，为0时只做贪婪排序')
+    parser.add_argument('--probe', action='store_true',
+                        help='只快速探测文件（HEADER、实体数量、近似边界、预估耗时和内存），不构建几何')
     
     args = parser.parse_args()
     
-    processor = NumPyStepProcessor(args.input_file)
+    if args.probe:
+        output_data = probe(args.input_file)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            print(f"结果已保存到: {args.output}")
+        else:
+            print(json.dumps(output_data, indent=2, ensure_ascii=False))
+        return 0
+    
+    processor = NumPyStepProcessor(args.input_file, use_mmap=args.mmap,
+                                   use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                                   jobs=args.jobs, use_topology=not args.no_topology,
+                                   snap_tolerance=args.snap_tol, write_index=args.write_index,
+                                   lazy=args.lazy, order_time_ms=args.order_time_ms)
     path, bounds, stats = processor.process()
     
     if path is None:
@@ -346,7 +711,8 @@ def main():
     
     output_data = {
         'file': os.path.basename(args.input_file),
-        'points_count': len(path),
+        'points_count': path.point_count,
+        'contours_count': path.contour_count,
         'bounds': {
             'min_x': bounds[0], 'min_y': bounds[1], 'min_z': bounds[2],
             'max_x': bounds[3], 'max_y': bounds[4], 'max_z': bounds[5]
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+按弦高误差自适应离散曲线 (基于NumPy)
+根据弦高误差容差为每个圆和B样条曲线选择采样点数：小孔用少量点，大圆弧保持精度，
+所有曲线的点数和坐标都以向量化方式一次算出。
+另提供单条有理B样条、椭圆和等距曲线的离散，以及合并共线点，供基于OCC的转换器使用
+"""
+
+import numpy as np
+
+from numpy_bspline import evaluate_bsplines_at, bspline_sample_params, bspline_derivative
+
+# 圆至少离散为的段数
+MIN_CIRCLE_SEGMENTS = 4
+# 单条曲线的最大采样点数
+MAX_CURVE_SAMPLES = 10000
+# 判定共线时点到相邻两点连线的最大距离 (mm)
+COLLINEAR_TOLERANCE = 1e-6
+
+
+def circle_segment_counts(radii, tolerance, min_segments=MIN_CIRCLE_SEGMENTS):
+    """
+    按弦高误差计算每个整圆的离散段数
+
+    圆心角为 θ 的弦的弦高为 r * (1 - cos(θ / 2))，令其不超过容差得 θ <= 2 * arccos(1 - tolerance / r)
+
+    Args:
+        radii (numpy.ndarray): 半径数组 (mm)
+        tolerance (float): 弦高误差容差 (mm)
+        min_segments (int): 最少段数
+
+    Returns:
+        numpy.ndarray: 每个圆的段数
+    """
+    radii = np.asarray(radii, dtype=float)
+    ratio = np.clip(1.0 - tolerance / np.maximum(radii, 1e-12), -1.0, 1.0)
+    max_angle = 2.0 * np.arccos(ratio)
+    segments = np.ceil(2.0 * np.pi / np.maximum(max_angle, 1e-12))
+    return np.maximum(segments, min_segments).astype(np.int64)
+
+
+def tessellate_circles(centers, radii, segments):
+    """
+    批量离散XY平面内的整圆，首尾点重合
+
+    Args:
+        centers (numpy.ndarray): (N, 3) 圆心
+        radii (numpy.ndarray): (N,) 半径
+        segments (numpy.ndarray): (N,) 每个圆的段数
+
+    Returns:
+        tuple: (points, offsets)，第i个圆的点为 points[offsets[i]:offsets[i + 1]]
+    """
+    centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=float)
+    counts = np.asarray(segments, dtype=np.int64) + 1
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    owner = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(offsets[-1]) - offsets[owner]
+    angles = 2.0 * np.pi * local / (counts[owner] - 1)
+    points = centers[owner].copy()
+    points[:, 0] += radii[owner] * np.cos(angles)
+    points[:, 1] += radii[owner] * np.sin(angles)
+    return points, offsets
+
+
+def tessellate_bsplines(curves, tolerance, max_count=MAX_CURVE_SAMPLES):
+    """
+    按弦高误差自适应采样多条B样条曲线，每个节点处都有采样点（见 bspline_sample_params）
+
+    Args:
+        curves (list): (次数, 控制点, 节点向量或None) 列表
+        tolerance (float): 弦高误差容差 (mm)
+        max_count (int): 每条曲线的最大采样点数
+
+    Returns:
+        tuple: (points, offsets)，与 evaluate_bsplines 相同
+    """
+    return evaluate_bsplines_at(curves, *bspline_sample_params(curves, tolerance, max_count))
+
+
+def tessellate_nurbs(degree, poles, weights, knots, first, last, tolerance, max_count=MAX_CURVE_SAMPLES):
+    """
+    按弦高误差离散单条（有理）B样条曲线在参数区间 [first, last] 上的部分
+
+    有理曲线在齐次坐标 (w*P, w) 中求值后再除以权重；采样点数按控制点估计，
+    并按权重比例 sqrt(max(w) / min(w)) 加密
+
+    Args:
+        degree (int): 次数
+        poles (numpy.ndarray): (n, 3) 控制点
+        weights (numpy.ndarray): (n,) 权重，非有理曲线为None
+        knots (numpy.ndarray): 完整节点向量，None时为两端夹紧的均匀节点向量（Bezier曲线）
+        first (float): 起始参数
+        last (float): 终止参数
+        tolerance (float): 弦高误差容差 (mm)
+        max_count (int): 最大采样点数
+
+    Returns:
+        numpy.ndarray: (N, 3) 曲线上的点，曲线数据无效时为空数组
+    """
+    poles = np.asarray(poles, dtype=float)
+    domains = np.array([[first, last]], dtype=float)
+    if weights is None:
+        params, offsets = bspline_sample_params([(degree, poles, knots)], tolerance, max_count, domains)
+        points, _ = evaluate_bsplines_at([(degree, poles, knots)], params, offsets)
+        return points
+
+    # 段数与 sqrt(1 / tolerance) 成正比，容差除以权重比即按 sqrt(max(w) / min(w)) 加密
+    weights = np.asarray(weights, dtype=float)
+    params, offsets = bspline_sample_params([(degree, poles, knots)], tolerance * weights.min() / weights.max(),
+                                            max_count, domains)
+    homogeneous = np.hstack([poles * weights[:, None], weights[:, None]])
+    points, _ = evaluate_bsplines_at([(degree, homogeneous, knots)], params, offsets)
+    return points[:, :3] / points[:, 3:]
+
+
+def tessellate_offset_bspline(degree, poles, knots, offset, direction, first, last, tolerance,
+                              max_count=MAX_CURVE_SAMPLES):
+    """
+    离散以非有理B样条为基曲线的等距曲线 C(u) + offset * (C'(u) × V) / |C'(u) × V|
+
+    采样点数按基曲线的弦高误差估计
+
+    Args:
+        degree (int): 基曲线次数，不小于2
+        poles (numpy.ndarray): (n, 3) 基曲线控制点
+        knots (numpy.ndarray): 基曲线节点向量
+        offset (float): 偏移距离 (mm)
+        direction (numpy.ndarray): 参考方向 V
+        first (float): 起始参数
+        last (float): 终止参数
+        tolerance (float): 弦高误差容差 (mm)
+        max_count (int): 最大采样点数
+
+    Returns:
+        numpy.ndarray: (N, 3) 等距曲线上的点
+    """
+    poles = np.asarray(poles, dtype=float)
+    domains = np.array([[first, last]], dtype=float)
+    params, offsets = bspline_sample_params([(degree, poles, knots)], tolerance, max_count, domains)
+    points, _ = evaluate_bsplines_at([(degree, poles, knots)], params, offsets)
+    tangents, _ = evaluate_bsplines_at([bspline_derivative(degree, poles, knots)], params, offsets)
+
+    normals = np.cross(tangents, np.asarray(direction, dtype=float))
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    return points + offset * normals
+
+
+def tessellate_ellipse(center, x_axis, y_axis, major_radius, minor_radius, first, last, tolerance,
+                       max_count=MAX_CURVE_SAMPLES):
+    """
+    按弦高误差离散椭圆弧 C(t) = O + a*cos(t)*X + b*sin(t)*Y, t ∈ [first, last]
+
+    |C''(t)| 不超过长半轴 a，参数步长为 h 时弦高误差不超过 h² * a / 8
+
+    Args:
+        center (numpy.ndarray): 中心 O
+        x_axis (numpy.ndarray): 长轴方向 X（单位向量）
+        y_axis (numpy.ndarray): 短轴方向 Y（单位向量）
+        major_radius (float): 长半轴 a
+        minor_radius (float): 短半轴 b
+        first (float): 起始参数
+        last (float): 终止参数
+        tolerance (float): 弦高误差容差 (mm)
+        max_count (int): 最大采样点数
+
+    Returns:
+        numpy.ndarray: (N, 3) 椭圆弧上的点
+    """
+    segments = np.ceil(abs(last - first) * np.sqrt(major_radius / (8.0 * tolerance)))
+    count = int(np.clip(segments + 1, 2, max_count))
+    angles = np.linspace(first, last, count)[:, None]
+    return (np.asarray(center, dtype=float)
+            + major_radius * np.cos(angles) * np.asarray(x_axis, dtype=float)
+            + minor_radius * np.sin(angles) * np.asarray(y_axis, dtype=float))
+
+
+def _segment_distances(points, starts, ends):
+    """
+    点到线段的距离
+
+    Args:
+        points (numpy.ndarray): (N, 3) 点
+        starts (numpy.ndarray): (N, 3) 或 (3,) 线段起点
+        ends (numpy.ndarray): (N, 3) 或 (3,) 线段终点
+
+    Returns:
+        numpy.ndarray: (N,) 距离，线段退化为点时为到该点的距离
+    """
+    chord = np.broadcast_to(ends - starts, points.shape)
+    relative = points - starts
+    squared = np.einsum('ij,ij->i', chord, chord)
+    t = np.clip(np.einsum('ij,ij->i', relative, chord) / np.maximum(squared, 1e-300), 0.0, 1.0)
+    return np.linalg.norm(relative - t[:, None] * chord, axis=1)
+
+
+def merge_collinear(points, tolerance=COLLINEAR_TOLERANCE):
+    """
+    合并折线中连续共线的点，只保留方向改变处的点和首尾点
+
+    先按中间点到其前后两点连线的距离筛选候选点（重复点同样被移除），
+    再检查每段连续移除的点到其前后保留点之间线段的距离，超出容差时按最远点拆分（Douglas-Peucker），
+    保证每个被移除的点到合并后折线对应线段的距离都不超过容差
+
+    Args:
+        points (numpy.ndarray): (N, 3) 折线点
+        tolerance (float): 共线距离容差 (mm)
+
+    Returns:
+        numpy.ndarray: 合并后的折线点
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 3:
+        return points
+
+    previous, current, following = points[:-2], points[1:-1], points[2:]
+    chord = following - previous
+    chord_length = np.linalg.norm(chord, axis=1)
+    distance = np.linalg.norm(np.cross(current - previous, chord), axis=1)
+    # 前后两点重合时按到该点的距离判断
+    distance = np.where(chord_length > 0, distance / np.maximum(chord_length, 1e-300),
+                        np.linalg.norm(current - previous, axis=1))
+    # 只合并位于前后两点之间的点，避免折返的路径被拉直
+    between = np.einsum('ij,ij->i', current - previous, chord) >= 0
+    between &= np.einsum('ij,ij->i', following - current, chord) >= 0
+
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:-1] = ~((distance <= tolerance) & between)
+
+    # 逐点判定只约束到原相邻点连线的偏差，连续移除时偏差会累积，须对照最终保留的两点重新检查
+    kept = np.flatnonzero(keep)
+    starts, ends = kept[:-1], kept[1:]
+    merged = ends - starts > 1
+    starts, ends = starts[merged], ends[merged]
+    if len(starts) == 0:
+        return points[keep]
+
+    lengths = ends - starts - 1
+    run_offsets = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=run_offsets[1:])
+    owner = np.repeat(np.arange(len(lengths)), lengths)
+    interior = np.arange(lengths.sum()) - run_offsets[owner] + starts[owner] + 1
+    deviation = _segment_distances(points[interior], points[starts[owner]], points[ends[owner]])
+    worst = np.maximum.reduceat(deviation, run_offsets)
+
+    stack = list(zip(starts[worst > tolerance].tolist(), ends[worst > tolerance].tolist()))
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        deviation = _segment_distances(points[first + 1:last], points[first], points[last])
+        farthest = int(np.argmax(deviation))
+        if deviation[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.extend([(first, split), (split, last)])
+    return points[keep]
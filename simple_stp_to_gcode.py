@@ -9,11 +9,12 @@
 import sys
 import os
 import argparse
-import re
 import math
 import numpy as np
 from time import time
 
+from step_tokenizer import scan_step_file, parse_point, parse_edge_curve, POINT_TYPE, EDGE_CURVE_TYPE
+
 class SimpleStepToGcode:
     def __init__(self, input_file, output_file=None, feed_rate=500, 
                  rapid_feed_rate=1000, safety_height=5.0, cut_depth=0.5, 
@@ -61,33 +62,26 @@ class SimpleStepToGcode:
         print(f"正在解析STEP文件: {self.input_file}")
         start_time = time()
         
-        # 读取文件内容
-        with open(self.input_file, 'r', errors='ignore') as f:
-            content = f.read()
+        # 单次扫描DATA段，按实体类型填充各表
+        tables = scan_step_file(self.input_file, (POINT_TYPE, EDGE_CURVE_TYPE))
+        print(f"单次扫描DATA段完成: {tables.summary()}")
         
         # 提取顶点信息 (CARTESIAN_POINT)
-        cartesian_point_pattern = r'#(\d+)=CARTESIAN_POINT\(\'.*?\',\((.*?)\)\);'
-        point_matches = re.finditer(cartesian_point_pattern, content)
-        
         points_dict = {}  # 使用ID作为键存储点
-        for match in point_matches:
-            point_id = int(match.group(1))
-            coords_str = match.group(2)
-            # 去除可能的空格，分割坐标
-            coords = [float(x.strip()) for x in coords_str.split(',')]
-            if len(coords) == 3:  # 确保是3D点
+        for point_id, params in tables.records(POINT_TYPE):
+            coords = parse_point(params)
+            if coords is not None and len(coords) == 3:  # 确保是3D点
                 points_dict[point_id] = coords
                 self.vertices.append(coords)
         
         print(f"找到 {len(points_dict)} 个点")
         
         # 提取直线信息 (B_SPLINE_CURVE_WITH_KNOTS 简化为直线)
-        line_pattern = r'#\d+=EDGE_CURVE\(\'.*?\',#(\d+),#(\d+),.*?\);'
-        line_matches = re.finditer(line_pattern, content)
-        
-        for match in line_matches:
-            start_id = int(match.group(1))
-            end_id = int(match.group(2))
+        for _, params in tables.records(EDGE_CURVE_TYPE):
+            edge = parse_edge_curve(params)
+            if edge is None:
+                continue
+            start_id, end_id = edge[:2]
             if start_id in points_dict and end_id in points_dict:
                 start_point = points_dict[start_id]
                 end_point = points_dict[end_id]
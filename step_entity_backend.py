@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+与steputils实体接口兼容的快速STEP实体后端
+单次扫描DATA段建立实体ID索引和类型索引，提供与 steputils.step 相同的
+readfile()、find_all_entities_by_type()、find_entity_by_id() 以及实体的 .id/.type/.params，
+按ID查找为O(1)的字典查找，按类型查询直接返回预先建立的列表。
+实体参数在首次访问 .params 时才解析，引用 '#id' 解析为被引用的实体对象
+"""
+
+from collections import namedtuple
+from time import time
+
+from step_tokenizer import compile_entity_pattern, find_data_section, open_step_stream, split_params, parse_ref
+
+# 带类型的参数值，如 LENGTH_MEASURE(1.5)，与steputils一样通过 .val 取值
+TypedParameter = namedtuple('TypedParameter', ['type_name', 'val'])
+
+
+class StepEntity:
+    __slots__ = ('id', 'type', '_text', '_file', '_params')
+
+    def __init__(self, entity_id, entity_type, text, step_file):
+        """
+        STEP实体
+
+        Args:
+            entity_id (int): 实体ID
+            entity_type (str): 实体类型名
+            text (str): 括号内的参数文本
+            step_file (StepEntityFile): 所属文件，用于解析引用
+        """
+        self.id = entity_id
+        self.type = entity_type
+        self._text = text
+        self._file = step_file
+        self._params = None
+
+    @property
+    def params(self):
+        """参数列表：数值、字符串、枚举（如 '.T.'）、嵌套列表，引用为被引用的实体（找不到时为ID）"""
+        if self._params is None:
+            self._params = [self._file._parse_value(token) for token in split_params(self._text)]
+        return self._params
+
+    def __repr__(self):
+        return f"#{self.id}={self.type}({self._text})"
+
+
+class StepEntityFile:
+    def __init__(self, entities, size_bytes=0):
+        """
+        已建立索引的STEP实体集合
+
+        Args:
+            entities (list): (实体ID, 类型名, 参数文本) 列表，按文件顺序
+            size_bytes (int): 扫描的字节数
+        """
+        self.size_bytes = size_bytes
+        self.elapsed = 0.0  # 读取和建立索引的用时 (秒)
+        self._by_id = by_id = {}
+        self._by_type = by_type = {}
+        for entity_id, entity_type, text in entities:
+            entity = by_id[entity_id] = StepEntity(entity_id, entity_type, text, self)
+            entity_list = by_type.get(entity_type)
+            if entity_list is None:
+                entity_list = by_type[entity_type] = []
+            entity_list.append(entity)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def find_entity_by_id(self, entity_id):
+        """按ID查找实体，找不到时返回None"""
+        return self._by_id.get(entity_id)
+
+    def find_all_entities_by_type(self, entity_type):
+        """返回某类型的全部实体（按文件顺序，为内部列表，调用方不应修改）"""
+        return self._by_type.get(entity_type, [])
+
+    def entity_types(self):
+        """返回各类型的实体数量"""
+        return {entity_type: len(entities) for entity_type, entities in self._by_type.items()}
+
+    def _parse_value(self, token):
+        """将单个参数文本转换为Python值"""
+        if not token:
+            return None
+        first = token[0]
+        if first == '#':
+            entity_id = parse_ref(token)
+            return self._by_id.get(entity_id, entity_id)
+        if first == "'":
+            return token[1:-1].replace("''", "'")
+        if first == '(':
+            inner = token[1:-1].strip()
+            return [self._parse_value(item) for item in split_params(inner)] if inner else []
+        if first == '$':
+            return None
+        if first == '.' and token.endswith('.') and len(token) > 2 and token[1].isalpha():
+            return token
+        if first.isalpha():
+            if token.endswith(')'):
+                open_paren = token.index('(')
+                return TypedParameter(token[:open_paren].strip(), self._parse_value(token[open_paren + 1:-1].strip()))
+            return token
+        if first == '*':
+            return token
+        try:
+            if '.' in token or 'E' in token or 'e' in token:
+                return float(token)
+            return int(token)
+        except ValueError:
+            return token
+
+
+def readfile(input_file):
+    """
+    读取STEP文件并建立实体索引（对应 steputils.step.readfile）
+
+    只包含简单实体，复杂实体 #id=(A(...) B(...)) 不在索引中
+
+    Args:
+        input_file (str): 输入STEP文件路径，也可以是 .stp.gz 或 .zip
+
+    Returns:
+        StepEntityFile: 实体集合
+    """
+    start_time = time()
+    with open_step_stream(input_file) as stream:
+        content = stream.read().decode('utf-8', errors='ignore')
+
+    pattern = compile_entity_pattern()
+    entities = [(int(entity_id), entity_type, text)
+                for entity_id, entity_type, text in pattern.findall(content, find_data_section(content))]
+    step_file = StepEntityFile(entities, len(content))
+    step_file.elapsed = time() - start_time
+    return step_file
+
+
+# 与 steputils.step 相同的名称，便于作为替换模块使用
+Entity = StepEntity
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+STEP解析模型缓存
+以文件内容哈希和解析器版本为键，将解析后的模型保存为磁盘上的.npy数组，
+再次转换同一文件时以内存映射方式直接加载，缓存总大小超过上限时按最近最少使用淘汰
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+DEFAULT_CACHE_DIR = 'cache'
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1GB
+
+
+def file_content_hash(input_file, chunk_size=1024 * 1024):
+    """分块计算文件内容的SHA-256哈希"""
+    digest = hashlib.sha256()
+    with open(input_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StepModelCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        初始化模型缓存
+
+        Args:
+            cache_dir (str): 缓存目录
+            max_bytes (int): 缓存总大小上限 (字节)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def make_key(self, input_file, version):
+        """由文件内容哈希和解析器版本生成缓存键"""
+        return f"{file_content_hash(input_file)}-{version}"
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """
+        以内存映射方式加载缓存条目
+
+        Returns:
+            dict: 数组名到只读内存映射数组的映射，未命中时返回None
+        """
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return None
+
+        try:
+            arrays = {}
+            for filename in os.listdir(entry_dir):
+                if filename.endswith('.npy'):
+                    name = filename[:-len('.npy')]
+                    arrays[name] = np.load(os.path.join(entry_dir, filename), mmap_mode='r')
+        except (OSError, ValueError) as e:
+            print(f"警告: 缓存条目损坏，已忽略: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        # 更新访问时间，用于LRU淘汰
+        os.utime(entry_dir)
+        return arrays
+
+    def store(self, key, arrays):
+        """
+        保存缓存条目并按LRU淘汰超出上限的旧条目
+
+        Args:
+            key (str): 缓存键
+            arrays (dict): 数组名到NumPy数组的映射，值为None的项不保存
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # 先写入临时目录再重命名，避免其他进程读到不完整的条目
+        temp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            for name, array in arrays.items():
+                if array is not None:
+                    np.save(os.path.join(temp_dir, f"{name}.npy"), np.asarray(array))
+
+            if self._dir_size(temp_dir) > self.max_bytes:
+                print("警告: 模型大于缓存上限，不写入缓存")
+                return False
+
+            entry_dir = self._entry_dir(key)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(temp_dir, entry_dir)
+        finally:
+            if os.path.isdir(temp_dir):
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.evict()
+        return True
+
+    def evict(self):
+        """删除最久未使用的条目，直到缓存总大小不超过上限"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = self._entry_dir(name)
+            if os.path.isdir(entry_dir) and not name.startswith('.tmp-'):
+                entries.append((os.path.getmtime(entry_dir), self._dir_size(entry_dir), entry_dir))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            print(f"缓存超出上限，已淘汰: {os.path.basename(entry_dir)}")
+
+    @staticmethod
+    def _dir_size(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+STEP实体字节偏移索引
+单次扫描DATA段，为每条实体记录保存 (ID, 类型编号, 字节偏移, 长度)，以结构化NumPy数组
+写入STEP文件旁的 .idx.npz 文件。之后以内存映射方式打开STEP文件，按ID直接定位并只解码
+所需的单个实体，无需重新扫描整个文件
+"""
+
+import os
+import re
+import mmap
+import numpy as np
+from time import time
+
+from step_tokenizer import StepTables, find_data_section
+
+# 索引记录的结构: 实体ID、类型编号、记录在文件中的字节偏移和长度
+ENTITY_OFFSET_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('type', '<u2'),
+    ('offset', '<u8'),
+    ('length', '<u4')
+])
+
+# 复杂实体 #id=(A(...) B(...)) 没有单一类型名，使用该名称登记
+COMPLEX_ENTITY_TYPE = '(COMPLEX)'
+
+# 任意一条实体记录：简单实体时第2组为类型名，复杂实体时为空
+RECORD_PATTERN = re.compile(rb"#(\d+)\s*=\s*([A-Z][A-Z0-9_]*)?[^;']*(?:'[^']*'[^;']*)*;")
+# 参数中的实体引用
+REF_PATTERN = re.compile(r'#(\d+)')
+
+
+def sidecar_path(input_file):
+    """STEP文件对应的索引文件路径"""
+    return input_file + '.idx.npz'
+
+
+class StepOffsetIndex:
+    def __init__(self, input_file, entities, type_names):
+        """
+        初始化实体偏移索引
+
+        Args:
+            input_file (str): STEP文件路径
+            entities (numpy.ndarray): ENTITY_OFFSET_DTYPE 结构化数组，按ID升序排列
+            type_names (list): 类型编号到类型名的映射
+        """
+        self.input_file = input_file
+        self.entities = entities
+        self.type_names = list(type_names)
+        self._type_codes = {name: code for code, name in enumerate(self.type_names)}
+        # 结构化数组的字段视图不连续，查找时使用连续的ID副本
+        self._ids = np.ascontiguousarray(entities['id'])
+        self._file = None
+        self._data = None
+
+    @classmethod
+    def build(cls, input_file):
+        """扫描STEP文件建立索引"""
+        start_time = time()
+        ids, types, offsets, lengths = [], [], [], []
+        type_codes = {}
+
+        if os.path.getsize(input_file) > 0:
+            with open(input_file, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    complex_type = COMPLEX_ENTITY_TYPE.encode('ascii')
+                    for match in RECORD_PATTERN.finditer(data, find_data_section(data)):
+                        entity_id, entity_type = match.group(1, 2)
+                        entity_type = entity_type or complex_type
+                        code = type_codes.get(entity_type)
+                        if code is None:
+                            code = type_codes[entity_type] = len(type_codes)
+                        start, end = match.span()
+                        ids.append(int(entity_id))
+                        types.append(code)
+                        offsets.append(start)
+                        lengths.append(end - start)
+                    del match
+
+        entities = np.empty(len(ids), dtype=ENTITY_OFFSET_DTYPE)
+        entities['id'] = ids
+        entities['type'] = types
+        entities['offset'] = offsets
+        entities['length'] = lengths
+        entities = entities[np.argsort(entities['id'], kind='stable')]
+
+        type_names = [name.decode('ascii') for name in type_codes]
+        index = cls(input_file, entities, type_names)
+        print(f"建立实体偏移索引: {len(entities)} 个实体，{len(type_names)} 种类型，"
+              f"用时 {time() - start_time:.2f} 秒")
+        return index
+
+    @classmethod
+    def load(cls, input_file):
+        """
+        加载STEP文件旁的索引文件
+
+        Returns:
+            StepOffsetIndex: 索引不存在、损坏或与STEP文件不一致（大小或修改时间变化）时返回None
+        """
+        path = sidecar_path(input_file)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as archive:
+                source = archive['source']
+                stat = os.stat(input_file)
+                if source[0] != stat.st_size or source[1] != stat.st_mtime_ns:
+                    return None
+                return cls(input_file, archive['entities'], archive['type_names'].tolist())
+        except (OSError, ValueError, KeyError) as e:
+            print(f"警告: 实体偏移索引损坏，已忽略: {e}")
+            return None
+
+    @classmethod
+    def open(cls, input_file, write=True):
+        """加载已有索引，没有可用索引时重新建立（write为True时同时写入索引文件）"""
+        index = cls.load(input_file)
+        if index is None:
+            index = cls.build(input_file)
+            if write:
+                index.save()
+        return index
+
+    def save(self):
+        """将索引写入STEP文件旁的 .idx.npz 文件"""
+        stat = os.stat(self.input_file)
+        path = sidecar_path(self.input_file)
+        np.savez(path,
+                 entities=self.entities,
+                 type_names=np.array(self.type_names),
+                 source=np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64))
+        print(f"实体偏移索引已保存到: {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+        return path
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """关闭内存映射的STEP文件"""
+        if self._data is not None:
+            self._data.close()
+            self._file.close()
+            self._data = None
+            self._file = None
+
+    def _mapped(self):
+        """按需以内存映射方式打开STEP文件"""
+        if self._data is None:
+            self._file = open(self.input_file, 'rb')
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data
+
+    def find(self, entity_ids):
+        """
+        批量查找实体ID在索引中的行号
+
+        Returns:
+            numpy.ndarray: 行号数组，找不到的ID为 -1
+        """
+        entity_ids = np.asarray(entity_ids, dtype=np.int64)
+        rows = np.full(entity_ids.shape, -1, dtype=np.int64)
+        if len(self._ids) == 0:
+            return rows
+        positions = np.minimum(np.searchsorted(self._ids, entity_ids), len(self._ids) - 1)
+        found = self._ids[positions] == entity_ids
+        rows[found] = positions[found]
+        return rows
+
+    def _row(self, entity_id):
+        """单个实体ID的行号，找不到时返回 -1"""
+        position = int(self._ids.searchsorted(entity_id))
+        if position < len(self._ids) and self._ids[position] == entity_id:
+            return position
+        return -1
+
+    def type_of(self, entity_id):
+        """返回实体的类型名，找不到时返回None"""
+        row = self._row(entity_id)
+        if row < 0:
+            return None
+        return self.type_names[self.entities['type'][row]]
+
+    def ids_of_type(self, entity_type):
+        """返回某类型所有实体的ID（升序）"""
+        code = self._type_codes.get(entity_type)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self.entities['id'][self.entities['type'] == code]
+
+    def record(self, entity_id):
+        """返回实体记录的原始文本 '#id=TYPE(...);'，找不到时返回None"""
+        row = self._row(entity_id)
+        if row < 0:
+            return None
+        return self.record_at(row)
+
+    def record_at(self, row):
+        """返回索引中第row行实体记录的原始文本"""
+        _, _, offset, length = self.entities[row].tolist()
+        return self._mapped()[offset:offset + length].decode('utf-8', errors='ignore')
+
+    def get(self, entity_id):
+        """
+        按ID解码单个实体
+
+        Returns:
+            tuple: (类型名, 参数文本)，复杂实体的参数文本为整个括号内容；找不到时返回None
+        """
+        row = self._row(entity_id)
+        if row < 0:
+            return None
+        return self.decode_at(row)
+
+    def decode_at(self, row):
+        """解码索引中第row行的实体，返回 (类型名, 参数文本)"""
+        text = self.record_at(row)
+        body = text[text.index('=') + 1:].rstrip().rstrip(';').strip()
+        if body.startswith('('):
+            return COMPLEX_ENTITY_TYPE, body[1:-1].strip()
+        open_paren = body.index('(')
+        return body[:open_paren].strip(), body[open_paren + 1:body.rindex(')')]
+
+
+def scan_reachable(index, root_types, follow_types):
+    """
+    从根实体出发沿 #引用 惰性解析，只解码可达且类型在 follow_types 中的实体
+
+    被引用实体的类型直接由索引得到，无需解码即可剪枝，因此样式、颜色、产品信息和
+    曲面控制点等与加工无关的实体不会被解码
+
+    Args:
+        index (StepOffsetIndex): 实体偏移索引
+        root_types (iterable): 根实体类型，如 MANIFOLD_SOLID_BREP、ADVANCED_FACE、EDGE_LOOP
+        follow_types (iterable): 允许沿引用继续访问的实体类型
+
+    Returns:
+        StepTables: 按文件顺序排列的可达实体表（只包含 follow_types 中的类型）
+    """
+    start_time = time()
+    follow_types = tuple(follow_types)
+    tables = StepTables(follow_types)
+
+    follow_mask = np.array([name in follow_types for name in index.type_names] + [False])
+    type_codes = index.entities['type']
+    visited = np.zeros(len(index), dtype=bool)
+
+    roots = [index.ids_of_type(entity_type) for entity_type in root_types]
+    frontier = index.find(np.concatenate(roots)) if roots else np.empty(0, dtype=np.int64)
+    frontier = np.unique(frontier[frontier >= 0])
+    visited[frontier] = True
+
+    data = index._mapped()
+    decoded_rows, decoded_params = [], []
+    while len(frontier) > 0:
+        # 访问的都是简单实体，类型由索引给出，参数文本即记录中最外层括号内的内容
+        offsets = index.entities['offset'][frontier].tolist()
+        lengths = index.entities['length'][frontier].tolist()
+        keep = [index.type_names[code] in tables.ids for code in type_codes[frontier].tolist()]
+        refs = []
+        for row, offset, length, kept in zip(frontier.tolist(), offsets, lengths, keep):
+            text = data[offset:offset + length].decode('utf-8', errors='ignore')
+            params = text[text.index('(') + 1:text.rindex(')')]
+            if kept:
+                decoded_rows.append(row)
+                decoded_params.append(params)
+            if '#' in params:
+                refs.extend(REF_PATTERN.findall(params))
+
+        # 只继续访问类型需要且尚未访问过的实体
+        rows = index.find(np.unique(np.array(refs, dtype=np.int64)))
+        rows = rows[rows >= 0]
+        rows = rows[~visited[rows] & follow_mask[type_codes[rows]]]
+        visited[rows] = True
+        frontier = rows
+
+    # 按文件中的顺序填充实体表，与完整扫描的顺序一致
+    decoded_rows = np.array(decoded_rows, dtype=np.int64)
+    order = np.argsort(index.entities['offset'][decoded_rows], kind='stable')
+    decoded = index.entities[decoded_rows[order]]
+    for entity_id, code, position in zip(decoded['id'].tolist(), decoded['type'].tolist(), order.tolist()):
+        entity_type = index.type_names[code]
+        tables.ids[entity_type].append(entity_id)
+        tables.params[entity_type].append(decoded_params[position])
+
+    tables.total_entities = len(decoded)
+    tables.size_bytes = int(decoded['length'].sum())
+    tables.elapsed = time() - start_time
+    return tables
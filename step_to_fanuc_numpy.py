@@ -16,12 +16,15 @@ import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
 from numpy_step_processor import NumPyStepProcessor
+from contour_ordering import DEFAULT_ORDER_TIME_MS
 from numpy_gcode_generator import NumPyFanucGcodeGenerator
 
 def convert_step_to_gcode(input_file, output_file=None, feed_rate=500, 
                          rapid_feed_rate=5000, safety_height=10.0, cut_depth=0.5, 
                          tool_diameter=3.0, program_number=1000, 
-                         optimize=True, compensation=True, visualize=False):
+                         optimize=True, compensation=True, visualize=False, use_mmap=False,
+                         use_cache=True, jobs=1, use_topology=True, write_index=False,
+                         lazy=False, order_time_ms=DEFAULT_ORDER_TIME_MS):
     """
     转换STEP文件为FANUC G代码
     
@@ -37,6 +40,13 @@ def convert_step_to_gcode(input_file, output_file=None, feed_rate=500,
         optimize (bool): 是否优化路径
         compensation (bool): 是否应用刀具补偿
         visualize (bool): 是否可视化处理结果
+        use_mmap (bool): 是否以内存映射方式按字节读取STEP文件
+        use_cache (bool): 是否使用解析模型缓存
+        jobs (int): 并行解析STEP文件的进程数
+        use_topology (bool): 是否按EDGE_LOOP拓扑构建轮廓
+        write_index (bool): 是否在STEP文件旁写入实体字节偏移索引
+        lazy (bool): 是否惰性解析，只解码从形状根实体可达的拓扑实体
+        order_time_ms (float): 轮廓排序和路径优化时 2-opt/Or-opt 改进的时间预算 (毫秒)
     
     Returns:
         bool: 转换是否成功
@@ -44,6 +54,8 @@ def convert_step_to_gcode(input_file, output_file=None, feed_rate=500,
     # 设置默认输出文件
     if output_file is None:
         base = os.path.splitext(input_file)[0]
+        if input_file.lower().endswith('.gz'):
+            base = os.path.splitext(base)[0]
         output_file = f"{base}_fanuc_numpy.nc"
     
     # 创建中间结果目录
@@ -58,15 +70,17 @@ def convert_step_to_gcode(input_file, output_file=None, feed_rate=500,
     
     # 1. 解析STEP文件
     print("开始步骤 1: 解析STEP文件")
-    processor = NumPyStepProcessor(input_file)
+    processor = NumPyStepProcessor(input_file, use_mmap=use_mmap, use_cache=use_cache, jobs=jobs,
+                                   use_topology=use_topology, write_index=write_index, lazy=lazy,
+                                   order_time_ms=order_time_ms)
     path, bounds, stats = processor.process()
     
     if path is None:
         print("错误: STEP文件解析失败")
         return False
     
-    # 保存解析结果
-    np.save(f"{results_dir}/path.npy", path)
+    # 保存解析结果（点数组及轮廓偏移、闭合标志）
+    path.save(f"{results_dir}/path.npy")
     with open(f"{results_dir}/stats.json", 'w') as f:
         json.dump(stats, f, indent=2)
     
@@ -85,7 +99,8 @@ def convert_step_to_gcode(input_file, output_file=None, feed_rate=500,
         safety_height=safety_height,
         cut_depth=cut_depth,
         tool_diameter=tool_diameter,
-        program_number=program_number
+        program_number=program_number,
+        order_time_ms=order_time_ms
     )
     
     # 设置路径
@@ -95,13 +110,13 @@ def convert_step_to_gcode(input_file, output_file=None, feed_rate=500,
     if optimize:
         generator.optimize_path()
         # 保存优化后的路径
-        np.save(f"{results_dir}/optimized_path.npy", generator.path)
+        generator.toolpath.save(f"{results_dir}/optimized_path.npy")
     
     # 应用刀具补偿
     if compensation:
         generator.apply_tool_compensation()
         # 保存补偿后的路径
-        np.save(f"{results_dir}/compensated_path.npy", generator.path)
+        generator.toolpath.save(f"{results_dir}/compensated_path.npy")
     
     # 生成G代码
     success = generator.generate_gcode()
@@ -118,18 +133,27 @@ def convert_step_to_gcode(input_file, output_file=None, feed_rate=500,
                 'machining_time_minutes': machining_time,
                 'machining_time_seconds': machining_time * 60,
                 'feed_rate': feed_rate,
-                'points_count': len(generator.path),
-                'gcode_lines': len(generator.gcode_lines)
+                'points_count': generator.toolpath.point_count,
+                'contours_count': generator.toolpath.contour_count,
+                'gcode_lines': len(generator.gcode_lines),
+                'path_optimization': generator.optimization_report
             }, f, indent=2)
     
     # 可视化结果
     if visualize and success:
-        visualize_results(processor, generator.path, bounds)
+        visualize_results(processor, generator.toolpath, bounds)
     
     return success
 
 def visualize_results(processor, final_path, bounds):
-    """可视化解析和处理结果"""
+    """
+    可视化解析和处理结果
+    
+    Args:
+        processor (NumPyStepProcessor): STEP文件处理器
+        final_path (Toolpath): 最终的分段刀具路径，轮廓分段绘制，轮廓之间的快速移动以虚线绘制
+        bounds (tuple): 模型边界
+    """
     try:
         print("\n生成可视化图表...")
         
@@ -153,10 +177,11 @@ def visualize_results(processor, final_path, bounds):
                 ax.plot([edge[0][0], edge[1][0]], [edge[0][1], edge[1][1]], 
                         [edge[0][2], edge[1][2]], 'green', linewidth=1, alpha=0.5)
         
-        # 绘制最终路径
+        # 绘制最终路径，每个轮廓单独一段
         if final_path is not None:
-            ax.plot(final_path[:, 0], final_path[:, 1], final_path[:, 2], 
-                   'red', linewidth=2, label='Toolpath')
+            for i, contour in enumerate(final_path.contours()):
+                ax.plot(contour[:, 0], contour[:, 1], contour[:, 2], 
+                       'red', linewidth=2, label='Toolpath' if i == 0 else None)
         
         # 绘制边界盒
         if bounds:
@@ -197,12 +222,19 @@ def visualize_results(processor, final_path, bounds):
                 plt.plot([edge[0][0], edge[1][0]], [edge[0][1], edge[1][1]], 
                         'green', linewidth=1, alpha=0.5)
         
-        # 绘制最终路径
-        if final_path is not None:
-            plt.plot(final_path[:, 0], final_path[:, 1], 'red', linewidth=2, label='Toolpath')
+        # 绘制最终路径：切削轮廓为实线，轮廓之间的快速移动为虚线
+        if final_path is not None and final_path.point_count > 0:
+            for i, contour in enumerate(final_path.contours()):
+                plt.plot(contour[:, 0], contour[:, 1], 'red', linewidth=2, label='Toolpath' if i == 0 else None)
+            rapid_from, rapid_to = final_path.rapid_moves()
+            if len(rapid_from):
+                segments = np.stack([rapid_from[:, :2], rapid_to[:, :2], np.full((len(rapid_from), 2), np.nan)], axis=1)
+                plt.plot(segments[:, :, 0].ravel(), segments[:, :, 1].ravel(), color='gray', linewidth=1,
+                         linestyle='--', label='Rapid')
             # 标记起点和终点
-            plt.scatter(final_path[0, 0], final_path[0, 1], color='magenta', s=100, label='Start')
-            plt.scatter(final_path[-1, 0], final_path[-1, 1], color='purple', s=100, label='End')
+            points = final_path.points
+            plt.scatter(points[0, 0], points[0, 1], color='magenta', s=100, label='Start')
+            plt.scatter(points[-1, 0], points[-1, 1], color='purple', s=100, label='End')
         
         plt.xlabel('X')
         plt.ylabel('Y')
@@ -245,7 +277,7 @@ def visualize_results(processor, final_path, bounds):
 
 def main():
     parser = argparse.ArgumentParser(description='将STEP文件转换为FANUC G代码 (NumPy优化版本)')
-    parser.add_argument('input_file', help='输入STEP文件路径')
+    parser.add_argument('input_file', help='输入STEP文件路径（支持 .stp.gz 和内含STEP文件的 .zip）')
     parser.add_argument('-o', '--output', help='输出G代码文件路径')
     parser.add_argument('-f', '--feed-rate', type=float, default=500, help='加工进给率 (mm/min)')
     parser.add_argument('-r', '--rapid-feed-rate', type=float, default=5000, help='快速移动进给率 (mm/min)')
@@ -256,6 +288,14 @@ def main():
     parser.add_argument('--no-optimize', action='store_true', help='禁用路径优化')
     parser.add_argument('--no-compensation', action='store_true', help='禁用刀具补偿')
     parser.add_argument('-v', '--visualize', action='store_true', help='可视化处理结果')
+    parser.add_argument('--mmap', action='store_true', help='以内存映射方式按字节读取STEP文件（适用于超大文件）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用解析模型缓存，每次重新解析STEP文件')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='并行解析STEP文件的进程数')
+    parser.add_argument('--no-topology', action='store_true', help='不按EDGE_LOOP拓扑构建轮廓，使用几何端点搜索')
+    parser.add_argument('--write-index', action='store_true', help='在STEP文件旁写入实体字节偏移索引 (.idx.npz)')
+    parser.add_argument('--lazy', action='store_true', help='惰性解析：从形状根实体沿引用只解码可达的拓扑实体')
+    parser.add_argument('--order-time-ms', type=float, default=DEFAULT_ORDER_TIME_MS,
+                        help='轮廓排序时 2-opt/Or-opt 改进的时间预算 (毫秒)，为0时只做贪婪排序')
     
     args = parser.parse_args()
     
@@ -270,7 +310,14 @@ def main():
         program_number=args.program_number,
         optimize=not args.no_optimize,
         compensation=not args.no_compensation,
-        visualize=args.visualize
+        visualize=args.visualize,
+        use_mmap=args.mmap,
+        use_cache=not args.no_cache,
+        jobs=args.jobs,
+        use_topology=not args.no_topology,
+        write_index=args.write_index,
+        lazy=args.lazy,
+        order_time_ms=args.order_time_ms
     )
     
     return 0 if success else 1
@@ -0,0 +1,796 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+STEP Part-21 单次扫描分词器
+此模块只遍历一次DATA段，以 ';' 为边界匹配实体记录，根据实体类型名分派到各类型表中，
+供所有基于文本解析的转换器共用（不依赖NumPy）
+对于超大文件，可使用内存映射模式按字节扫描，只解码需要的实体参数；
+gzip/zip压缩的STEP文件以流方式按固定大小的块解压扫描，不生成完整的解压副本
+"""
+
+import os
+import re
+import gzip
+import mmap
+import zipfile
+import warnings
+from collections import Counter
+from itertools import compress
+from time import time
+
+try:
+    import numpy as np
+except ImportError:
+    # 无NumPy版本的转换器同样使用本模块，批量解析函数此时不可用
+    np = None
+
+# 各转换器常用的实体类型
+POINT_TYPE = 'CARTESIAN_POINT'
+EDGE_CURVE_TYPE = 'EDGE_CURVE'
+ORIENTED_EDGE_TYPE = 'ORIENTED_EDGE'
+VERTEX_POINT_TYPE = 'VERTEX_POINT'
+EDGE_LOOP_TYPE = 'EDGE_LOOP'
+FACE_BOUND_TYPES = ('FACE_BOUND', 'FACE_OUTER_BOUND')
+
+DEFAULT_ENTITY_TYPES = (POINT_TYPE, EDGE_CURVE_TYPE, ORIENTED_EDGE_TYPE)
+# 按环拓扑构建轮廓时需要的实体类型
+TOPOLOGY_ENTITY_TYPES = DEFAULT_ENTITY_TYPES + (VERTEX_POINT_TYPE, EDGE_LOOP_TYPE) + FACE_BOUND_TYPES
+
+
+# 记录起点: 分号之后的 "#id="，用于在任意字节位置之后对齐到下一条记录
+RECORD_START_PATTERN = re.compile(rb';\s*#\d+\s*=')
+# 只匹配实体ID后的类型名，用于不解码参数的快速计数
+ENTITY_TYPE_PATTERN = re.compile(rb'#\d+\s*=\s*([A-Z][A-Z0-9_]*)\s*\(')
+# 流式扫描压缩文件时每次解压读取的字节数
+STREAM_CHUNK_BYTES = 4 * 1024 * 1024
+# 支持直接读取的压缩STEP文件后缀
+COMPRESSED_STEP_SUFFIXES = ('.gz', '.zip')
+# HEADER段的记录
+HEADER_RECORD_PATTERN = re.compile(rb"(FILE_DESCRIPTION|FILE_NAME|FILE_SCHEMA)\s*\(([^;']*(?:'[^']*'[^;']*)*)\)\s*;")
+
+
+class StepTables:
+    def __init__(self, entity_types):
+        """
+        单次扫描得到的按实体类型分组的表
+
+        Args:
+            entity_types (iterable): 需要保留的实体类型名
+        """
+        self.entity_types = tuple(entity_types)
+        self.ids = {entity_type: [] for entity_type in self.entity_types}     # 各类型实体的ID列表
+        self.params = {entity_type: [] for entity_type in self.entity_types}  # 各类型实体的参数文本
+        self.total_entities = 0  # 保留的实体总数
+        self.size_bytes = 0      # 扫描的字节数
+        self.elapsed = 0.0       # 扫描用时 (秒)
+
+    def records(self, entity_type):
+        """按文件顺序返回某类型实体的 (ID, 参数文本) 序列"""
+        return zip(self.ids.get(entity_type, ()), self.params.get(entity_type, ()))
+
+    def count(self, entity_type):
+        """返回某类型实体的数量"""
+        return len(self.ids.get(entity_type, ()))
+
+    @property
+    def throughput(self):
+        """扫描吞吐量 (MB/s)"""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.size_bytes / (1024 * 1024) / self.elapsed
+
+    def summary(self):
+        """返回扫描统计信息的文本描述"""
+        return (f"扫描 {self.size_bytes / (1024 * 1024):.2f} MB，共 {self.total_entities} 个实体，"
+                f"用时 {self.elapsed:.2f} 秒 ({self.throughput:.1f} MB/s)")
+
+
+def find_data_section(content):
+    """返回DATA段第一条记录的起始位置，找不到时返回0（支持str、bytes和mmap）"""
+    if isinstance(content, str):
+        endsec, data = 'ENDSEC;', 'DATA;'
+    else:
+        endsec, data = b'ENDSEC;', b'DATA;'
+    header_end = content.find(endsec)
+    data_start = content.find(data, max(header_end, 0))
+    if data_start < 0:
+        return 0
+    return data_start + len(data)
+
+
+def compile_entity_pattern(entity_types=None, binary=False):
+    """
+    编译匹配单条实体记录的正则表达式
+
+    记录以 ';' 为边界，参数中的字符串按引号成对跳过，因此字符串内的 ';' 不会截断记录。
+    分组依次为: 实体ID、类型名、参数文本
+
+    Args:
+        entity_types (iterable): 需要匹配的实体类型名，None表示匹配所有简单实体
+        binary (bool): 是否编译为匹配bytes/mmap的字节模式
+    """
+    if entity_types is None:
+        type_pattern = r'[A-Z][A-Z0-9_]*'
+    else:
+        type_pattern = '|'.join(sorted((re.escape(t) for t in entity_types), key=len, reverse=True))
+    pattern = r"#(\d+)\s*=\s*(" + type_pattern + r")\s*\(([^;']*(?:'[^']*'[^;']*)*)\)\s*;"
+    if binary:
+        pattern = pattern.encode('ascii')
+    return re.compile(pattern)
+
+
+class EntityIndex:
+    def __init__(self, ids, max_table_ratio=4):
+        """
+        实体ID到行号的紧凑索引 (需要NumPy)，替代以 #id 为键的Python字典
+
+        ID较密集时使用直接查找表，否则使用有序ID数组配合 np.searchsorted。
+        ID重复时与字典一致，保留最后出现的行
+
+        Args:
+            ids (array-like): 按行顺序排列的实体ID
+            max_table_ratio (float): ID跨度不超过实体数的该倍数时使用直接查找表
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        self.size = len(ids)
+        self.table = None         # 直接查找表: ID - min_id -> 行号
+        self.sorted_ids = None    # 有序ID数组
+        self.sorted_rows = None   # 有序ID对应的行号
+        self.min_id = 0
+
+        if self.size == 0:
+            self.sorted_ids = ids
+            self.sorted_rows = ids
+            return
+
+        row_dtype = np.int32 if self.size < 2 ** 31 else np.int64
+        self.min_id = int(ids.min())
+        span = int(ids.max()) - self.min_id + 1
+        if span <= max_table_ratio * self.size:
+            self.table = np.full(span, -1, dtype=row_dtype)
+            self.table[ids - self.min_id] = np.arange(self.size, dtype=row_dtype)
+        else:
+            order = np.argsort(ids, kind='stable').astype(row_dtype)
+            self.sorted_ids = ids[order]
+            self.sorted_rows = order
+
+    @property
+    def mode(self):
+        """索引方式的文本描述"""
+        return "直接查找表" if self.table is not None else "有序ID数组"
+
+    @property
+    def nbytes(self):
+        """索引占用的字节数"""
+        if self.table is not None:
+            return self.table.nbytes
+        return self.sorted_ids.nbytes + self.sorted_rows.nbytes
+
+    def lookup(self, query_ids):
+        """
+        批量查找ID对应的行号
+
+        Args:
+            query_ids (array-like): 待查找的实体ID，任意形状
+
+        Returns:
+            numpy.ndarray: 与输入形状相同的int64行号数组，找不到的ID为 -1
+        """
+        query_ids = np.asarray(query_ids, dtype=np.int64)
+        rows = np.full(query_ids.shape, -1, dtype=np.int64)
+        if self.size == 0:
+            return rows
+
+        if self.table is not None:
+            offsets = query_ids - self.min_id
+            inside = (offsets >= 0) & (offsets < len(self.table))
+            rows[inside] = self.table[offsets[inside]]
+        else:
+            # side='right' 后退一位，重复ID时取最后出现的行
+            positions = np.searchsorted(self.sorted_ids, query_ids, side='right') - 1
+            positions = np.clip(positions, 0, self.size - 1)
+            found = self.sorted_ids[positions] == query_ids
+            rows[found] = self.sorted_rows[positions[found]]
+        return rows
+
+    def describe(self, item_bytes=0):
+        """返回索引内存占用的文本描述"""
+        per_item = self.nbytes / self.size if self.size else 0.0
+        text = f"{self.mode}，索引 {per_item:.1f} 字节/项"
+        if item_bytes:
+            text += f"，含数据共 {per_item + item_bytes:.1f} 字节/项"
+        return text
+
+
+def scan_step_text(content, entity_types=DEFAULT_ENTITY_TYPES):
+    """
+    单次扫描STEP文本的DATA段，将指定类型的实体填入各类型表
+
+    Args:
+        content (str): STEP文件内容
+        entity_types (iterable): 需要保留的实体类型名
+
+    Returns:
+        StepTables: 按类型分组的实体表
+    """
+    start_time = time()
+    tables = StepTables(entity_types)
+    ids = tables.ids
+    params = tables.params
+    total = 0
+
+    pattern = compile_entity_pattern(tables.entity_types)
+    for match in pattern.finditer(content, find_data_section(content)):
+        entity_id, entity_type, entity_params = match.groups()
+        ids[entity_type].append(int(entity_id))
+        params[entity_type].append(entity_params)
+        total += 1
+
+    tables.total_entities = total
+    tables.size_bytes = len(content)
+    tables.elapsed = time() - start_time
+    return tables
+
+
+def scan_step_file(input_file, entity_types=DEFAULT_ENTITY_TYPES, use_mmap=False):
+    """
+    读取STEP文件并单次扫描其DATA段
+
+    Args:
+        input_file (str): 输入STP文件路径，.gz 或 .zip 压缩文件以流方式扫描
+        entity_types (iterable): 需要保留的实体类型名
+        use_mmap (bool): 是否使用内存映射按字节扫描（不构建完整的解码字符串）
+
+    Returns:
+        StepTables: 按类型分组的实体表
+    """
+    if is_compressed_step(input_file):
+        return scan_step_stream(input_file, entity_types)
+    if use_mmap:
+        return scan_step_mmap(input_file, entity_types)
+
+    start_time = time()
+    with open(input_file, 'r', errors='ignore') as f:
+        content = f.read()
+
+    tables = scan_step_text(content, entity_types)
+    tables.size_bytes = os.path.getsize(input_file)
+    tables.elapsed = time() - start_time
+    return tables
+
+
+def scan_step_mmap(input_file, entity_types=DEFAULT_ENTITY_TYPES):
+    """
+    以内存映射方式按字节扫描STEP文件的DATA段
+
+    文件内容由操作系统按页换入换出，不会被整体解码为Python字符串，
+    只有匹配到的实体参数才会被解码，因此可以处理大于物理内存的文件
+
+    Args:
+        input_file (str): 输入STP文件路径
+        entity_types (iterable): 需要保留的实体类型名
+
+    Returns:
+        StepTables: 按类型分组的实体表
+    """
+    start_time = time()
+    size_bytes = os.path.getsize(input_file)
+    if size_bytes == 0:
+        # 空文件无法映射
+        tables = StepTables(entity_types)
+    else:
+        with open(input_file, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                tables = _scan_buffer(data, entity_types)
+
+    tables.size_bytes = size_bytes
+    tables.elapsed = time() - start_time
+    return tables
+
+
+def is_compressed_step(input_file):
+    """是否为gzip/zip压缩的STEP文件（按文件后缀判断）"""
+    return input_file.lower().endswith(COMPRESSED_STEP_SUFFIXES)
+
+
+def open_step_stream(input_file):
+    """
+    以二进制流打开STEP文件，gzip/zip压缩文件在读取时逐块解压
+
+    zip文件读取其中第一个 .stp/.step 文件
+
+    Returns:
+        file: 可按块读取的二进制文件对象
+    """
+    lower = input_file.lower()
+    if lower.endswith('.gz'):
+        return gzip.open(input_file, 'rb')
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(input_file) as archive:
+            name = _find_zip_member(archive)
+            # 关闭ZipFile后，已打开的成员流仍可继续读取
+            return archive.open(name)
+    return open(input_file, 'rb')
+
+
+def step_stream_size(input_file):
+    """
+    不解压即可得到的STEP内容字节数
+
+    gzip取文件尾部记录的原始长度（超过4GB时为对2^32取模的值，仅供估算），
+    zip取成员的原始大小，未压缩文件取文件大小
+    """
+    lower = input_file.lower()
+    if lower.endswith('.gz'):
+        with open(input_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < 4:
+                return 0
+            f.seek(-4, os.SEEK_END)
+            return int.from_bytes(f.read(4), 'little')
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(input_file) as archive:
+            return archive.getinfo(_find_zip_member(archive)).file_size
+    return os.path.getsize(input_file)
+
+
+def _find_zip_member(archive):
+    """zip文件中第一个STEP文件的名称"""
+    for name in archive.namelist():
+        if name.lower().endswith(('.stp', '.step')):
+            return name
+    raise ValueError(f"压缩包中没有STEP文件: {archive.filename}")
+
+
+def scan_step_stream(input_file, entity_types=DEFAULT_ENTITY_TYPES, chunk_bytes=STREAM_CHUNK_BYTES):
+    """
+    以流方式扫描（压缩的）STEP文件的DATA段
+
+    每次解压读取 chunk_bytes 字节，只扫描到缓冲区中最后一条完整记录的边界，
+    剩余的不完整记录与下一块拼接，因此内存中只保留约一个块的解压内容
+
+    Args:
+        input_file (str): 输入STEP文件路径（.gz、.zip 或未压缩文件）
+        entity_types (iterable): 需要保留的实体类型名
+        chunk_bytes (int): 每次解压读取的字节数
+
+    Returns:
+        StepTables: 按类型分组的实体表，size_bytes 为解压后的字节数
+    """
+    start_time = time()
+    tables = StepTables(entity_types)
+    size_bytes = 0
+    buffer = b''
+    in_data = False
+
+    with open_step_stream(input_file) as stream:
+        while True:
+            chunk = stream.read(chunk_bytes)
+            size_bytes += len(chunk)
+            buffer += chunk
+
+            if not in_data:
+                # HEADER段很小，读到 DATA; 之前持续累积
+                if chunk and buffer.find(b'DATA;', max(buffer.find(b'ENDSEC;'), 0)) < 0:
+                    continue
+                buffer = buffer[find_data_section(buffer):]
+                in_data = True
+
+            if not chunk:
+                _scan_buffer(buffer, tables.entity_types, 0, len(buffer), tables)
+                break
+
+            end = _last_record_start(buffer)
+            if end > 0:
+                _scan_buffer(buffer, tables.entity_types, 0, end, tables)
+                buffer = buffer[end:]
+
+    tables.size_bytes = size_bytes
+    tables.elapsed = time() - start_time
+    return tables
+
+
+def _last_record_start(buffer):
+    """缓冲区中最后一条记录起始 '#' 的位置（该记录可能不完整），找不到时返回0"""
+    position = buffer.rfind(b';')
+    while position >= 0:
+        if RECORD_START_PATTERN.match(buffer, position):
+            return position + 1
+        position = buffer.rfind(b';', 0, position)
+    return 0
+
+
+def split_data_ranges(input_file, parts, min_chunk_bytes=4 * 1024 * 1024):
+    """
+    将DATA段按实体边界切分为若干字节范围，供多进程并行扫描
+
+    每个切分点都位于某条记录的 '#' 处，因此每条记录只属于一个范围
+
+    Args:
+        input_file (str): 输入STP文件路径
+        parts (int): 期望的范围数量
+        min_chunk_bytes (int): 每个范围的最小字节数，文件较小时减少范围数量
+
+    Returns:
+        list: (起始, 结束) 字节偏移列表
+    """
+    size_bytes = os.path.getsize(input_file)
+    if size_bytes == 0:
+        return []
+
+    with open(input_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = find_data_section(data)
+            parts = max(1, min(parts, (size_bytes - start) // max(min_chunk_bytes, 1)))
+            chunk = (size_bytes - start) // parts
+            bounds = [start]
+            for part in range(1, parts):
+                match = RECORD_START_PATTERN.search(data, max(start + part * chunk, bounds[-1]))
+                if match is None:
+                    break
+                bounds.append(match.start() + 1)
+                del match
+
+    bounds.append(size_bytes)
+    return [(begin, end) for begin, end in zip(bounds[:-1], bounds[1:]) if end > begin]
+
+
+def scan_step_range(input_file, start, end, entity_types=DEFAULT_ENTITY_TYPES):
+    """
+    以内存映射方式扫描文件中的一个字节范围（并行扫描时每个进程处理一个范围）
+
+    Args:
+        input_file (str): 输入STP文件路径
+        start (int): 起始字节偏移，应位于记录边界
+        end (int): 结束字节偏移
+        entity_types (iterable): 需要保留的实体类型名
+
+    Returns:
+        StepTables: 该范围内按类型分组的实体表
+    """
+    start_time = time()
+    with open(input_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            tables = _scan_buffer(data, entity_types, start, end)
+
+    tables.size_bytes = end - start
+    tables.elapsed = time() - start_time
+    return tables
+
+
+def _scan_buffer(data, entity_types, start=None, end=None, tables=None):
+    """扫描字节缓冲区，只解码匹配到的实体参数（传入tables时追加到已有的表中）"""
+    if tables is None:
+        tables = StepTables(entity_types)
+    ids = tables.ids
+    params = tables.params
+    type_names = {entity_type.encode('ascii'): entity_type for entity_type in tables.entity_types}
+    total = tables.total_entities
+
+    if start is None:
+        start = find_data_section(data)
+    if end is None:
+        end = len(data)
+
+    pattern = compile_entity_pattern(tables.entity_types, binary=True)
+    for match in pattern.finditer(data, start, end):
+        entity_id, entity_type, entity_params = match.groups()
+        entity_type = type_names[entity_type]
+        ids[entity_type].append(int(entity_id))
+        params[entity_type].append(entity_params.decode('utf-8', errors='ignore'))
+        total += 1
+
+    tables.total_entities = total
+    return tables
+
+
+def read_step_header(data):
+    """
+    解析HEADER段的文件描述、文件名和模式 (支持bytes和mmap)
+
+    Returns:
+        dict: description、name、timestamp、originating_system、schema 等字段，缺失的字段不出现
+    """
+    header_end = data.find(b'ENDSEC;')
+    header = {}
+    for match in HEADER_RECORD_PATTERN.finditer(data, 0, header_end if header_end >= 0 else len(data)):
+        record, params = match.group(1), match.group(2).decode('utf-8', errors='ignore')
+        tokens = split_params(params)
+        if record == b'FILE_DESCRIPTION':
+            header['description'] = _strip_strings(tokens[0])
+        elif record == b'FILE_NAME':
+            fields = ('name', 'timestamp', 'author', 'organization',
+                      'preprocessor_version', 'originating_system', 'authorization')
+            for field, token in zip(fields, tokens):
+                header[field] = _strip_strings(token)
+        else:
+            header['schema'] = _strip_strings(tokens[0])
+    return header
+
+
+def _strip_strings(token):
+    """将STEP字符串或字符串列表转为Python字符串（列表以逗号连接）"""
+    token = token.strip()
+    if token.startswith('('):
+        return ', '.join(_strip_strings(item) for item in split_params(token[1:-1]) if item)
+    return token.strip("'")
+
+
+def count_entity_types(data, start=None, end=None):
+    """
+    只匹配类型名，统计字节范围内各类型简单实体的数量，不解码参数
+
+    Returns:
+        dict: 类型名到数量的映射
+    """
+    if start is None:
+        start = find_data_section(data)
+    if end is None:
+        end = len(data)
+    counts = Counter(ENTITY_TYPE_PATTERN.findall(data, start, end))
+    return {entity_type.decode('ascii'): count for entity_type, count in counts.items()}
+
+
+def sample_ranges(start, end, sample_bytes, windows=16):
+    """
+    在 [start, end) 中均匀选取若干采样窗口
+
+    Returns:
+        list: (起始, 结束) 字节偏移列表，范围不大于 sample_bytes 时返回整个范围
+    """
+    if end - start <= sample_bytes:
+        return [(start, end)]
+    window = sample_bytes // windows
+    stride = (end - start - window) // max(windows - 1, 1)
+    return [(start + index * stride, start + index * stride + window) for index in range(windows)]
+
+
+def split_params(params):
+    """
+    按顶层逗号拆分参数文本，忽略字符串和嵌套括号中的逗号
+
+    Args:
+        params (str): 实体括号内的参数文本
+
+    Returns:
+        list: 去除空白后的参数列表（嵌套列表保留为带括号的文本）
+    """
+    tokens = []
+    if params.startswith("'',"):
+        # 最常见的空名称
+        tokens.append("''")
+        params = params[3:]
+    elif params.startswith("'"):
+        # 快速跳过开头的名称字符串
+        pos = 1
+        while True:
+            pos = params.find("'", pos)
+            if pos < 0:
+                return [params.strip()]
+            if params.startswith("''", pos):
+                pos += 2
+                continue
+            break
+        tokens.append(params[:pos + 1])
+        comma = params.find(',', pos + 1)
+        if comma < 0:
+            return tokens
+        params = params[comma + 1:]
+
+    if "'" not in params and '(' not in params:
+        tokens.extend(token.strip() for token in params.split(','))
+        return tokens
+
+    depth = 0
+    in_string = False
+    start = 0
+    for index, char in enumerate(params):
+        if char == "'":
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            tokens.append(params[start:index].strip())
+            start = index + 1
+    tokens.append(params[start:].strip())
+    return tokens
+
+
+def parse_ref(token):
+    """将 '#123' 形式的引用解析为整数ID，非引用返回None"""
+    if token[:1] != '#':
+        token = token.strip()
+        if token[:1] != '#':
+            return None
+    try:
+        return int(token[1:])
+    except ValueError:
+        return None
+
+
+def parse_point(params):
+    """
+    解析CARTESIAN_POINT的坐标
+
+    Args:
+        params (str): 形如 "'',(1.,2.,3.)" 的参数文本
+
+    Returns:
+        list: 坐标浮点数列表，无法解析时返回None
+    """
+    open_paren = params.rfind('(')
+    if open_paren < 0:
+        return None
+    close_paren = params.find(')', open_paren)
+    if close_paren < 0:
+        close_paren = len(params)
+    try:
+        return [float(x) for x in params[open_paren + 1:close_paren].split(',')]
+    except ValueError:
+        return None
+
+
+def parse_point_table(tables, dimension=3):
+    """
+    批量解析CARTESIAN_POINT坐标 (需要NumPy)
+
+    所有坐标子串拼接为一个缓冲区，由一次NumPy调用完成解析，
+    避免逐个坐标调用float()和构建大量Python小列表
+
+    Args:
+        tables (StepTables): 单次扫描得到的实体表
+        dimension (int): 保留的坐标维数，其他维数的点被跳过
+
+    Returns:
+        tuple: (ids, coords) —— int64 ID数组 (N,) 和 float64 坐标数组 (N, dimension)
+    """
+    ids = tables.ids.get(POINT_TYPE, [])
+    params = tables.params.get(POINT_TYPE, [])
+
+    # 坐标是参数中最后一个括号内的部分
+    coord_texts = [text[text.rfind('(') + 1:text.rfind(')')] for text in params]
+    dims = np.fromiter((text.count(',') + 1 for text in coord_texts), dtype=np.int64, count=len(coord_texts))
+    keep = dims == dimension
+    if not keep.all():
+        coord_texts = list(compress(coord_texts, keep))
+        ids = list(compress(ids, keep))
+
+    point_ids = np.array(ids, dtype=np.int64)
+    if not coord_texts:
+        return point_ids, np.empty((0, dimension), dtype=np.float64)
+
+    try:
+        with warnings.catch_warnings():
+            # 数据不完整时NumPy只给出警告并返回部分结果，这里将其视为错误
+            warnings.simplefilter('error')
+            values = np.fromstring(','.join(coord_texts), dtype=np.float64, sep=',')
+        if values.size != len(coord_texts) * dimension:
+            raise ValueError("坐标数量不匹配")
+        return point_ids, values.reshape(-1, dimension)
+    except (ValueError, DeprecationWarning):
+        # 存在无法解析的坐标，逐点解析并跳过无效点
+        return _parse_point_texts(point_ids, coord_texts, dimension)
+
+
+def _parse_point_texts(point_ids, coord_texts, dimension):
+    """逐点解析坐标文本，跳过无法解析的点"""
+    coords = np.empty((len(coord_texts), dimension), dtype=np.float64)
+    valid = np.zeros(len(coord_texts), dtype=bool)
+    for row, text in enumerate(coord_texts):
+        try:
+            coords[row] = [float(x) for x in text.split(',')]
+            valid[row] = True
+        except ValueError:
+            continue
+    return point_ids[valid], coords[valid]
+
+
+def parse_ref_table(tables, entity_type, columns):
+    """
+    批量解析某类型实体参数中指定位置的引用 (需要NumPy)
+
+    Args:
+        tables (StepTables): 单次扫描得到的实体表
+        entity_type (str): 实体类型名
+        columns (tuple): 引用所在的参数位置（从0开始，包含名称字符串）
+
+    Returns:
+        tuple: (ids, refs) —— int64 实体ID数组 (N,) 和 int64 引用数组 (N, len(columns))，
+               缺失或不是引用的位置为 -1
+    """
+    ids = tables.ids.get(entity_type, [])
+    width = max(columns) + 1
+    missing = [-1] * len(columns)
+    refs = []
+    for text in tables.params.get(entity_type, []):
+        tokens = split_params(text)
+        if len(tokens) < width:
+            refs.extend(missing)
+            continue
+        for column in columns:
+            ref = parse_ref(tokens[column])
+            refs.append(-1 if ref is None else ref)
+    return (np.array(ids, dtype=np.int64),
+            np.array(refs, dtype=np.int64).reshape(-1, len(columns)))
+
+
+def parse_ref_flag_table(tables, entity_type, ref_column, flag_column):
+    """
+    批量解析某类型实体的一个引用和一个逻辑标志 (需要NumPy)
+
+    用于 ORIENTED_EDGE (#edge_element, orientation) 和 FACE_BOUND (#bound, orientation)
+
+    Returns:
+        tuple: (ids, refs, flags) —— 缺失的引用为 -1，标志只有 '.F.' 时为False
+    """
+    ids = tables.ids.get(entity_type, [])
+    width = max(ref_column, flag_column) + 1
+    refs = []
+    flags = []
+    for text in tables.params.get(entity_type, []):
+        tokens = split_params(text)
+        if len(tokens) < width:
+            refs.append(-1)
+            flags.append(True)
+            continue
+        ref = parse_ref(tokens[ref_column])
+        refs.append(-1 if ref is None else ref)
+        flags.append(tokens[flag_column] != '.F.')
+    return (np.array(ids, dtype=np.int64), np.array(refs, dtype=np.int64),
+            np.array(flags, dtype=bool))
+
+
+def parse_ref_list_table(tables, entity_type, column):
+    """
+    批量解析某类型实体参数中的引用列表，如 EDGE_LOOP('',(#1,#2,#3)) (需要NumPy)
+
+    Args:
+        tables (StepTables): 单次扫描得到的实体表
+        entity_type (str): 实体类型名
+        column (int): 引用列表所在的参数位置
+
+    Returns:
+        tuple: (ids, lengths, refs) —— 每个实体的列表长度和按顺序拼接的引用数组，
+               列表中不是引用的元素为 -1
+    """
+    ids = tables.ids.get(entity_type, [])
+    lengths = []
+    refs = []
+    for text in tables.params.get(entity_type, []):
+        tokens = split_params(text)
+        items = []
+        if len(tokens) > column:
+            items = tokens[column].strip('()').split(',')
+        items = [parse_ref(item) for item in items if item.strip()]
+        lengths.append(len(items))
+        refs.extend(-1 if ref is None else ref for ref in items)
+    return (np.array(ids, dtype=np.int64), np.array(lengths, dtype=np.int64),
+            np.array(refs, dtype=np.int64))
+
+
+def parse_edge_curve(params):
+    """解析EDGE_CURVE，返回 (起点顶点ID, 终点顶点ID, 曲线ID)"""
+    tokens = split_params(params)
+    if len(tokens) < 4:
+        return None
+    start_id = parse_ref(tokens[1])
+    end_id = parse_ref(tokens[2])
+    if start_id is None or end_id is None:
+        return None
+    return start_id, end_id, parse_ref(tokens[3])
+
+
+def parse_oriented_edge(params):
+    """解析ORIENTED_EDGE，返回 (EDGE_CURVE ID, 方向是否一致)"""
+    tokens = split_params(params)
+    if len(tokens) < 5:
+        return None
+    edge_id = parse_ref(tokens[3])
+    if edge_id is None:
+        return None
+    return edge_id, tokens[4] != '.F.'
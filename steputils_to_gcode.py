@@ -2,8 +2,9 @@
 # -*- coding: utf-8 -*-
 
 """
-使用steputils库的STP文件转G代码转换器
-此脚本使用steputils库读取STEP文件并生成G代码
+使用steputils实体接口的STP文件转G代码转换器
+此脚本默认使用与steputils接口兼容的快速实体后端 (step_entity_backend) 读取STEP文件，
+也可以选择steputils库，然后生成G代码
 """
 
 import sys
@@ -14,19 +15,26 @@ import numpy as np
 from time import time
 from collections import defaultdict
 
+import step_entity_backend
+from numpy_bspline import evaluate_bsplines, expand_knots
+from numpy_tessellation import circle_segment_counts, tessellate_circles, tessellate_bsplines
+
 try:
     import steputils.step as step
-    from steputils.geomdl import BSpline
-    from steputils.geomdl import utilities as utils
 except ImportError:
-    print("错误: 需要安装steputils库")
-    print("安装命令: pip install steputils")
-    sys.exit(1)
+    # 默认的快速实体后端不依赖steputils，缺少时只是无法使用steputils后端
+    step = None
+
+# 默认弦高误差容差 (mm)
+DEFAULT_CHORD_TOLERANCE = 0.01
+# 不按弦高误差离散时，每个圆的固定段数
+FIXED_CIRCLE_SEGMENTS = 35
 
 class StepToGcode:
     def __init__(self, input_file, output_file=None, feed_rate=500, 
                  rapid_feed_rate=1000, safety_height=5.0, cut_depth=0.5, 
-                 tool_diameter=3.0, xy_tolerance=0.01, spline_samples=50):
+                 tool_diameter=3.0, xy_tolerance=0.01, spline_samples=50, backend='fast',
+                 chord_tolerance=DEFAULT_CHORD_TOLERANCE):
         """
         初始化STEP到G代码转换器
         
@@ -40,6 +48,8 @@ class StepToGcode:
             tool_diameter (float): 刀具直径 (mm)
             xy_tolerance (float): XY平面公差 (mm)
             spline_samples (int): 样条曲线采样点数
+            backend (str): 实体后端，'fast' 为带ID和类型索引的快速后端，'steputils' 为steputils库
+            chord_tolerance (float): 圆和样条曲线离散的弦高误差容差 (mm)，为0时使用固定采样点数
         """
         self.input_file = input_file
         self.output_file = output_file or self._default_output_file()
@@ -50,6 +60,8 @@ class StepToGcode:
         self.tool_diameter = tool_diameter
         self.xy_tolerance = xy_tolerance
         self.spline_samples = spline_samples
+        self.backend = backend
+        self.chord_tolerance = chord_tolerance
         
         self.current_z = 0.0
         self.current_x = 0.0
@@ -61,6 +73,7 @@ class StepToGcode:
         self.bounds = None
         
         self.step_file = None
+        self.step_module = None  # 提供 readfile() 和 Entity 的实体后端模块
         
     def _default_output_file(self):
         """为输入文件生成默认的输出文件名"""
@@ -69,11 +82,20 @@ class StepToGcode:
     
     def load_step_file(self):
         """加载并解析STEP文件"""
-        print(f"正在加载STEP文件: {self.input_file}")
+        print(f"正在加载STEP文件: {self.input_file} (实体后端: {self.backend})")
         start_time = time()
         
+        if self.backend == 'steputils':
+            if step is None:
+                print("错误: 需要安装steputils库")
+                print("安装命令: pip install steputils")
+                return False
+            self.step_module = step
+        else:
+            self.step_module = step_entity_backend
+        
         try:
-            self.step_file = step.readfile(self.input_file)
+            self.step_file = self.step_module.readfile(self.input_file)
             print(f"STEP文件加载完成，用时 {time() - start_time:.2f} 秒")
             return True
         except Exception as e:
@@ -94,9 +116,13 @@ class StepToGcode:
         for point in cartesian_points:
             try:
                 point_id = point.id
+                # 坐标可能直接作为参数，也可能是名称之后的坐标列表
+                params = point.params
+                if params and isinstance(params[-1], list):
+                    params = params[-1]
                 # 坐标可能在XYZ或XY格式
-                if len(point.params) >= 3 and isinstance(point.params, list):
-                    coords = [float(x) if isinstance(x, (int, float)) else float(x.val) for x in point.params]
+                if len(params) >= 3 and isinstance(params, list):
+                    coords = [float(x) if isinstance(x, (int, float)) else float(x.val) for x in params]
                     if len(coords) >= 3:  # 确保有X,Y,Z坐标
                         self.points[point_id] = coords[:3]
             except (ValueError, AttributeError, IndexError) as e:
@@ -107,7 +133,7 @@ class StepToGcode:
         
         # 收集所有的曲线
         print("提取曲线数据...")
-        curve_types = ['LINE', 'CIRCLE', 'B_SPLINE_CURVE']
+        curve_types = ['LINE', 'CIRCLE', 'B_SPLINE_CURVE', 'B_SPLINE_CURVE_WITH_KNOTS']
         
         for curve_type in curve_types:
             curves = self.step_file.find_all_entities_by_type(curve_type)
@@ -141,16 +167,18 @@ class StepToGcode:
                                     'id': curve.id
                                 })
                     
-                    elif curve_type == 'B_SPLINE_CURVE':
+                    elif curve_type.startswith('B_SPLINE_CURVE'):
                         # B样条曲线由控制点和度定义
-                        degree = int(curve.params[0].val) if hasattr(curve.params[0], 'val') else int(curve.params[0])
+                        # 第一个参数为名称时，度数是其后的参数
+                        values = curve.params[1:] if isinstance(curve.params[0], str) else curve.params
+                        degree = int(values[0].val) if hasattr(values[0], 'val') else int(values[0])
                         control_points_refs = []
                         
                         # 找出控制点引用
                         for param in curve.params:
                             if isinstance(param, list):
                                 for item in param:
-                                    if isinstance(item, step.Entity) and item.type == 'CARTESIAN_POINT':
+                                    if isinstance(item, self.step_module.Entity) and item.type == 'CARTESIAN_POINT':
                                         control_points_refs.append(item.id)
                         
                         control_points = []
@@ -158,11 +186,17 @@ class StepToGcode:
                             if ref in self.points:
                                 control_points.append(self.points[ref])
                         
+                        # 带节点的B样条: (名称, 次数, 控制点, 形式, 闭合, 自交, 重复度, 节点值, 节点类型)
+                        knots = None
+                        if curve_type == 'B_SPLINE_CURVE_WITH_KNOTS':
+                            knots = expand_knots(values[5], values[6])
+                        
                         if control_points:
                             self.curves.append({
                                 'type': 'B_SPLINE_CURVE',
                                 'degree': degree,
                                 'control_points': control_points,
+                                'knots': knots,
                                 'id': curve.id
                             })
                 except Exception as e:
@@ -191,7 +225,7 @@ class StepToGcode:
     def _get_referenced_entity_id(self, entity, entity_type):
         """获取实体引用的特定类型的实体ID"""
         for param in entity.params:
-            if isinstance(param, step.Entity) and param.type == entity_type:
+            if isinstance(param, self.step_module.Entity) and param.type == entity_type:
                 return param.id
         return None
     
@@ -203,8 +237,11 @@ class StepToGcode:
         direction = self.step_file.find_entity_by_id(direction_id)
         if direction and direction.type == 'DIRECTION':
             try:
+                params = direction.params
+                if params and isinstance(params[-1], list):
+                    params = params[-1]
                 dir_values = []
-                for value in direction.params:
+                for value in params:
                     if isinstance(value, (int, float)):
                         dir_values.append(float(value))
                     elif hasattr(value, 'val'):
@@ -232,6 +269,8 @@ class StepToGcode:
         """生成刀具路径"""
         print("正在生成刀具路径...")
         toolpaths = []
+        circles = []  # (在toolpaths中的位置, 圆)
+        splines = []  # (在toolpaths中的位置, B样条曲线)
         
         for curve in self.curves:
             if curve['type'] == 'LINE':
@@ -243,50 +282,47 @@ class StepToGcode:
                 toolpaths.append([start, end])
             
             elif curve['type'] == 'CIRCLE':
-                # 生成圆的离散点
-                center = curve['center']
-                radius = curve['radius']
-                
-                # 生成一个完整的圆
-                points = []
-                for angle in np.linspace(0, 2 * np.pi, 36):  # 每10度一个点
-                    x = center[0] + radius * np.cos(angle)
-                    y = center[1] + radius * np.sin(angle)
-                    z = center[2]
-                    points.append([x, y, z])
-                
-                # 闭合圆形
-                points.append(points[0])
-                toolpaths.append(points)
+                # 先占位，所有圆在循环结束后批量离散
+                circles.append((len(toolpaths), curve))
+                toolpaths.append(None)
             
             elif curve['type'] == 'B_SPLINE_CURVE':
-                # 使用geomdl库采样B样条曲线
-                degree = curve['degree']
-                control_points = curve['control_points']
-                
-                if len(control_points) > degree:
-                    try:
-                        # 创建曲线对象
-                        curve_obj = BSpline.Curve()
-                        curve_obj.degree = degree
-                        curve_obj.ctrlpts = control_points
-                        
-                        # 生成均匀节点向量
-                        curve_obj.knotvector = utils.generate_knot_vector(curve_obj.degree, len(curve_obj.ctrlpts))
-                        
-                        # 设置样本点数
-                        curve_obj.sample_size = self.spline_samples
-                        
-                        # 计算曲线点
-                        curve_points = curve_obj.evalpts
-                        if curve_points:
-                            toolpaths.append(curve_points)
-                    except Exception as e:
-                        print(f"B样条曲线处理出错: {e}")
+                # 先占位，所有B样条曲线在循环结束后批量求值
+                splines.append((len(toolpaths), curve))
+                toolpaths.append(None)
+        
+        adaptive = self.chord_tolerance > 0
+        if circles:
+            # 整圆：段数由弦高误差决定（小孔点少、大圆弧保持精度），或使用固定段数
+            radii = np.array([curve['radius'] for _, curve in circles], dtype=float)
+            segments = (circle_segment_counts(radii, self.chord_tolerance) if adaptive
+                        else np.full(len(circles), FIXED_CIRCLE_SEGMENTS))
+            points, offsets = tessellate_circles([curve['center'] for _, curve in circles], radii, segments)
+            self._fill_toolpaths(toolpaths, circles, points, offsets)
         
+        if splines:
+            start_time = time()
+            curves = [(curve['degree'], curve['control_points'], curve.get('knots')) for _, curve in splines]
+            if adaptive:
+                points, offsets = tessellate_bsplines(curves, self.chord_tolerance)
+            else:
+                points, offsets = evaluate_bsplines(curves, self.spline_samples)
+            self._fill_toolpaths(toolpaths, splines, points, offsets)
+            print(f"批量计算 {len(splines)} 条B样条曲线，用时 {time() - start_time:.2f} 秒")
+        
+        toolpaths = [path for path in toolpaths if path is not None]
+        if adaptive:
+            print(f"按弦高误差 {self.chord_tolerance} mm 离散: {len(circles)} 个圆、{len(splines)} 条B样条曲线，"
+                  f"共 {sum(len(path) for path in toolpaths)} 个路径点")
         print(f"生成了 {len(toolpaths)} 条刀具路径")
         return toolpaths
     
+    def _fill_toolpaths(self, toolpaths, placeholders, points, offsets):
+        """将批量离散得到的不规则点数组按占位位置写回刀具路径列表"""
+        for (position, _), start, end in zip(placeholders, offsets[:-1], offsets[1:]):
+            if end > start:
+                toolpaths[position] = points[start:end].tolist()
+    
     def write_gcode_header(self):
         """写入G代码文件头"""
         self.gcode_lines.extend([
@@ -407,7 +443,12 @@ def main():
     parser.add_argument('-s', '--safety-height', type=float, default=5.0, help='安全高度 (mm)')
     parser.add_argument('-d', '--cut-depth', type=float, default=0.5, help='每次切割深度 (mm)')
     parser.add_argument('-t', '--tool-diameter', type=float, default=3.0, help='刀具直径 (mm)')
-    parser.add_argument('-p', '--spline-samples', type=int, default=50, help='样条曲线采样点数')
+    parser.add_argument('-p', '--spline-samples', type=int, default=50,
+                        help='样条曲线采样点数（仅在 --chord-tol 为0时使用）')
+    parser.add_argument('--chord-tol', type=float, default=DEFAULT_CHORD_TOLERANCE,
+                        help='圆和样条曲线离散的弦高误差容差 (mm)，为0时使用固定采样点数')
+    parser.add_argument('--backend', choices=['fast', 'steputils'], default='fast',
+                        help='实体后端: fast 为带ID和类型索引的快速后端（默认），steputils 为steputils库')
     
     args = parser.parse_args()
     
@@ -419,7 +460,9 @@ def main():
         safety_height=args.safety_height,
         cut_depth=args.cut_depth,
         tool_diameter=args.tool_diameter,
-        spline_samples=args.spline_samples
+        spline_samples=args.spline_samples,
+        backend=args.backend,
+        chord_tolerance=args.chord_tol
     )
     
     success = converter.convert()
@@ -12,29 +12,173 @@ import argparse
 import math
 import numpy as np
 from time import time
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     from OCC.Core.STEPControl import STEPControl_Reader
     from OCC.Core.IFSelect import IFSelect_RetDone, IFSelect_ItemsByEntity
-    from OCC.Core.GeomAbs import GeomAbs_Line, GeomAbs_Circle
+    from OCC.Core.GeomAbs import (GeomAbs_Line, GeomAbs_Circle, GeomAbs_Ellipse, GeomAbs_BSplineCurve,
+                                  GeomAbs_BezierCurve, GeomAbs_OffsetCurve)
+    from OCC.Core.Geom import Geom_BSplineCurve
     from OCC.Core.BRepAdaptor import BRepAdaptor_Curve
-    from OCC.Core.TopAbs import TopAbs_EDGE, TopAbs_FACE
+    from OCC.Core.GCPnts import GCPnts_QuasiUniformDeflection
+    from OCC.Core.TopAbs import TopAbs_EDGE, TopAbs_FACE, TopAbs_SOLID, TopAbs_SHAPE
     from OCC.Core.TopExp import TopExp_Explorer
-    from OCC.Core.TopoDS import topods_Edge, topods_Face, TopoDS_Iterator
-    from OCC.Core.BRep import BRep_Tool
+    from OCC.Core.TopoDS import topods_Edge, topods_Face, TopoDS_Iterator, TopoDS_Compound
+    from OCC.Core.BRep import BRep_Tool, BRep_Builder
     from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
     from OCC.Core.Bnd import Bnd_Box
-    from OCC.Core.BRepBndLib import brepbndlib_Add
+    from OCC.Core.BRepBndLib import brepbndlib_Add, brepbndlib_AddOptimal
     from OCC.Extend.TopologyUtils import TopologyExplorer
 except ImportError:
     print("错误: 需要安装PythonOCC库")
     print("安装命令: pip install PythonOCC-Core")
     sys.exit(1)
 
+from numpy_bspline import expand_knots
+from numpy_tessellation import tessellate_nurbs, tessellate_offset_bspline, tessellate_ellipse, merge_collinear
+
+# 计算边界框时的网格线性挠度 (mm)
+MESH_DEFLECTION = 0.1
+# 离散一般曲线时的默认弦高误差 (mm)
+DEFAULT_CHORD_TOLERANCE = 0.01
+
+
+def discretize_edge(edge, deflection):
+    """
+    离散单条边
+
+    直线和圆只记录端点（及圆心）。B样条、Bezier、椭圆和以B样条为基的等距曲线取出一次几何参数，
+    按弦高误差用NumPy整体求值；其余曲线按准均匀挠度 (GCPnts_QuasiUniformDeflection) 离散。
+    折线中连续共线的点被合并
+
+    Args:
+        edge: TopoDS_Edge
+        deflection (float): 离散一般曲线时的弦高误差 (mm)
+
+    Returns:
+        tuple: (曲线类型, 点数组 (N, 3), 圆心或None)，曲线类型为 'line'、'circle' 或 'curve'
+    """
+    curve_adaptor = BRepAdaptor_Curve(edge)
+    curve_type = curve_adaptor.GetType()
+    first, last = curve_adaptor.FirstParameter(), curve_adaptor.LastParameter()
+
+    if curve_type == GeomAbs_Line or curve_type == GeomAbs_Circle:
+        points = np.array([_xyz(curve_adaptor.Value(first)), _xyz(curve_adaptor.Value(last))])
+        if curve_type == GeomAbs_Line:
+            return 'line', points, None
+        center = curve_adaptor.Circle().Location()
+        return 'circle', points, (center.X(), center.Y())
+
+    points = None
+    if curve_type == GeomAbs_BSplineCurve:
+        degree, poles, weights, knots = _bspline_data(curve_adaptor.BSpline())
+        points = tessellate_nurbs(degree, poles, weights, knots, first, last, deflection)
+    elif curve_type == GeomAbs_BezierCurve:
+        bezier = curve_adaptor.Bezier()
+        poles, weights = _pole_data(bezier)
+        points = tessellate_nurbs(bezier.Degree(), poles, weights, None, first, last, deflection)
+    elif curve_type == GeomAbs_Ellipse:
+        ellipse = curve_adaptor.Ellipse()
+        points = tessellate_ellipse(_xyz(ellipse.Location()), _xyz(ellipse.XAxis().Direction()),
+                                    _xyz(ellipse.YAxis().Direction()), ellipse.MajorRadius(),
+                                    ellipse.MinorRadius(), first, last, deflection)
+    elif curve_type == GeomAbs_OffsetCurve:
+        offset_curve = curve_adaptor.OffsetCurve()
+        basis = offset_curve.BasisCurve()
+        if basis.DynamicType().Name() == 'Geom_BSplineCurve':
+            degree, poles, weights, knots = _bspline_data(Geom_BSplineCurve.DownCast(basis))
+            if weights is None and degree >= 2:
+                points = tessellate_offset_bspline(degree, poles, knots, offset_curve.Offset(),
+                                                   _xyz(offset_curve.Direction()), first, last, deflection)
+
+    if points is None or len(points) < 2:
+        points = _sample_curve(curve_adaptor, first, last, deflection)
+    return 'curve', merge_collinear(points), None
+
+
+def _xyz(value):
+    """gp_Pnt/gp_Dir 转为坐标元组"""
+    return value.X(), value.Y(), value.Z()
+
+
+def _pole_data(curve):
+    """取出 B样条/Bezier 曲线的控制点和权重（非有理曲线权重为None）"""
+    count = curve.NbPoles()
+    poles = np.array([_xyz(curve.Pole(i)) for i in range(1, count + 1)])
+    weights = np.array([curve.Weight(i) for i in range(1, count + 1)]) if curve.IsRational() else None
+    return poles, weights
+
+
+def _bspline_data(curve):
+    """
+    取出B样条曲线的 (次数, 控制点, 权重, 完整节点向量)
+
+    周期曲线先复制一份并转换为非周期表示，不修改边所引用的几何
+    """
+    if curve.IsPeriodic():
+        curve = Geom_BSplineCurve.DownCast(curve.Copy())
+        curve.SetNotPeriodic()
+    poles, weights = _pole_data(curve)
+    knot_count = curve.NbKnots()
+    knots = expand_knots([curve.Multiplicity(i) for i in range(1, knot_count + 1)],
+                         [curve.Knot(i) for i in range(1, knot_count + 1)])
+    return curve.Degree(), poles, weights, knots
+
+
+def _sample_curve(curve_adaptor, first, last, deflection):
+    """无法用NumPy求值的曲线（抛物线、双曲线等）按准均匀挠度离散，失败时只取端点"""
+    sampler = GCPnts_QuasiUniformDeflection(curve_adaptor, deflection, first, last)
+    if sampler.IsDone() and sampler.NbPoints() >= 2:
+        return np.array([_xyz(sampler.Value(i)) for i in range(1, sampler.NbPoints() + 1)])
+    return np.array([_xyz(curve_adaptor.Value(first)), _xyz(curve_adaptor.Value(last))])
+
+
+def discretize_shape_edges(shape, deflection):
+    """按 TopExp_Explorer 的顺序离散形状中的所有边，可在工作进程中执行"""
+    records = []
+    explorer = TopExp_Explorer(shape, TopAbs_EDGE)
+    while explorer.More():
+        records.append(discretize_edge(topods_Edge(explorer.Current()), deflection))
+        explorer.Next()
+    return records
+
+
+def split_work_units(shape):
+    """
+    将形状拆分为可并行离散的单元：每个实体、不属于实体的每个面，以及不属于任何面的边合成的一个复合体；
+    形状中没有边时为整个形状
+
+    单元按 TopExp_Explorer 的顺序排列；只含一种子形状时依次合并各单元的结果即得到与整体遍历相同的边顺序，
+    混合形状按实体、自由面、自由边的顺序输出
+    """
+    units = []
+    for unit_type, avoid_type in ((TopAbs_SOLID, TopAbs_SHAPE), (TopAbs_FACE, TopAbs_SOLID)):
+        explorer = TopExp_Explorer(shape, unit_type, avoid_type)
+        while explorer.More():
+            units.append(explorer.Current())
+            explorer.Next()
+    
+    # 线框等不属于任何面的边合为一个单元
+    free_edges = TopoDS_Compound()
+    builder = BRep_Builder()
+    builder.MakeCompound(free_edges)
+    has_free_edges = False
+    explorer = TopExp_Explorer(shape, TopAbs_EDGE, TopAbs_FACE)
+    while explorer.More():
+        builder.Add(free_edges, explorer.Current())
+        has_free_edges = True
+        explorer.Next()
+    if has_free_edges:
+        units.append(free_edges)
+    return units or [shape]
+
+
 class StepToGcode:
     def __init__(self, input_file, output_file=None, feed_rate=500, 
                  rapid_feed_rate=1000, safety_height=5.0, cut_depth=0.5, 
-                 tool_diameter=3.0, xy_tolerance=0.01):
+                 tool_diameter=3.0, xy_tolerance=0.01, mesh=True, parallel_mesh=False, jobs=1,
+                 chord_tolerance=DEFAULT_CHORD_TOLERANCE):
         """
         初始化STEP到G代码转换器
         
@@ -47,6 +191,10 @@ class StepToGcode:
             cut_depth (float): 每次切割深度 (mm)
             tool_diameter (float): 刀具直径 (mm)
             xy_tolerance (float): XY平面公差 (mm)
+            mesh (bool): 计算边界框前是否先网格化形状；为False时直接由几何计算最优边界框
+            parallel_mesh (bool): 网格化时是否使用OCC的并行网格划分
+            jobs (int): 并行离散边的进程数，按实体、自由面和自由边分配
+            chord_tolerance (float): 离散一般曲线（样条、椭圆等）的弦高误差 (mm)
         """
         self.input_file = input_file
         self.output_file = output_file or self._default_output_file()
@@ -56,6 +204,10 @@ class StepToGcode:
         self.cut_depth = cut_depth
         self.tool_diameter = tool_diameter
         self.xy_tolerance = xy_tolerance
+        self.mesh = mesh
+        self.parallel_mesh = parallel_mesh
+        self.jobs = max(1, jobs)
+        self.chord_tolerance = chord_tolerance
         
         self.current_z = 0.0
         self.current_x = 0.0
@@ -88,14 +240,19 @@ class StepToGcode:
 
     def get_bounding_box(self, shape):
         """获取形状的边界框"""
+        start_time = time()
         bbox = Bnd_Box()
         bbox.SetGap(1e-5)
         
-        # 创建网格以获取更精确的边界
-        mesh = BRepMesh_IncrementalMesh(shape, 0.1)
-        mesh.Perform()
-        
-        brepbndlib_Add(shape, bbox)
+        if self.mesh:
+            # 创建网格以获取更精确的边界
+            mesh = BRepMesh_IncrementalMesh(shape, MESH_DEFLECTION, False, 0.5, self.parallel_mesh)
+            mesh.Perform()
+            brepbndlib_Add(shape, bbox)
+        else:
+            # 不网格化，直接由曲线和曲面几何计算最优边界框
+            brepbndlib_AddOptimal(shape, bbox, False, False)
+        print(f"计算边界框{'（网格化）' if self.mesh else '（不网格化）'}，用时 {time() - start_time:.2f} 秒")
         
         xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
         print(f"模型边界: X: {xmin:.2f} to {xmax:.2f}, Y: {ymin:.2f} to {ymax:.2f}, Z: {zmin:.2f} to {zmax:.2f}")
@@ -130,28 +287,43 @@ class StepToGcode:
 
     def explore_edges(self, shape):
         """探索并处理形状中的所有边"""
-        explorer = TopExp_Explorer(shape, TopAbs_EDGE)
+        start_time = time()
+        units = split_work_units(shape)
+        workers = min(self.jobs, len(units))
+        
+        if workers > 1:
+            # 各实体在工作进程中离散，map按提交顺序返回，合并结果与单进程遍历顺序一致
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                unit_records = list(pool.map(discretize_shape_edges, units,
+                                             [self.chord_tolerance] * len(units)))
+        else:
+            unit_records = [discretize_shape_edges(unit, self.chord_tolerance) for unit in units]
         
         edge_count = 0
-        while explorer.More():
-            edge = topods_Edge(explorer.Current())
-            self.process_edge(edge)
-            edge_count += 1
-            explorer.Next()
+        for records in unit_records:
+            for record in records:
+                self.emit_edge(record)
+                edge_count += 1
         
-        print(f"处理了 {edge_count} 条边")
+        print(f"处理了 {edge_count} 条边（{len(units)} 个离散单元，{workers} 个进程），"
+              f"用时 {time() - start_time:.2f} 秒")
 
     def process_edge(self, edge):
         """处理单条边并生成相应的G代码"""
-        curve_adaptor = BRepAdaptor_Curve(edge)
-        curve_type = curve_adaptor.GetType()
+        self.emit_edge(discretize_edge(edge, self.chord_tolerance))
+
+    def emit_edge(self, record):
+        """
+        根据离散后的边生成G代码
+
+        Args:
+            record (tuple): discretize_edge 返回的 (曲线类型, 点数组, 圆心)
+        """
+        curve_type, points, center = record
         
         # 获取边的起点和终点
-        start_point = curve_adaptor.Value(curve_adaptor.FirstParameter())
-        end_point = curve_adaptor.Value(curve_adaptor.LastParameter())
-        
-        start_x, start_y, start_z = start_point.X(), start_point.Y(), start_point.Z()
-        end_x, end_y, end_z = end_point.X(), end_point.Y(), end_point.Z()
+        start_x, start_y, start_z = points[0].tolist()
+        end_x, end_y, end_z = points[-1].tolist()
         
         # 判断是否需要进行Z轴调整
         z_level = min(start_z, end_z)
@@ -165,18 +337,13 @@ class StepToGcode:
             self.current_z = z_level
         
         # 根据曲线类型生成G代码
-        if curve_type == GeomAbs_Line:
+        if curve_type == 'line':
             # 直线
             self.gcode_lines.append(f"G1 X{end_x:.4f} Y{end_y:.4f} Z{end_z:.4f} F{self.feed_rate} ; 直线移动")
         
-        elif curve_type == GeomAbs_Circle:
+        elif curve_type == 'circle':
             # 圆或圆弧
-            circle = curve_adaptor.Circle()
-            center = circle.Location()
-            radius = circle.Radius()
-            
-            # 计算圆心坐标
-            center_x, center_y = center.X(), center.Y()
+            center_x, center_y = center
             
             # 计算起点和终点相对于圆心的角度
             start_angle = math.atan2(start_y - center_y, start_x - center_x)
@@ -198,9 +365,11 @@ class StepToGcode:
             self.gcode_lines.append(f"{g_command} X{end_x:.4f} Y{end_y:.4f} Z{end_z:.4f} I{i_value:.4f} J{j_value:.4f} F{self.feed_rate} ; 圆弧移动")
         
         else:
-            # 对于其他类型的曲线，使用离散点近似
-            # 这里简化处理，实际应用中可能需要更复杂的算法
-            self.gcode_lines.append(f"G1 X{end_x:.4f} Y{end_y:.4f} Z{end_z:.4f} F{self.feed_rate} ; 近似曲线")
+            # 对于其他类型的曲线，沿离散折线连续直线插补：首段带进给率和注释，其余为模态G1
+            moves = points[1:].tolist()
+            x, y, z = moves[0]
+            self.gcode_lines.append(f"G1 X{x:.4f} Y{y:.4f} Z{z:.4f} F{self.feed_rate} ; 近似曲线 ({len(moves)} 段)")
+            self.gcode_lines.extend([f"G1 X{x:.4f} Y{y:.4f} Z{z:.4f}" for x, y, z in moves[1:]])
         
         # 更新当前位置
         self.current_x, self.current_y, self.current_z = end_x, end_y, end_z
@@ -274,6 +443,11 @@ def main():
     parser.add_argument('-s', '--safety-height', type=float, default=5.0, help='安全高度 (mm)')
     parser.add_argument('-d', '--cut-depth', type=float, default=0.5, help='每次切割深度 (mm)')
     parser.add_argument('-t', '--tool-diameter', type=float, default=3.0, help='刀具直径 (mm)')
+    parser.add_argument('--no-mesh', action='store_true', help='不网格化形状，直接由几何计算边界框')
+    parser.add_argument('--parallel-mesh', action='store_true', help='网格化时使用OCC并行网格划分')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='并行离散边的进程数（按实体分配）')
+    parser.add_argument('--chord-tol', type=float, default=DEFAULT_CHORD_TOLERANCE,
+                        help='离散样条、椭圆等一般曲线的弦高误差 (mm)')
     
     args = parser.parse_args()
     
@@ -284,7 +458,11 @@ def main():
         rapid_feed_rate=args.rapid_feed_rate,
         safety_height=args.safety_height,
         cut_depth=args.cut_depth,
-        tool_diameter=args.tool_diameter
+        tool_diameter=args.tool_diameter,
+        mesh=not args.no_mesh,
+        parallel_mesh=args.parallel_mesh,
+        jobs=args.jobs,
+        chord_tolerance=args.chord_tol
     )
     
     success = converter.convert()
@@ -313,6 +313,135 @@ def test_numpy_import():
     
     return success
 
+def test_tool_compensation_closed_square():
+    """测试闭合方形轮廓的刀具补偿：包括回到起点的重复点在内，每个顶点都沿角平分线偏移刀具半径"""
+    print_header("测试闭合轮廓刀具补偿")
+    
+    import numpy as np
+    from toolpath import Toolpath
+    from numpy_gcode_generator import compensate_contours
+    
+    radius = 1.5
+    square = np.array([[0, 0, 0], [10, 0, 0], [10, 10, 0], [0, 10, 0], [0, 0, 0]], dtype=float)
+    toolpath = Toolpath.from_contours([square], [True])
+    compensated = compensate_contours(toolpath, radius)
+    
+    # 逆时针方形的左法向量指向内侧，每个角点沿角平分线向内偏移
+    inward = np.array([[1, 1], [-1, 1], [-1, -1], [1, -1], [1, 1]]) * radius / np.sqrt(2)
+    expected = square.copy()
+    expected[:, :2] += inward
+    offsets = np.linalg.norm(compensated[:, :2] - square[:, :2], axis=1)
+    passed = bool(np.allclose(compensated, expected) and np.allclose(offsets, radius))
+    print_result("每个顶点（含闭合点）偏移刀具半径", passed, f"偏移量: {np.round(offsets, 6).tolist()}")
+    
+    # 开放轮廓两端只用相邻的一段：沿该段的法向偏移
+    line = Toolpath.from_contours([square[:3]], [False])
+    ends = compensate_contours(line, radius)[[0, 2], :2]
+    ends_passed = bool(np.allclose(ends, [[0, radius], [10 - radius, 10]]))
+    print_result("开放轮廓端点沿相邻段法向偏移", ends_passed, f"端点: {ends.tolist()}")
+    
+    assert passed and ends_passed
+    return passed and ends_passed
+
+def test_optimized_closed_contour_entry_compensation():
+    """测试路径优化补回闭合点后，刀具补偿跳过该重复点，闭合轮廓的入口点仍偏移刀具半径"""
+    print_header("测试路径优化后闭合轮廓入口的刀具补偿")
+    
+    import numpy as np
+    from toolpath import Toolpath
+    from numpy_gcode_generator import NumPyFanucGcodeGenerator
+    
+    # 没有重复终点的闭合方形和一个开放轮廓，由 optimize_path 补回闭合点并选择入口
+    square = np.array([[20, 0, 0], [30, 0, 0], [30, 10, 0], [20, 10, 0]], dtype=float)
+    line = np.array([[0, 0, 0], [5, 0, 0]], dtype=float)
+    generator = NumPyFanucGcodeGenerator(tool_diameter=3.0, order_time_ms=0)
+    generator.set_path(Toolpath.from_contours([square, line], [True, False]))
+    generator.optimize_path()
+    original = generator.toolpath
+    generator.apply_tool_compensation()
+    compensated = generator.toolpath
+    
+    index = int(np.flatnonzero(original.closed)[0])
+    contour, offset_contour = original.contour(index), compensated.contour(index)
+    entry_offset = float(np.linalg.norm(offset_contour[0, :2] - contour[0, :2]))
+    passed = bool(np.allclose(contour[0], contour[-1]) and np.isclose(entry_offset, 1.5)
+                  and np.allclose(offset_contour[0], offset_contour[-1]))
+    print_result("闭合轮廓入口点偏移刀具半径", passed, f"入口偏移量: {entry_offset:.6f} mm")
+    
+    assert passed
+    return passed
+
+def test_weld_points_no_chaining():
+    """测试顶点焊接不做传递合并：一串间距略小于容差的点中，每个点最多移动一个容差"""
+    print_header("测试顶点焊接")
+    
+    import numpy as np
+    from fanuc_stp_to_gcode import weld_points
+    
+    tolerance = 1e-3
+    chain = np.zeros((20, 3))
+    chain[:, 0] = np.arange(20) * 0.9 * tolerance
+    welded, count = weld_points(chain, tolerance)
+    moved = float(np.linalg.norm(welded - chain, axis=1).max())
+    passed = bool(moved <= tolerance and count == 10 and len(np.unique(welded, axis=0)) == 10)
+    print_result("每个点吸附到容差内的代表点", passed, f"最大移动: {moved:.6f} mm，合并 {count} 个点")
+    
+    assert passed
+    return passed
+
+def test_merge_collinear_tolerance():
+    """测试合并共线点：缓慢弯曲的折线中每个被移除的点到合并后对应线段的距离都不超过容差"""
+    print_header("测试合并共线点")
+    
+    import numpy as np
+    from numpy_tessellation import merge_collinear
+    
+    # 相邻三点几乎共线，但整段抛物线偏离首尾连线约5 mm
+    tolerance = 1e-3
+    t = np.linspace(0, 1, 2001)
+    points = np.column_stack([100 * t, 20 * t ** 2, np.zeros_like(t)])
+    merged = merge_collinear(points, tolerance)
+    kept = np.flatnonzero(np.isin(points[:, 0], merged[:, 0]))
+    worst = 0.0
+    for first, last in zip(kept[:-1], kept[1:]):
+        chord = points[last, :2] - points[first, :2]
+        relative = points[first + 1:last, :2] - points[first, :2]
+        if len(relative):
+            cross = relative[:, 0] * chord[1] - relative[:, 1] * chord[0]
+            worst = max(worst, float(np.max(np.abs(cross)) / np.linalg.norm(chord)))
+    passed = bool(worst <= tolerance and len(merged) < len(points))
+    print_result("被移除的点不超出容差", passed, f"保留 {len(merged)}/{len(points)} 个点，最大偏差: {worst:.6f} mm")
+    
+    assert passed
+    return passed
+
+def test_greedy_order_matches_exhaustive():
+    """测试网格贪婪排序与逐一比较剩余轮廓的贪婪排序结果相同"""
+    print_header("测试网格贪婪排序")
+    
+    import numpy as np
+    from contour_ordering import greedy_order
+    
+    mismatches = 0
+    for seed in range(20):
+        rng = np.random.default_rng(seed)
+        # 均匀分布的轮廓，终点在起点附近
+        starts = rng.random((200, 2)) * 100
+        ends = starts + rng.normal(0, 3, starts.shape)
+        expected, remaining, position = [], np.ones(len(starts), dtype=bool), np.zeros(2)
+        for _ in range(len(starts)):
+            distances = np.where(remaining, np.hypot(*(starts - position).T), np.inf)
+            index = int(np.argmin(distances))
+            expected.append(index)
+            remaining[index] = False
+            position = ends[index]
+        mismatches += not np.array_equal(greedy_order(starts, ends), expected)
+    passed = mismatches == 0
+    print_result("与逐一比较的贪婪排序相同", passed, f"不同的用例: {mismatches}/20")
+    
+    assert passed
+    return passed
+
 def main():
     """主函数"""
     global tests_passed, tests_failed, tests_skipped
@@ -342,6 +471,14 @@ def main():
         param_custom_passed = False
         example_passed = False
     
+    # 测试刀具补偿
+    if numpy_available:
+        test_tool_compensation_closed_square()
+        test_optimized_closed_contour_entry_compensation()
+        test_weld_points_no_chaining()
+        test_merge_collinear_tolerance()
+        test_greedy_order_matches_exhaustive()
+    
     # 测试无NumPy版本
     no_numpy_basic_passed = test_no_numpy_basic_functionality()
     no_numpy_param_passed = test_no_numpy_parameter_customization()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分段刀具路径表示
+所有轮廓的点连续存放在一个 (N, 3) 数组中，contour_offsets 为CSR式偏移数组，
+第i个轮廓的点为 points[contour_offsets[i]:contour_offsets[i + 1]]，另有每个轮廓的闭合标志。
+轮廓之间的衔接由G代码生成器处理为抬刀和快速移动，而不是在切削深度上的进给移动
+"""
+
+import os
+import numpy as np
+
+from contour_ordering import CLOSED_TOLERANCE
+
+# 相邻点距离不超过该值时视为重复点 (mm)
+DUPLICATE_TOLERANCE = 1e-3
+
+
+class Toolpath:
+    def __init__(self, points, contour_offsets=None, closed=None):
+        """
+        初始化刀具路径
+
+        Args:
+            points (numpy.ndarray): (N, 3) 所有轮廓的点，按加工顺序连续存放
+            contour_offsets (numpy.ndarray): (n + 1,) 各轮廓在points中的起止偏移，None时整条路径为一个轮廓
+            closed (numpy.ndarray): (n,) 各轮廓是否闭合，None时按首尾点是否重合判断
+        """
+        self.points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if contour_offsets is None:
+            contour_offsets = [0, len(self.points)] if len(self.points) else [0]
+        self.contour_offsets = np.asarray(contour_offsets, dtype=np.int64)
+        if closed is None:
+            closed = self._detect_closed()
+        self.closed = np.asarray(closed, dtype=bool).reshape(-1)
+
+    @classmethod
+    def from_contours(cls, contours, closed=None):
+        """由轮廓点数组列表构建刀具路径"""
+        lengths = [len(contour) for contour in contours]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        points = np.concatenate(contours) if contours else np.empty((0, 3))
+        return cls(points, offsets, closed)
+
+    @classmethod
+    def load(cls, points_file):
+        """
+        加载 save() 保存的刀具路径
+
+        只有点数组文件（如旧版本保存的 path.npy）时，整条路径视为一个开放轮廓
+        """
+        points = np.load(points_file)
+        offsets_file, closed_file = cls._sidecar_files(points_file)
+        if not os.path.exists(offsets_file):
+            return cls(points, closed=[False] if len(points) else [])
+        closed = np.load(closed_file) if os.path.exists(closed_file) else None
+        return cls(points, np.load(offsets_file), closed)
+
+    def save(self, points_file):
+        """
+        保存刀具路径：点数组写入 points_file（仍可直接用 np.load 读取为 (N, 3) 数组），
+        轮廓偏移和闭合标志分别写入同名的 _offsets.npy 和 _closed.npy
+        """
+        offsets_file, closed_file = self._sidecar_files(points_file)
+        np.save(points_file, self.points)
+        np.save(offsets_file, self.contour_offsets)
+        np.save(closed_file, self.closed)
+
+    @staticmethod
+    def _sidecar_files(points_file):
+        """轮廓偏移和闭合标志文件的路径"""
+        base = points_file[:-4] if points_file.endswith('.npy') else points_file
+        return f"{base}_offsets.npy", f"{base}_closed.npy"
+
+    def _detect_closed(self):
+        """按首尾点是否重合判断各轮廓是否闭合"""
+        starts, ends = self.contour_offsets[:-1], self.contour_offsets[1:]
+        valid = ends - starts > 2
+        closed = np.zeros(len(starts), dtype=bool)
+        if valid.any():
+            gap = np.linalg.norm(self.points[ends[valid] - 1] - self.points[starts[valid]], axis=1)
+            closed[valid] = gap <= CLOSED_TOLERANCE
+        return closed
+
+    @property
+    def point_count(self):
+        """点数"""
+        return len(self.points)
+
+    @property
+    def contour_count(self):
+        """轮廓数"""
+        return len(self.contour_offsets) - 1
+
+    @property
+    def contour_lengths(self):
+        """各轮廓的点数"""
+        return np.diff(self.contour_offsets)
+
+    def contour(self, index):
+        """第index个轮廓的点（视图）"""
+        return self.points[self.contour_offsets[index]:self.contour_offsets[index + 1]]
+
+    def contours(self):
+        """所有轮廓的点数组（视图）列表"""
+        return np.split(self.points, self.contour_offsets[1:-1])
+
+    def point_owner(self):
+        """每个点所属的轮廓序号"""
+        return np.repeat(np.arange(self.contour_count), self.contour_lengths)
+
+    def with_points(self, points):
+        """轮廓结构不变、点坐标替换后的新刀具路径（如刀具补偿结果）"""
+        return Toolpath(points, self.contour_offsets.copy(), self.closed.copy())
+
+    def select(self, keep):
+        """
+        按点掩码保留部分点，同步更新轮廓偏移，点被全部移除的轮廓一并删除
+
+        Args:
+            keep (numpy.ndarray): (N,) 布尔掩码
+
+        Returns:
+            Toolpath: 新刀具路径
+        """
+        keep = np.asarray(keep, dtype=bool)
+        counts = np.bincount(self.point_owner()[keep], minlength=self.contour_count)
+        nonempty = counts > 0
+        offsets = np.zeros(int(nonempty.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[nonempty], out=offsets[1:])
+        return Toolpath(self.points[keep], offsets, self.closed[nonempty])
+
+    def without_duplicates(self, tolerance=DUPLICATE_TOLERANCE):
+        """
+        移除每个轮廓内连续的重复点（长度不超过容差的零长度段），O(n) 向量化
+        
+        只比较同一轮廓内相邻的点，不同轮廓或不同高度上XY相同的点、闭合轮廓回到起点的点都保留。
+        一串相距都很近的点中，只在累计弧长跨过容差的整数倍时保留一个点，
+        因此被移除的点与保留的前一个点的距离总小于容差，不会因逐段移除而使轮廓变形
+        
+        Args:
+            tolerance (float): 距离容差 (mm)
+        
+        Returns:
+            tuple: (新刀具路径, 移除的点数)
+        """
+        if self.point_count == 0:
+            return self, 0
+        steps = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+        arc = np.concatenate(([0.0], np.cumsum(steps)))
+        buckets = np.floor(arc / max(tolerance, 1e-12))
+        keep = np.ones(self.point_count, dtype=bool)
+        keep[1:] = (steps > tolerance) | (buckets[1:] != buckets[:-1])
+        # 每个轮廓的第一个点总是保留
+        keep[self.contour_offsets[:-1][self.contour_lengths > 0]] = True
+        removed = int(self.point_count - keep.sum())
+        return (self.select(keep) if removed else self), removed
+    
+    def rapid_moves(self):
+        """
+        轮廓之间的快速移动：每个轮廓终点到下一个轮廓起点
+
+        Returns:
+            tuple: (起点 (n - 1, 3), 终点 (n - 1, 3))
+        """
+        lengths = self.contour_lengths
+        offsets = self.contour_offsets[:-1][lengths > 0]
+        ends = self.contour_offsets[1:][lengths > 0] - 1
+        return self.points[ends[:-1]], self.points[offsets[1:]]
@@ -9,12 +9,16 @@ from flask import Flask, request, render_template, redirect, url_for, flash, ses
 from werkzeug.utils import secure_filename
 from pathlib import Path
 
+from numpy_step_processor import probe
+
 # 配置
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
 OUTPUT_FOLDER = os.path.join(os.getcwd(), 'output')
 PLOTS_FOLDER = os.path.join(os.getcwd(), 'plots')
 STATIC_PLOTS_FOLDER = os.path.join(os.getcwd(), 'static/plots')
 ALLOWED_EXTENSIONS = {'stp', 'step', 'dwg'}
+# 压缩的STEP文件，转换时以流方式解压读取，不生成解压副本
+COMPRESSED_STEP_EXTENSIONS = ('.stp.gz', '.step.gz', '.zip')
 MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
 
 # 应用初始化
@@ -33,8 +37,17 @@ for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER, PLOTS_FOLDER, STATIC_PLOTS_FOLDER]:
 # 辅助函数
 def allowed_file(filename):
     """检查文件扩展名是否允许"""
+    if filename.lower().endswith(COMPRESSED_STEP_EXTENSIONS):
+        return True
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def step_base_name(filename):
+    """去掉STEP文件（含压缩文件）扩展名后的文件名"""
+    base = os.path.splitext(filename)[0]
+    if filename.lower().endswith('.gz'):
+        base = os.path.splitext(base)[0]
+    return base
+
 def get_file_size(file_path):
     """获取文件大小的可读表示"""
     size_bytes = os.path.getsize(file_path)
@@ -94,6 +107,28 @@ def get_gcode_preview(file_path, max_lines=100):
         app.logger.error(f"获取G代码预览出错: {str(e)}")
         return ["无法读取G代码预览"]
 
+def probe_step_file(file_path, max_types=8):
+    """快速探测上传的STEP文件，返回可保存在会话中的摘要，失败时返回None"""
+    try:
+        result = probe(file_path)
+    except Exception as e:
+        app.logger.error(f"STEP文件探测出错: {str(e)}")
+        return None
+    
+    counts = result.get('entity_counts', {})
+    return {
+        'schema': result.get('schema') or '未知',
+        'size_mb': round(result.get('size_mb', 0), 2),
+        'compressed_mb': round(result['compressed_mb'], 2) if 'compressed_mb' in result else None,
+        'exact': result.get('exact', False),
+        'total_entities': result.get('total_entities', 0),
+        'entity_counts': list(counts.items())[:max_types],
+        'bounds': result.get('bounds'),
+        'predicted_seconds': round(result.get('predicted_seconds', 0), 1),
+        'predicted_memory_mb': round(result.get('predicted_memory_mb', 0), 1),
+        'probe_ms': round(result.get('probe_ms', 0), 1)
+    }
+
 def prepare_user_session():
     """准备用户会话，生成唯一会话ID"""
     if 'session_id' not in session:
@@ -152,9 +187,12 @@ def upload_file():
         # 在会话中记录文件路径
         session['uploaded_file'] = file_path
         session['original_filename'] = filename
+        session.pop('step_probe', None)
         
         # 根据文件类型决定下一步
-        if filename.lower().endswith(('.stp', '.step')):
+        if filename.lower().endswith(('.stp', '.step') + COMPRESSED_STEP_EXTENSIONS):
+            # 上传后立即探测文件规模，无需等待完整转换
+            session['step_probe'] = probe_step_file(file_path)
             return redirect(url_for('step_conversion'))
         elif filename.lower().endswith('.dwg'):
             return redirect(url_for('dwg_conversion'))
@@ -170,7 +208,8 @@ def step_conversion():
         return redirect(url_for('index'))
     
     filename = session.get('original_filename', '未知文件')
-    return render_template('step_conversion.html', filename=filename)
+    return render_template('step_conversion.html', filename=filename,
+                           file_probe=session.get('step_probe'))
 
 @app.route('/dwg_conversion')
 def dwg_conversion():
@@ -199,7 +238,7 @@ def convert_step():
         
         input_file = session['uploaded_file']
         original_filename = session['original_filename']
-        output_filename = f"{os.path.splitext(original_filename)[0]}_gcode.nc"
+        output_filename = f"{step_base_name(original_filename)}_gcode.nc"
         output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
         
         # 根据转换器类型选择脚本